@@ -0,0 +1,197 @@
+"""
+Zamknięcie pod obciążeniem: SIGTERM w trakcie ruchu, potem nowa
+instancja na tym samym porcie i z tym samym plikiem handoff. Bot API
+zastępuje atrapa (benchmarks/stub_bot_api.py) z opóźnieniem, więc
+w chwili SIGTERM w kolejce czekają update'y.
+
+Nadawcy zachowują się jak Telegram: odpowiedź inna niż 200 albo błąd
+połączenia -> ten sam update ponownie po chwili. Każdy update to inny
+czat prywatny z tekstem, na który bot odpowiada znaną liczbą wiadomości:
+0 w atrapie = update zgubiony, więcej niż oczekiwano = obsłużony dwa razy.
+
+Scenariusze (SHUTDOWN_TIMEOUT, odpowiedzi na update):
+  - 8 s, 1   – kolejka dokończona przed wyjściem
+  - 0,3 s, 1 – reszta zapisana do pliku, dokończona przez drugą instancję
+  - 0,3 s, 2 – atrapa odpowiada po 300 ms, więc SIGTERM wypada między
+               dwiema odpowiedziami. Kolejka: update przerwany po pierwszej
+               nie wraca do przekazania (część odpowiedzi zamiast dubla –
+               kolumna "urwane"). Sync: Telegram ponawia przerwane żądanie,
+               druga instancja tylko je potwierdza (kolumna "pominięte").
+               1/5 update'ów, żeby nie trwało minut
+
+Uruchomienie: python benchmarks/bench_drain.py [--updates 600]
+    [--mode queue|sync] [--scheduler]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+
+import httpx
+
+from bench_webhook import make_update
+from stub_bot_api import start_in_subprocess
+
+# (SHUTDOWN_TIMEOUT, tekst, liczba odpowiedzi, opóźnienie atrapy s
+#  – None = --api-delay, część --updates)
+SCENARIOS = (
+    (8.0, "co to jest?", 1, None, 1),     # "Nie rozumiem"
+    (0.3, "co to jest?", 1, None, 1),
+    (0.3, "3", 2, 0.3, 0.2),             # informacje + menu
+)
+
+
+def start_bot(args, shutdown_timeout, handoff_path, log):
+    env = dict(
+        os.environ,
+        TELEGRAM_TOKEN="123456:BENCH",
+        WEBHOOK_URL="https://bench.invalid",
+        TELEGRAM_BASE_URL=f"http://127.0.0.1:{args.api_port}/bot",
+        PORT=str(args.port),
+        WEBHOOK_MODE=args.mode,
+        WEBHOOK_WORKERS="2",
+        OUTBOUND_SCHEDULER="1" if args.scheduler else "0",
+        SHUTDOWN_TIMEOUT=str(shutdown_timeout),
+        SHUTDOWN_HANDOFF_PATH=handoff_path,
+        FLOOD_CHAT_RATE="0",
+        CPU_KB_WATCH_INTERVAL="0",
+        GSHEET_WEBHOOK_URL="",
+    )
+    return subprocess.Popen(
+        [sys.executable, "bot.py"], cwd=ROOT, env=env, stdout=log, stderr=log,
+    )
+
+
+async def wait_ready(client, port, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get(f"http://127.0.0.1:{port}/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError("bot nie wystartował")
+        await asyncio.sleep(0.05)
+
+
+def handoff_gauge(text) -> dict:
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("bot_handoff{"):
+            name = line.split('"')[1]
+            values[name] = float(line.rsplit(" ", 1)[1])
+    return values
+
+
+async def scenario(args, shutdown_timeout, text, replies, count):
+    api = f"http://127.0.0.1:{args.api_port}"
+    url = f"http://127.0.0.1:{args.port}/webhook"
+    httpx.post(f"{api}/reset")
+    updates = [make_update(100_000 + i, text) for i in range(count)]
+    counts = {"503": 0, "connection": 0, "accepted": 0}
+    handoff_path = os.path.join(tempfile.mkdtemp(), "pending_updates.jsonl")
+    log = open(os.path.join(os.path.dirname(handoff_path), "bot.log"), "w+")
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        first = start_bot(args, shutdown_timeout, handoff_path, log)
+        await wait_ready(client, args.port)
+        next_update = iter(updates)
+        killed = asyncio.Event()
+
+        async def sender():
+            for payload in next_update:
+                while True:
+                    try:
+                        response = await client.post(url, json=payload)
+                        if response.status_code == 200:
+                            break
+                        counts["503"] += 1
+                    except httpx.TransportError:
+                        counts["connection"] += 1
+                    await asyncio.sleep(0.05)
+                counts["accepted"] += 1
+                if counts["accepted"] >= count // 3:
+                    killed.set()
+
+        senders = [asyncio.create_task(sender()) for _ in range(args.concurrency)]
+        await killed.wait()
+        stopped = time.perf_counter()
+        first.send_signal(signal.SIGTERM)
+        await asyncio.to_thread(first.wait, 60)
+        shutdown_s = time.perf_counter() - stopped
+        saved = os.path.exists(handoff_path)
+
+        second = start_bot(args, shutdown_timeout, handoff_path, log)
+        await wait_ready(client, args.port)
+        await asyncio.gather(*senders)
+
+        # czekamy, aż atrapa przestanie dostawać nowe wiadomości
+        total, still = -1, 0
+        while still < 20:
+            chats = (await client.get(f"{api}/chats")).json()
+            now = sum(chats.values())
+            still = still + 1 if now == total else 0
+            total = now
+            if total >= count * replies and still >= 2:
+                break
+            await asyncio.sleep(0.1)
+        gauge = handoff_gauge((await client.get(f"http://127.0.0.1:{args.port}/metrics")).text)
+        second.send_signal(signal.SIGTERM)
+        await asyncio.to_thread(second.wait, 60)
+
+    per_update = [chats.get(str(u["message"]["chat"]["id"]), 0) for u in updates]
+    lost = per_update.count(0)
+    twice = sum(1 for n in per_update if n > replies)
+    cut = sum(1 for n in per_update if 0 < n < replies)
+    print(
+        f"{shutdown_timeout:>9.1f} {replies:>5} {count:>7} {counts['503']:>6} "
+        f"{counts['connection']:>8} {shutdown_s:>11.2f} {('tak' if saved else 'nie'):>8} "
+        f"{gauge.get('resumed_updates', 0):>10.0f} {gauge.get('resumed_messages', 0):>10.0f} "
+        f"{gauge.get('skipped_answered', 0):>9.0f} "
+        f"{lost:>8} {twice:>8} {cut:>7}"
+    )
+    log.close()
+    return lost, twice
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mode", default="queue", choices=("queue", "sync"))
+    parser.add_argument("--scheduler", action="store_true", help="OUTBOUND_SCHEDULER=1")
+    parser.add_argument("--port", type=int, default=18092)
+    parser.add_argument("--api-port", type=int, default=18093)
+    parser.add_argument("--api-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(f"tryb: {args.mode}, harmonogram: {'tak' if args.scheduler else 'nie'}, "
+          f"opóźnienie Bot API {args.api_delay * 1e3:.0f} ms")
+    print(f"{'termin s':>9} {'odp.':>5} {'update':>7} {'503':>6} {'połącz.':>8} "
+          f"{'zamknięcie s':>11} {'handoff':>8} {'przej. upd':>10} {'przej. wiad':>10} "
+          f"{'pominięte':>9} "
+          f"{'zgubione':>8} {'2 razy':>8} {'urwane':>7}")
+    failed = False
+    for timeout, text, replies, delay, share in SCENARIOS:
+        stub = start_in_subprocess(args.api_port, args.api_delay if delay is None else delay)
+        try:
+            count = max(30, int(args.updates * share))
+            lost, twice = asyncio.run(scenario(args, timeout, text, replies, count))
+            failed |= bool(lost or twice)
+        finally:
+            stub.terminate()
+            stub.join()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Koszt decyzji ochrony przed zalewem (flood.FloodGuard / BucketTable):
+  - jeden gorący czat (spam jednego użytkownika)
+  - N różnych czatów po kolei (alokacja slotów + sprzątanie bezczynnych)
+  - to samo dla najprostszej alternatywy: dict id -> TAT (bez sprzątania)
+  - pamięć na wpis (tracemalloc): tablice vs dict id -> TAT vs słownik
+    obiektów outbound.TokenBucket (__slots__)
+  - scenariusz: 1 spamer (100 wiadomości/s) + zwykli użytkownicy –
+    ile wiadomości spamera przechodzi, ile powiadomień dostaje
+
+Uruchomienie: python benchmarks/bench_flood.py [--chats 100000 500000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flood import ALLOW, NOTICE, BucketTable, FloodGuard
+from outbound import TokenBucket
+
+N = 1_000_000
+
+
+def per_call_ns(fn, n):
+    start = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def hot_chat(n):
+    guard = FloodGuard()
+    check = guard.check
+    now = 0.0
+    for _ in range(n):
+        now += 0.001
+        check(42, 42, now)
+
+
+def many_chats(chats):
+    def run(n):
+        guard = FloodGuard()
+        check = guard.check
+        now = 0.0
+        for i in range(n):
+            now += 0.0001
+            chat = i % chats
+            check(chat, chat, now)
+    return run
+
+
+class DictGcra:
+    """Punkt odniesienia: GCRA w zwykłym słowniku, bez zwalniania wpisów."""
+
+    def __init__(self, rate, burst):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.tats = {}
+
+    def allow(self, key, now):
+        tat = self.tats.get(key, now)
+        if tat < now:
+            tat = now
+        if tat - now > self.tolerance:
+            return False
+        self.tats[key] = tat + self.interval
+        return True
+
+
+def many_chats_table(table_class, chats):
+    def run(n):
+        table = table_class(0.5, 5)
+        allow = table.allow
+        now = 0.0
+        for i in range(n):
+            now += 0.0001
+            allow(i % chats, now)
+    return run
+
+
+def dict_memory(chats):
+    tracemalloc.start()
+    table = DictGcra(0.5, 5)
+    for chat in range(chats):
+        table.allow(1_000_000_000 + chat, 0.0)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / chats
+
+
+def table_memory(chats):
+    tracemalloc.start()
+    table = BucketTable(0.5, 5)
+    for chat in range(chats):
+        table.allow(1_000_000_000 + chat, 0.0)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / chats
+
+
+def objects_memory(chats):
+    tracemalloc.start()
+    buckets = {}
+    for chat in range(chats):
+        bucket = buckets.get(1_000_000_000 + chat)
+        if bucket is None:
+            bucket = buckets[1_000_000_000 + chat] = TokenBucket(0.5, 5, 0.0)
+        bucket.take(0.0)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / chats
+
+
+def spam_scenario(seconds=60):
+    guard = FloodGuard()
+    spam = {ALLOW: 0, NOTICE: 0, "drop": 0}
+    normal_denied = 0
+    now = 0.0
+    step = 0.01   # spamer: 100 wiadomości/s
+    for i in range(int(seconds / step)):
+        now += step
+        spam[guard.check(1, 1, now)] += 1
+        # 200 zwykłych użytkowników, każdy co 4 s
+        if i % 2 == 0:
+            user = 100 + (i // 2) % 200
+            if guard.check(user, user, now) != ALLOW:
+                normal_denied += 1
+    return spam, normal_denied
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, nargs="+", default=[100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"decyzja, 1 czat:            {per_call_ns(hot_chat, N):>6.0f} ns")
+    for chats in args.chats:
+        n = max(N, 2 * chats)
+        ns = per_call_ns(many_chats(chats), n)
+        ns_table = per_call_ns(many_chats_table(BucketTable, chats), n)
+        ns_dict = per_call_ns(many_chats_table(DictGcra, chats), n)
+        print(
+            f"decyzja, {chats:>7} czatów:    {ns:>6.0f} ns  "
+            f"(sam BucketTable.allow {ns_table:.0f} ns, dict id -> TAT {ns_dict:.0f} ns)"
+        )
+
+    for chats in args.chats:
+        print(
+            f"pamięć / wpis ({chats:>7}):  tablice {table_memory(chats):>5.0f} B, "
+            f"dict id -> TAT {dict_memory(chats):>5.0f} B, "
+            f"obiekty TokenBucket {objects_memory(chats):>5.0f} B"
+        )
+
+    spam, normal_denied = spam_scenario()
+    total = sum(spam.values())
+    print(
+        f"spamer 100/s przez 60 s:    przeszło {spam[ALLOW]}/{total}, "
+        f"powiadomień {spam[NOTICE]}; zwykli odrzuceni: {normal_denied}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Dopasowanie przybliżone nazw CPU: trafność na korpusie literówek
+(benchmarks/cpu_misspellings.tsv), czas zapytania, czas budowy indeksu
+i porównanie z naiwnym przeszukaniem wszystkich nazw (Levenshtein).
+
+Najpierw indeks na pętli zdarzeń (jak w bocie): przed warm_fuzzy_index()
+literówka daje od razu UNKNOWN (bez budowy na pętli i bez zapisu do
+cache), po nim – dopasowanie; przeładowanie bazy w wątku nie zostawia
+okna bez indeksu. Inaczej kod wyjścia 1.
+
+Uruchomienie: python benchmarks/bench_fuzzy.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import evaluator
+from fuzzy import _clean
+
+CORPUS_PATH = os.path.join(HERE, "cpu_misspellings.tsv")
+
+
+def load_corpus(path=CORPUS_PATH):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            text, expected = line.rstrip("\n").split("\t")
+            rows.append((text, None if expected == "-" else expected))
+    return rows
+
+
+def levenshtein(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def brute_force(text, keys):
+    key, _, _ = _clean(text)
+    return min(keys, key=lambda k: levenshtein(key, k))
+
+
+def percentile(sorted_values, p):
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def on_loop(text="i5 825ou", expected="OK"):
+    """Lista błędów (pusta = OK)."""
+    errors = []
+    started = time.perf_counter()
+    verdict = evaluator.evaluate_cpu(text)
+    blocked = time.perf_counter() - started
+    print(f"na pętli przed budową: {verdict} w {blocked * 1e3:.1f} ms")
+    if verdict != "UNKNOWN" or blocked > 0.05 or evaluator.fuzzy_ready():
+        errors.append("indeks budowany na pętli zdarzeń")
+
+    started = time.perf_counter()
+    await asyncio.to_thread(evaluator.warm_fuzzy_index)
+    print(f"warm_fuzzy_index w wątku: {time.perf_counter() - started:.2f} s")
+    verdict = evaluator.evaluate_cpu(text)
+    print(f"na pętli po budowie:   {verdict}")
+    if verdict != expected:
+        errors.append(f"po budowie {text!r} -> {verdict}, oczekiwano {expected}")
+
+    # przeładowanie bazy (jak watcher): nowy indeks powstaje przed podmianą
+    gaps = 0
+    reload = asyncio.create_task(
+        asyncio.to_thread(evaluator.set_cpu_overrides, dict(evaluator.NORMALIZED_CPU_OVERRIDES))
+    )
+    started = time.perf_counter()
+    while not reload.done():
+        gaps += not evaluator.fuzzy_ready()
+        await asyncio.sleep(0.005)
+    await reload
+    print(f"przeładowanie bazy w wątku: {time.perf_counter() - started:.2f} s, "
+          f"chwil bez indeksu: {gaps}")
+    if gaps or evaluator.evaluate_cpu(text) != expected:
+        errors.append("po przeładowaniu bazy brak indeksu")
+    return errors
+
+
+def main():
+    # tabela werdyktów wczytana wcześniej (w bocie: finish_startup), poza pomiarem
+    evaluator._ensure_verdict_table()
+    errors = asyncio.run(on_loop())
+    corpus = load_corpus()
+
+    index = evaluator._fuzzy_index()
+    print(f"indeks:           {len(index)} nazw")
+
+    correct = wrong = missed = false_positive = 0
+    latencies = []
+    for text, expected in corpus:
+        start = time.perf_counter()
+        match = evaluator.fuzzy_match(text)
+        latencies.append(time.perf_counter() - start)
+
+        accepted = match is not None and match.confidence >= evaluator.CPU_FUZZY_MIN_CONFIDENCE
+        model = match.model if accepted else None
+        if expected is None:
+            if model is not None:
+                false_positive += 1
+                print(f"  fałszywe trafienie: {text!r} -> {model} ({match.confidence})")
+        elif model == expected:
+            correct += 1
+        elif model is None:
+            missed += 1
+            print(f"  brak dopasowania:   {text!r} (oczekiwano {expected}, najbliżej {match})")
+        else:
+            wrong += 1
+            print(f"  złe dopasowanie:    {text!r} -> {model} (oczekiwano {expected})")
+
+    positives = sum(1 for _, expected in corpus if expected is not None)
+    print(f"korpus:           {len(corpus)} wpisów, {positives} z oczekiwanym modelem")
+    print(f"trafne:           {correct}/{positives}")
+    print(f"błędne / brak:    {wrong} / {missed}")
+    print(f"fałszywe trafienia: {false_positive}/{len(corpus) - positives}")
+
+    latencies.sort()
+    print(
+        f"czas zapytania:   p50 {percentile(latencies, 50) * 1e3:.3f} ms, "
+        f"p99 {percentile(latencies, 99) * 1e3:.3f} ms, "
+        f"max {latencies[-1] * 1e3:.3f} ms"
+    )
+
+    # naiwne przeszukanie – kilka zapytań wystarczy, żeby zobaczyć rząd wielkości
+    keys = list(index._models)
+    sample = [text for text, expected in corpus if expected][:3]
+    start = time.perf_counter()
+    for text in sample:
+        brute_force(text, keys)
+    per_query = (time.perf_counter() - start) / len(sample)
+    print(f"naiwny Levenshtein po wszystkich nazwach: {per_query * 1e3:.0f} ms / zapytanie")
+
+    for error in errors:
+        print(f"BŁĄD: {error}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
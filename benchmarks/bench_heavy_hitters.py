@@ -0,0 +1,90 @@
+"""
+Agregat nieznanych CPU (heavy_hitters.UnknownCpuSummary): strumień
+zdarzeń UNKNOWN – kilkadziesiąt prawdziwych nieznanych modeli (rozkład
+Zipfa) zalany losowymi śmieciami. Mierzy:
+  - pamięć agregatu (tracemalloc) po 10k / 100k / 1M zdarzeń
+  - czas add()
+  - trafność top-K względem dokładnego licznika (collections.Counter)
+
+Uruchomienie: python benchmarks/bench_heavy_hitters.py [--garbage 0.7]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from heavy_hitters import UnknownCpuSummary
+from knowledge_base import normalize
+
+REAL_UNKNOWN = [
+    f"{family} {model}"
+    for family in ("Snapdragon X Elite", "Mediatek Kompanio", "Intel Core Ultra 5", "AMD Athlon Gold")
+    for model in ("X1E-78-100", "1380", "125H", "7220U", "3150U", "520", "155U", "8505", "X1P-42", "838")
+]
+
+
+class NullSink:
+    def __init__(self):
+        self.rows = 0
+
+    def submit(self, row):
+        self.rows += 1
+
+
+def garbage(rng):
+    n = rng.randint(3, 200)
+    return "".join(rng.choice(string.printable) for _ in range(n))
+
+
+def stream(n, garbage_share, seed=1):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(REAL_UNKNOWN))]
+    for _ in range(n):
+        if rng.random() < garbage_share:
+            yield garbage(rng)
+        else:
+            yield rng.choices(REAL_UNKNOWN, weights)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--garbage", type=float, default=0.7, help="udział śmieci w strumieniu")
+    parser.add_argument("--capacity", type=int, default=256)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"pojemność: {args.capacity}, śmieci: {args.garbage:.0%}")
+    print(f"{'zdarzeń':>9} {'pamięć KiB':>11} {'add() µs':>9} {'top-{} trafne'.format(args.top):>14} {'maks. błąd licznika':>20}")
+    for n in (10_000, 100_000, 1_000_000):
+        events = list(stream(n, args.garbage))
+        exact = Counter(normalize(text.strip())[:64] for text in events)
+
+        summary = UnknownCpuSummary(NullSink(), capacity=args.capacity, top_k=args.top, interval=0)
+        start = time.perf_counter()
+        for text in events:
+            summary.add(text, 8, now=0.0)
+        per_add = (time.perf_counter() - start) / n
+
+        # pamięć osobno – tracemalloc spowalnia add()
+        tracemalloc.start()
+        traced = UnknownCpuSummary(NullSink(), capacity=args.capacity, top_k=args.top, interval=0)
+        for text in events:
+            traced.add(text, 8, now=0.0)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        true_top = {key for key, _ in exact.most_common(args.top)}
+        found = summary.top(args.top)
+        hits = sum(1 for row in found if row["key"] in true_top)
+        worst = max(row["count"] - exact[row["key"]] for row in found)
+        print(f"{n:>9} {memory / 1024:>11.0f} {per_add * 1e6:>9.2f} {hits:>10}/{args.top} {worst:>20}")
+
+
+if __name__ == "__main__":
+    main()
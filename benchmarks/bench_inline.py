@@ -0,0 +1,151 @@
+"""
+Tryb inline (evaluator.suggest_cpus + bot._articles): odtworzenie
+naciśnięć klawiszy – użytkownicy wpisują nazwy CPU znak po znaku
+("@bot i", "@bot i5", "@bot i5-", ...), popularne modele częściej
+(rozkład Zipfa), z prefiksem producenta albo bez.
+
+  - budowa indeksu prefiksów: czas i pamięć (tracemalloc)
+  - zapytanie bez cache (sam indeks) i z cache: p50 / p99
+  - trafienia cache na odtworzonym ruchu
+  - koszt zbudowania listy InlineQueryResultArticle (bez / z lru_cache)
+  - podpowiedzi tylko z realnych modeli (lista + baza wiedzy), baza
+    wiedzy przed resztą; inaczej kod wyjścia 1
+
+Uruchomienie: python benchmarks/bench_inline.py [--users 5000] [--limit 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+os.environ.setdefault("TELEGRAM_TOKEN", "123456:BENCH")
+os.environ.setdefault("WEBHOOK_URL", "http://localhost")
+os.environ.setdefault("CPU_KB_WATCH_INTERVAL", "0")
+
+import evaluator
+
+MODELS = [
+    "i5-8250U", "i5-1135G7", "i5-10210U", "i7-8550U", "i3-1115G4",
+    "i5-1235U", "i7-1165G7", "i3-10110U", "i5-7200U", "i7-1255U",
+    "Ryzen 5 5500U", "Ryzen 7 5700U", "Ryzen 3 3250U", "Ryzen 5 3500U",
+    "Celeron N4020", "Pentium Silver N6000", "N100", "Apple M1", "Apple M2",
+    "i5-12400F", "i7-12700H", "Ryzen 5 7530U", "i5-4210U", "i3-6006U",
+]
+VENDORS = ["", "", "Intel Core ", "Intel ", "AMD "]
+
+
+def keystrokes(users, seed=1):
+    """Kolejne teksty zapytań inline – jak wysyła je Telegram."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(MODELS))]
+    for _ in range(users):
+        model = rng.choices(MODELS, weights)[0]
+        vendor = "" if model.startswith(("Apple", "Ryzen", "Celeron", "Pentium")) else rng.choice(VENDORS)
+        text = vendor + model
+        for end in range(1, len(text) + 1):
+            yield text[:end]
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def timed(fn, queries):
+    times = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return percentile(times, 0.5) * 1e6, percentile(times, 0.99) * 1e6, sum(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    limit = args.limit
+
+    evaluator._ensure_verdict_table()
+    tracemalloc.start()
+    evaluator.warm_suggestions()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # czas osobno – tracemalloc kilkukrotnie spowalnia budowę
+    evaluator._reset_prefix_index()
+    started = time.perf_counter()
+    evaluator.warm_suggestions()
+    build = time.perf_counter() - started
+    print(f"indeks: {len(evaluator._prefix_index())} kluczy, budowa {build * 1e3:.0f} ms, "
+          f"{memory / 2 ** 20:.1f} MiB")
+
+    queries = [q for q in keystrokes(args.users) if len(q) >= 2]
+    distinct = len(set(queries))
+    print(f"ruch: {args.users} użytkowników, {len(queries)} zapytań ({distinct} różnych)")
+
+    index = evaluator._prefix_index()
+    from fuzzy import strip_vendor
+    from knowledge_base import normalize
+
+    def uncached(query):
+        index.search(strip_vendor(normalize(query), min_rest=1), limit)
+
+    p50, p99, total = timed(uncached, queries)
+    print(f"bez cache:   p50 {p50:6.1f} µs  p99 {p99:6.1f} µs  ({len(queries) / total:,.0f} zapytań/s)")
+
+    evaluator.CPU_SUGGEST_CACHE.clear()
+    cache = evaluator.CPU_SUGGEST_CACHE
+    before = cache.stats()
+    p50, p99, total = timed(lambda q: evaluator.suggest_cpus(q, limit), queries)
+    stats = cache.stats()
+    hits = stats["hits"] - before["hits"]
+    misses = stats["misses"] - before["misses"]
+    print(f"z cache:     p50 {p50:6.1f} µs  p99 {p99:6.1f} µs  ({len(queries) / total:,.0f} zapytań/s), "
+          f"trafienia {hits / (hits + misses):.1%}, wpisów {stats['size']}")
+
+    import bot
+
+    suggestions = [evaluator.suggest_cpus(q, limit) for q in queries]
+    tenant = bot.TENANTS.get("")
+    build_articles = bot._articles.__wrapped__
+    p50, p99, _ = timed(lambda s: build_articles(s, tenant), suggestions[:2000])
+    print(f"artykuły bez cache: p50 {p50:6.1f} µs  p99 {p99:6.1f} µs")
+    bot._articles.cache_clear()
+    p50, p99, _ = timed(lambda s: bot._articles(s, tenant), suggestions)
+    info = bot._articles.cache_info()
+    print(f"artykuły z cache:   p50 {p50:6.1f} µs  p99 {p99:6.1f} µs  "
+          f"trafienia {info.hits / (info.hits + info.misses):.1%}")
+
+    print()
+    import verdict_table
+
+    listed = set(verdict_table.load_models(evaluator.CPU_MODELS_PATH))
+    known = (
+        set(evaluator.NORMALIZED_CPU_OVERRIDES) | evaluator.INTEL_N_FORCE
+        | set(evaluator.APPLE_SUGGESTIONS)
+    )
+    failed = False
+    for query in ("i5-12", "intel core i7-11", "ryzen 5 55", "n1", "apple m", "i5-1200", "i7-1"):
+        found = evaluator.suggest_cpus(query, 5)
+        names = ", ".join(f"{name} ({verdict})" for name, verdict in found)
+        print(f"{query!r:>20} -> {names}")
+        # wpisy z bazy wiedzy mają nazwy znormalizowane – porównujemy klucze
+        kinds = [
+            "baza" if name in known or normalize(name) in known else
+            "lista" if name in listed else "?"
+            for name, _ in found
+        ]
+        if "?" in kinds or kinds != sorted(kinds):
+            print(f"  BŁĄD: spoza listy albo baza wiedzy nie pierwsza: {kinds}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Koszt instrumentacji: Histogram.observe() / Counter.inc() w jednym
+i w kilku wątkach, porównany z pustą pętlą, oraz czas renderowania /metrics.
+
+Uruchomienie: python benchmarks/bench_metrics.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from metrics import Counter, Histogram, REGISTRY, stage
+
+N = 1_000_000
+
+
+def loop_empty(n):
+    value = 0.0002
+    for _ in range(n):
+        pass
+    return value
+
+
+def loop_observe(hist, n):
+    value = 0.0002
+    for _ in range(n):
+        hist.observe(value)
+
+
+def loop_inc(counter, n):
+    for _ in range(n):
+        counter.inc()
+
+
+def per_call_ns(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) / N * 1e9
+
+
+def threaded(fn, target, threads):
+    workers = [
+        threading.Thread(target=fn, args=(target, N // threads)) for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - start) / N * 1e9
+
+
+def main():
+    empty = per_call_ns(loop_empty, N)
+    hist = Histogram()
+    counter = Counter()
+    print(f"pusta pętla:            {empty:6.1f} ns/iter")
+    print(f"Histogram.observe():    {per_call_ns(loop_observe, hist, N) - empty:6.1f} ns")
+    print(f"Counter.inc():          {per_call_ns(loop_inc, counter, N) - empty:6.1f} ns")
+
+    for threads in (4, 16):
+        hist = Histogram()
+        ns = threaded(loop_observe, hist, threads) - empty
+        _, count, _ = hist.snapshot()
+        print(f"observe() x{threads:<2} wątków:   {ns:6.1f} ns  (zliczone {count}/{N})")
+
+    # render przy wypełnionych histogramach wszystkich etapów
+    for name in ("process_update", "reply", "evaluate_hardware"):
+        loop_observe(stage(name), 1000)
+    start = time.perf_counter()
+    text = REGISTRY.render()
+    print(f"render /metrics:        {(time.perf_counter() - start) * 1e3:6.2f} ms ({len(text)} B)")
+
+
+if __name__ == "__main__":
+    main()
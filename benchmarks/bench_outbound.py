@@ -0,0 +1,152 @@
+"""
+Harmonogram wysyłki (outbound.OutboundScheduler) w symulacji szczytu:
+N uczniów naraz dostaje wynik oceny + ponowne menu. Atrapa Telegrama
+odrzuca (429 RetryAfter) ponad 30 wiadomości w ciągu sekundy i drugą
+wiadomość do czatu szybciej niż po 0.9 s; każde wywołanie trwa ~50 ms.
+
+Warianty:
+  bez harmonogramu     – wszystko od razu, 429 = wiadomość stracona
+  bez sklejania        – kubełki + priorytety
+  harmonogram          – kubełki + priorytety + sklejanie wynik+menu
+  limit zawyżony 35/s  – jak wyżej, ale za szybko: 429 muszą się ponowić
+
+Uruchomienie: python benchmarks/bench_outbound.py [--students 300] [--spread 2]
+(domyślnie 10× szczyt z jednej klasy – 30 uczniów)
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from telegram.error import RetryAfter
+
+from outbound import OutboundScheduler, PRIORITY_MENU, PRIORITY_RESULT
+
+logging.getLogger("outbound").setLevel(logging.ERROR)
+
+GLOBAL_LIMIT = 30       # wiadomości / s na bota
+CHAT_MIN_GAP = 0.9      # s między wiadomościami do jednego czatu
+API_LATENCY = 0.05
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.accepted = deque()
+        self.last_per_chat = {}
+        self.calls = 0
+        self.rejected = 0
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.calls += 1
+        await asyncio.sleep(API_LATENCY * random.uniform(0.8, 1.2))
+        now = time.monotonic()
+        while self.accepted and now - self.accepted[0] > 1.0:
+            self.accepted.popleft()
+        last = self.last_per_chat.get(chat_id)
+        if len(self.accepted) >= GLOBAL_LIMIT or (last is not None and now - last < CHAT_MIN_GAP):
+            self.rejected += 1
+            raise RetryAfter(1)
+        self.accepted.append(now)
+        self.last_per_chat[chat_id] = now
+        return {"chat_id": chat_id, "text": text}
+
+
+async def student(chat_id, delay, send, latencies):
+    await asyncio.sleep(delay)
+    started = time.monotonic()
+
+    async def one(kind, text, priority, parse_mode=None):
+        try:
+            await send(chat_id, text, priority, parse_mode)
+        except RetryAfter:
+            latencies["lost"] += 1
+            return
+        latencies[kind].append(time.monotonic() - started)
+
+    # jak bot._schedule_reply: obie wiadomości w kolejce, zanim pierwsza wyjdzie
+    result = asyncio.create_task(one("wynik", "✅ Roblox Studio powinno działać płynnie.", PRIORITY_RESULT))
+    menu = asyncio.create_task(one("menu", "*Wybierz opcję:*\n1️⃣ Sprawdź sprzęt", PRIORITY_MENU, "Markdown"))
+    await asyncio.gather(result, menu)
+
+
+async def run_variant(args, scheduler):
+    telegram = FakeTelegram()
+    latencies = {"wynik": [], "menu": [], "lost": 0}
+
+    if scheduler is None:
+        async def send(chat_id, text, priority, parse_mode):
+            return await telegram.send_message(chat_id, text, parse_mode)
+    else:
+        await scheduler.initialize()
+
+        async def send(chat_id, text, priority, parse_mode):
+            data = {"chat_id": chat_id, "text": text}
+            if parse_mode:
+                data["parse_mode"] = parse_mode
+            return await scheduler.process_request(
+                callback=lambda: telegram.send_message(data["chat_id"], data["text"], data.get("parse_mode")),
+                args=(), kwargs={}, endpoint="sendMessage", data=data,
+                rate_limit_args={"priority": priority},
+            )
+
+    random.seed(1)
+    start = time.monotonic()
+    await asyncio.gather(*(
+        student(1000 + i, random.uniform(0, args.spread), send, latencies)
+        for i in range(args.students)
+    ))
+    elapsed = time.monotonic() - start
+    stats = None
+    if scheduler is not None:
+        stats = scheduler.stats()
+        await scheduler.shutdown()
+    return telegram, latencies, elapsed, stats
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def fmt(values):
+    values = sorted(values)
+    if not values:
+        return f"{'-':>20}"
+    return f"{percentile(values, 50):>6.2f} {percentile(values, 99):>6.2f} {values[-1]:>6.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--spread", type=float, default=2.0, help="w ilu sekundach przychodzą uczniowie")
+    args = parser.parse_args()
+
+    variants = {
+        "bez harmonogramu": lambda: None,
+        "bez sklejania": lambda: OutboundScheduler(merge_messages=False),
+        "harmonogram": lambda: OutboundScheduler(),
+        "limit zawyżony 35/s": lambda: OutboundScheduler(global_rate=35.0, global_burst=10),
+    }
+    print(f"uczniów: {args.students} w {args.spread:.0f} s, limit atrapy: {GLOBAL_LIMIT}/s, "
+          f"czat co {CHAT_MIN_GAP} s, wywołanie ~{API_LATENCY * 1e3:.0f} ms")
+    print(f"{'wariant':>20} {'wywołań':>8} {'429':>5} {'stracone':>9} {'sklejone':>9} "
+          f"{'wynik p50/p99/max s':>21} {'menu p50/p99/max s':>21} {'czas s':>7}")
+    for name, make in variants.items():
+        telegram, latencies, elapsed, stats = asyncio.run(run_variant(args, make()))
+        merged = stats["merged"] if stats else 0
+        print(
+            f"{name:>20} {telegram.calls:>8} {telegram.rejected:>5} {latencies['lost']:>9} {merged:>9} "
+            f"{fmt(latencies['wynik']):>21} {fmt(latencies['menu']):>21} {elapsed:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
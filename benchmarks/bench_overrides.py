@@ -0,0 +1,55 @@
+"""
+Mikrobenchmark: dopasowanie EXACT_CPU_OVERRIDES.
+Stara pętla `key in norm_cpu` vs automat Aho-Corasick.
+
+Uruchomienie: python benchmarks/bench_overrides.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from evaluator import CPU_OVERRIDE_MATCHER, NORMALIZED_CPU_OVERRIDES, normalize
+
+
+INPUTS = [
+    "i5-8250U",
+    "Intel Core i7-1165G7 @ 2.80GHz",
+    "Ryzen 5 5500U",
+    "Intel N100",
+    "i3-6100u",
+    "Apple M1",
+    "Intel(R) Core(TM) i5-1035G1 CPU @ 1.00GHz",
+    "cos zupelnie nieznanego",
+]
+
+
+def linear_scan(norm_cpu: str):
+    for key, value in NORMALIZED_CPU_OVERRIDES.items():
+        if key in norm_cpu:
+            return value
+    return None
+
+
+def main():
+    normalized = [normalize(x) for x in INPUTS]
+    number = 20000
+
+    def run_linear():
+        for n in normalized:
+            linear_scan(n)
+
+    def run_matcher():
+        for n in normalized:
+            CPU_OVERRIDE_MATCHER.lookup(n)
+
+    print(f"klucze: {len(NORMALIZED_CPU_OVERRIDES)}, wejścia: {len(normalized)}")
+    for name, fn in (("linear", run_linear), ("aho-corasick", run_matcher)):
+        best = min(timeit.repeat(fn, number=number, repeat=5))
+        per_call = best / (number * len(normalized)) * 1e6
+        print(f"{name:>14}: {per_call:.2f} µs / wejście")
+
+
+if __name__ == "__main__":
+    main()
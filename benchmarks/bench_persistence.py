@@ -0,0 +1,195 @@
+"""
+Wspólny stan rozmów (persistence.SQLitePersistence) w dwóch procesach
+na jednym pliku SQLite (WAL) – tak jak dwa workery uvicorn.
+
+  1. zapisy równoległe: oba procesy naraz, każdy na swoich użytkownikach
+     i czatach (ta sama tabela, ten sam plik): refresh -> licznik + 1 ->
+     update -> flush, plus stany rozmów. Na końcu świeże połączenie musi
+     zobaczyć w każdym wpisie dokładnie tyle zapisów, ile ich było, bez
+     błędów "database is locked".
+  2. przekazanie stanu: kolejne wiadomości tego samego użytkownika trafiają
+     na zmianę do procesu A i B; każdy musi zobaczyć stan zapisany przez
+     drugi (licznik, tryb rozmowy), także usunięcie (drop_user_data).
+
+Rozbieżność albo wyjątek w procesie -> kod wyjścia 1.
+
+Uruchomienie: python benchmarks/bench_persistence.py [--users 200] [--rounds 20]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from persistence import SQLitePersistence
+
+
+# --------------------------
+# Proces roboczy – polecenia przez Pipe
+# --------------------------
+
+async def _burst(store, cache, name, users, rounds):
+    for _ in range(rounds):
+        for user_id in users:
+            data = cache.setdefault(user_id, {})
+            await store.refresh_user_data(user_id, data)
+            data["count"] = data.get("count", 0) + 1
+            data["by"] = name
+            await store.update_user_data(user_id, data)
+            await store.update_conversation("check", (user_id, user_id), data["count"])
+        # jeden przebieg Application -> jedna transakcja
+        await store.flush()
+
+
+async def _step(store, cache, user_id, drop):
+    """Jedna wiadomość: refresh, odczyt, zmiana, zapis; zwraca stan sprzed zmiany."""
+    data = cache.setdefault(user_id, {})
+    await store.refresh_user_data(user_id, data)
+    seen = dict(data)
+    if drop:
+        data.clear()
+        await store.drop_user_data(user_id)
+    else:
+        data["count"] = data.get("count", 0) + 1
+        data["mode"] = "check_hardware" if data["count"] % 2 else "choose_os"
+        await store.update_user_data(user_id, data)
+    await store.flush()
+    return seen
+
+
+def worker(path, name, conn):
+    loop = asyncio.new_event_loop()
+    store = SQLitePersistence(path, update_interval=0.05)
+    cache = {}   # user_data tego procesu (jak Application.user_data)
+    while True:
+        command, *args = conn.recv()
+        if command == "stop":
+            break
+        try:
+            if command == "burst":
+                started = time.perf_counter()
+                loop.run_until_complete(_burst(store, cache, name, *args))
+                conn.send(("ok", time.perf_counter() - started))
+            elif command == "step":
+                conn.send(("ok", loop.run_until_complete(_step(store, cache, *args))))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    store.close()
+    loop.close()
+
+
+# --------------------------
+# Scenariusze
+# --------------------------
+
+def call(conn, *command):
+    conn.send(command)
+    status, value = conn.recv()
+    if status == "error":
+        raise RuntimeError(value)
+    return value
+
+
+def concurrent_writes(path, conns, users, rounds):
+    halves = {"A": list(range(0, users, 2)), "B": list(range(1, users, 2))}
+    started = time.perf_counter()
+    for name, conn in conns.items():
+        conn.send(("burst", halves[name], rounds))
+    errors = []
+    for name, conn in conns.items():
+        status, value = conn.recv()
+        if status == "error":
+            errors.append(f"{name}: {value}")
+    elapsed = time.perf_counter() - started
+    writes = users * rounds
+
+    check = sqlite3.connect(path)
+    rows = dict(check.execute("SELECT id, data FROM user_data").fetchall())
+    versions = dict(check.execute("SELECT id, version FROM user_data").fetchall())
+    states = dict(check.execute("SELECT key, state FROM conversations WHERE name = 'check'").fetchall())
+    check.close()
+
+    wrong = 0
+    for name, ids in halves.items():
+        for user_id in ids:
+            data = json.loads(rows.get(user_id, "{}"))
+            state = states.get(json.dumps([user_id, user_id], separators=(",", ":")))
+            if (data.get("count") != rounds or data.get("by") != name
+                    or versions.get(user_id) != rounds or state != str(rounds)):
+                wrong += 1
+    print(f"zapisy równoległe: 2 procesy, {writes} zapisów user_data + {writes} stanów rozmów "
+          f"w {elapsed:.2f} s ({2 * writes / elapsed:,.0f} wierszy/s), "
+          f"błędne wpisy: {wrong}, błędy: {len(errors)}")
+    for error in errors:
+        print(f"  {error}")
+    return bool(wrong or errors)
+
+
+def handoff(conns, users, rounds):
+    """Wiadomości użytkownika na zmianę w A i B; co 5. runda – usunięcie w jednym z nich."""
+    base = 1_000_000   # inni użytkownicy niż w zapisach równoległych
+    expected = {base + i: 0 for i in range(users)}
+    order = ("A", "B")
+    wrong = 0
+    started = time.perf_counter()
+    for r in range(rounds):
+        for i, user_id in enumerate(expected):
+            name = order[(r + i) % 2]
+            drop = r % 5 == 4
+            seen = call(conns[name], "step", user_id, drop)
+            count = expected[user_id]
+            want = {} if count == 0 else {
+                "count": count, "mode": "check_hardware" if count % 2 else "choose_os",
+            }
+            if seen != want:
+                wrong += 1
+                if wrong <= 5:
+                    print(f"  {name} użytkownik {user_id}, runda {r}: oczekiwano {want}, jest {seen}")
+            expected[user_id] = 0 if drop else count + 1
+    elapsed = time.perf_counter() - started
+    steps = users * rounds
+    print(f"przekazanie stanu: {steps} wiadomości na zmianę w A i B "
+          f"({elapsed / steps * 1e3:.2f} ms na wiadomość z zapisem), niezgodne: {wrong}")
+    return bool(wrong)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "state.sqlite3")
+    ctx = multiprocessing.get_context("spawn")
+    conns, procs = {}, []
+    for name in ("A", "B"):
+        ours, theirs = ctx.Pipe()
+        proc = ctx.Process(target=worker, args=(path, name, theirs))
+        proc.start()
+        conns[name] = ours
+        procs.append(proc)
+
+    failed = False
+    try:
+        failed |= concurrent_writes(path, conns, args.users, args.rounds)
+        failed |= handoff(conns, args.users // 4, args.rounds)
+    except RuntimeError as e:
+        print(f"BŁĄD: {e}")
+        failed = True
+    finally:
+        for conn in conns.values():
+            conn.send(("stop",))
+        for proc in procs:
+            proc.join(30)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Przepustowość evaluate_cpu (wiadomości / s): tabela reguł z jednym
+przebiegiem regexa vs dawna kaskada sprawdzeń `in` / re.search.
+
+Uruchomienie: python benchmarks/bench_rules.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from evaluator import INTEL_N_FORCE, apply_cpu_rules, normalize, parse_cpu
+
+
+MESSAGES = [
+    "Intel Core i5-8250U",
+    "i7-10750H",
+    "Ryzen 5 5500U",
+    "AMD Ryzen 3 3200U",
+    "Intel N100",
+    "Celeron N4020",
+    "Apple M1",
+    "Snapdragon X Elite",
+    "Intel Core Ultra 7 155H",
+    "i3-10110u",
+    "Intel(R) Core(TM) i5-4200U CPU @ 1.60GHz",
+    "nie wiem jaki",
+]
+
+
+def legacy_rules(cpu_name: str) -> str:
+    raw = cpu_name.lower()
+    norm = normalize(cpu_name)
+    for n in INTEL_N_FORCE:
+        if n in raw:
+            return "VERY_GOOD"
+    if "celeron" in norm or "atom" in norm:
+        return "NO"
+    if "ryzen" in norm and re.search(r"ryzen\s*3\s*(2200u|2300u|3200u)", raw):
+        return "NO"
+    if "apple m" in raw or re.search(r"\bm[123]\b", raw):
+        return "VERY_GOOD"
+    if "snapdragon x" in raw:
+        return "VERY_GOOD"
+    if "snapdragon" in raw:
+        return "NO"
+    if "core ultra" in raw:
+        return "VERY_GOOD"
+    m = re.search(r"(i[3579]-\d{4,5}[a-z]*)", raw)
+    if m:
+        model = m.group(1)
+        num = re.search(r"i[3579]-(\d{4,5})", model).group(1)
+        gen = int(num[:2]) if len(num) == 5 else int(num[0])
+        if gen <= 4:
+            return "NO"
+        if any(x in model for x in ("h", "hq", "hk", "hx", "p")):
+            return "VERY_GOOD"
+        if model.startswith("i3") and gen >= 12 and not model.endswith("u"):
+            return "VERY_GOOD"
+        if model.startswith("i3"):
+            return "OK"
+        if model.startswith("i5") and gen in (8, 9):
+            return "OK"
+        if model.startswith(("i5", "i7", "i9")):
+            return "VERY_GOOD"
+    if "ryzen" in norm:
+        m = re.search(r"ryzen\s*([3579])", raw)
+        if not m:
+            return "UNKNOWN"
+        return "OK" if m.group(1) == "3" else "VERY_GOOD"
+    return "UNKNOWN"
+
+
+def rule_table(cpu_name: str) -> str:
+    return apply_cpu_rules(parse_cpu(cpu_name.lower()))
+
+
+def throughput(fn, rounds=20000):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for msg in MESSAGES:
+            fn(msg)
+    return rounds * len(MESSAGES) / (time.perf_counter() - start)
+
+
+def main():
+    for msg in MESSAGES:
+        assert legacy_rules(msg) == rule_table(msg), msg
+
+    for name, fn in (("kaskada", legacy_rules), ("tabela reguł", rule_table)):
+        best = max(throughput(fn) for _ in range(3))
+        print(f"{name:>13}: {best:,.0f} wiadomości / s")
+
+
+if __name__ == "__main__":
+    main()
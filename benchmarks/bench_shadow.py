@@ -0,0 +1,226 @@
+"""
+Tryb cienia (shadow.ShadowEvaluator): koszt dla obsługi wiadomości
+i poprawność zliczonych rozbieżności.
+
+Kandydat to źródło bazy CPU z data/cpu_overrides.json z odwróconymi
+werdyktami kilkunastu modeli. Strumień wejść "CPU, RAM" (modele
+z verdict_table.enumerate_sku_space, odwrócone modele, śmieci) jest
+oceniany evaluate_hardware w pętli zdarzeń w stałym tempie; mierzone są
+czas evaluate_hardware (p50 / p99) i opóźnienie pętli (zegar co 1 ms):
+
+  "wyłączony" – bez obserwatora
+  "proces"    – ShadowEvaluator (proces kandydata, nice)
+  "wątek"     – ten sam kandydat w tym procesie, paczki w puli wątków
+                (dla porównania – dlaczego nie wątek)
+
+Rozbieżności z wariantu "proces" muszą dotyczyć dokładnie tych modeli,
+które różnią się przy ocenie wszystkich wejść oboma wersjami wprost,
+a kandydat z kopią evaluator.py bez zmian (bez zamrożonej tabeli)
+nie może się różnić od aktywnego ani razu – inaczej kod wyjścia 1.
+
+Uruchomienie: python benchmarks/bench_shadow.py [--rate 2000] [--seconds 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+os.environ["CPU_KB_WATCH_INTERVAL"] = "0"
+
+import evaluator
+from knowledge_base import normalize
+from shadow import ShadowEvaluator, load_candidate
+from verdict_table import enumerate_sku_space
+
+FLIP = {"NO": "OK", "OK": "VERY_GOOD", "VERY_GOOD": "NO"}
+RAMS = ("8GB RAM", "16 GB", "16GB", "32gb ram", "4GB")
+JUNK = ("laptop dell", "nie wiem, 8GB", "i5, 8GB", "Pentium, 16GB", "komputer szkolny, 8 GB")
+
+
+class ThreadShadow(ShadowEvaluator):
+    """Ten sam kandydat, ale w tym procesie (pula wątków pętli)."""
+
+    async def _spawn(self):
+        candidate = await asyncio.to_thread(load_candidate, self.path, self.kb_source)
+        candidate.warm_verdict_cache()
+        return candidate
+
+    @staticmethod
+    async def _kill(proc):
+        pass
+
+    async def _evaluate(self, inputs) -> list:
+        classify = self._proc.classify_hardware
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [classify(user_input)[0] for user_input in inputs])
+
+
+def make_candidate_source(directory, count, rng):
+    with open(os.path.join(ROOT, "data", "cpu_overrides.json"), encoding="utf-8") as f:
+        source = json.load(f)
+    flipped = {}
+    for entry in rng.sample(source["entries"], count):
+        if entry["verdict"] in FLIP:
+            flipped[entry["cpu"]] = (entry["verdict"], FLIP[entry["verdict"]])
+            entry["verdict"] = FLIP[entry["verdict"]]
+    path = os.path.join(directory, "cpu_overrides.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(source, f, ensure_ascii=False)
+    return path, flipped
+
+
+def make_inputs(count, flipped, rng):
+    skus = list(enumerate_sku_space())
+    cpus = rng.sample(skus, min(len(skus), 5000)) + list(flipped) * 20
+    inputs = []
+    for _ in range(count):
+        if rng.random() < 0.05:
+            inputs.append(rng.choice(JUNK))
+        else:
+            inputs.append(f"{rng.choice(cpus)}, {rng.choice(RAMS)}")
+    return inputs
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run_traffic(inputs, rate, shadow=None):
+    """evaluate_hardware w tempie `rate`/s; zwraca czasy oceny i opóźnienia pętli (s)."""
+    evaluator.VERDICT_OBSERVERS.clear()
+    evaluator.CPU_VERDICT_CACHE.clear()
+    evaluator.warm_verdict_cache()
+    if shadow is not None:
+        assert await shadow.start(), "kandydat się nie wczytał"
+        evaluator.VERDICT_OBSERVERS.append(shadow.observe)
+
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    evaluate_times = []
+    interval = 1 / rate
+    started = time.perf_counter()
+    for i, user_input in enumerate(inputs):
+        delay = started + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        t = time.perf_counter()
+        evaluator.evaluate_hardware(user_input)
+        evaluate_times.append(time.perf_counter() - t)
+    if shadow is not None:
+        # kandydat dokańcza kolejkę, zanim zatrzymamy pomiar
+        while shadow.stats()["pending"] or shadow.compared < shadow.sampled - shadow.errors:
+            await asyncio.sleep(0.05)
+    done = True
+    await tick
+    evaluator.VERDICT_OBSERVERS.clear()
+    if shadow is not None:
+        await shadow.stop()
+    return evaluate_times, lags
+
+
+def observe_cost(shadow, inputs, repeat=5):
+    shadow._task = object()          # observe działa tylko po start()
+    shadow.maxsize = len(inputs) + 1
+    best = None
+    for _ in range(repeat):
+        shadow._pending.clear()
+        shadow._wakeup = asyncio.Event()
+        t = time.perf_counter()
+        for user_input in inputs:
+            shadow.observe(user_input, "OK")
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    shadow._task = None
+    shadow._pending.clear()
+    return best / len(inputs) * 1e9
+
+
+async def main_async(args):
+    rng = random.Random(11)
+    directory = tempfile.mkdtemp()
+    kb_source, flipped = make_candidate_source(directory, args.flips, rng)
+    inputs = make_inputs(int(args.rate * args.seconds), flipped, rng)
+
+    print(f"{len(inputs)} wejść, {args.rate}/s, odwróconych modeli: {len(flipped)}")
+    print(f"observe(): {observe_cost(ShadowEvaluator(kb_source=kb_source), inputs):.0f} ns na wejście\n")
+
+    print(f"{'wariant':>10} {'p50 µs':>8} {'p99 µs':>8} {'pętla p50 ms':>13} {'pętla p99 ms':>13} "
+          f"{'pętla max ms':>13} {'porównane':>10} {'rozbieżne':>10}")
+    failed = False
+    process = None
+    for name, shadow in (
+        ("wyłączony", None),
+        # examples: wszystkie rozbieżne wejścia, nie tylko najczęstsze
+        ("proces", ShadowEvaluator(kb_source=kb_source, sample_every=args.sample, examples=1000)),
+        ("wątek", ThreadShadow(kb_source=kb_source, sample_every=args.sample)),
+    ):
+        times, lags = await run_traffic(inputs, args.rate, shadow)
+        stats = shadow.stats() if shadow else {"compared": "-", "disagreed": "-"}
+        print(f"{name:>10} {statistics.median(times) * 1e6:>8.1f} {pct(times, 0.99) * 1e6:>8.1f} "
+              f"{statistics.median(lags) * 1e3:>13.3f} {pct(lags, 0.99) * 1e3:>13.3f} "
+              f"{max(lags) * 1e3:>13.3f} {stats['compared']:>10} {stats['disagreed']:>10}")
+        if name == "proces":
+            process = shadow
+
+    # rozbieżności: te same modele i pary werdyktów co ocena wszystkich
+    # wejść oboma wersjami wprost (odwrócony wpis może pokrywać też inne
+    # modele przez wzorzec)
+    candidate = load_candidate(kb_source=kb_source)
+    expected = {}
+    for user_input in set(inputs):
+        active, other = evaluator.classify_hardware(user_input), candidate.classify_hardware(user_input)
+        if active[0] != other[0]:
+            expected[normalize(user_input.split(",", 1)[0])] = (active[0], other[0])
+    got = {}
+    for row in process.disagreements(limit=1000):
+        for example in row["inputs"]:
+            got[normalize(example["input"].split(",", 1)[0])] = (row["active"], row["candidate"])
+    # przy próbkowaniu (--sample > 1) część rozbieżnych modeli może nie trafić do próbki
+    checked = set(expected) | set(got) if args.sample == 1 else set(got)
+    wrong = {cpu for cpu in checked if expected.get(cpu) != got.get(cpu)}
+    for cpu in sorted(wrong):
+        print(f"  {cpu}: oczekiwano {expected.get(cpu)}, jest {got.get(cpu)}")
+    print(f"\nrozbieżne modele: {len(got)}, oczekiwane: {len(expected)}, niezgodne: {len(wrong)}")
+    failed |= bool(wrong) or bool(process.errors)
+
+    # kopia evaluator.py bez zmian: bez zamrożonej tabeli, te same werdykty
+    same = os.path.join(directory, "evaluator.py")
+    shutil.copy(os.path.join(ROOT, "evaluator.py"), same)
+    control = ShadowEvaluator(path=same)
+    await run_traffic(inputs, args.rate * 4, control)
+    print(f"kopia evaluator.py bez zmian: porównane {control.compared}, rozbieżne {control.disagreed}")
+    failed |= bool(control.disagreed) or control.compared == 0
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=2000, help="wejść na sekundę")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--sample", type=int, default=1, help="SHADOW_SAMPLE")
+    parser.add_argument("--flips", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(main_async(args)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Zimny start bota: czas od uruchomienia procesu `python bot.py` do
+odpowiedzi na pierwszy update (/start) i do pierwszej oceny sprzętu.
+Bot API zastępuje atrapa (benchmarks/stub_bot_api.py) z opóźnieniem
+udającym sieć do api.telegram.org.
+
+Warianty: STARTUP_MODE=full, fast bez snapshotu, fast ze snapshotem
+(snapshot budowany przed pomiarem: python verdict_table.py snapshot).
+
+Dalej, w osobnych procesach:
+  - ocena CPU na pętli zdarzeń, gdy wątek (finish_startup) wczytuje
+    tabelę werdyktów: odpowiadają reguły, bez czekania na wczytanie
+    (> 20 ms albo inny werdykt niż z tabeli -> kod wyjścia 1); max lag
+    pętli to GIL zajęty przez json / pickle w wątku
+  - koszt importów odłożonych do chwili użycia (persistence + sqlite3
+    tylko z STATE_DB_PATH; uvicorn tylko pod __main__ – `python bot.py`
+    i tak go importuje, zysk jest przy imporcie modułu bot)
+
+Uruchomienie: python benchmarks/bench_startup.py [--runs 5] [--api-delay 0.05]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+
+import httpx
+
+from bench_webhook import make_update
+from stub_bot_api import start_in_subprocess
+
+VARIANTS = {
+    "full": {"STARTUP_MODE": "full"},
+    "fast, bez snapshotu": {"STARTUP_MODE": "fast", "CPU_SNAPSHOT_PATH": ""},
+    "fast + snapshot": {"STARTUP_MODE": "fast"},
+}
+
+
+def post_until_up(client, url, payload, deadline):
+    while True:
+        try:
+            return client.post(url, json=payload)
+        except httpx.TransportError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.005)
+
+
+def one_run(args, extra_env, user_id):
+    env = dict(
+        os.environ,
+        TELEGRAM_TOKEN="123456:BENCH",
+        WEBHOOK_URL="https://bench.invalid",
+        TELEGRAM_BASE_URL=f"http://127.0.0.1:{args.api_port}/bot",
+        PORT=str(args.port),
+        CPU_KB_WATCH_INTERVAL="0",
+        GSHEET_WEBHOOK_URL="",
+        **extra_env,
+    )
+    url = f"http://127.0.0.1:{args.port}/webhook"
+    httpx.post(f"http://127.0.0.1:{args.api_port}/reset")
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "bot.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=30) as client:
+            response = post_until_up(client, url, make_update(user_id, "/start"), start + 60)
+            first = time.perf_counter() - start
+            assert response.status_code == 200, response.status_code
+            client.post(url, json=make_update(user_id, "1"))
+            client.post(url, json=make_update(user_id, "i5-8250U, 8GB RAM"))
+            verdict = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait(30)
+    calls = httpx.get(f"http://127.0.0.1:{args.api_port}/stats").json()
+    return first, verdict, calls
+
+
+def probe_table_load(model="i7-1165g7"):
+    """W osobnym procesie: ocena na pętli w trakcie wczytywania tabeli."""
+    import threading
+
+    sys.path.insert(0, ROOT)
+    import evaluator
+
+    async def run():
+        lags = []
+        done = False
+
+        async def pinger():
+            loop = asyncio.get_running_loop()
+            while not done:
+                t = loop.time()
+                await asyncio.sleep(0.002)
+                lags.append(loop.time() - t - 0.002)
+
+        ping = asyncio.create_task(pinger())
+        loader = threading.Thread(target=evaluator.warm_verdict_cache)
+        loader.start()
+        while not evaluator._TABLE_LOCK.locked() and not evaluator._TABLE_LOADED:
+            await asyncio.sleep(0)
+        started = time.perf_counter()
+        during = evaluator.evaluate_cpu(model)
+        blocked = time.perf_counter() - started
+        await asyncio.to_thread(loader.join)
+        done = True
+        await ping
+        return during, blocked, evaluator._table_lookup(model), max(lags)
+
+    during, blocked, from_table, lag = asyncio.run(run())
+    print(f"{during} {from_table} {blocked:.6f} {lag:.6f}")
+
+
+def table_load_on_loop(extra_env) -> bool:
+    env = dict(os.environ, **extra_env)
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--probe"],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    during, from_table, blocked, lag = out[0], out[1], float(out[2]), float(out[3])
+    ok = blocked < 0.02 and during == from_table
+    print(f"  {'snapshot' if extra_env.get('CPU_SNAPSHOT_PATH') != '' else 'plik .json.gz':>13}: "
+          f"ocena {blocked * 1e3:5.2f} ms ({during}, z tabeli {from_table}), "
+          f"max lag pętli {lag * 1e3:5.1f} ms{'' if ok else '  BŁĄD'}")
+    return ok
+
+
+def deferred_imports():
+    code = (
+        "import time, telegram.ext, fastapi\n"
+        "for name in ('persistence', 'uvicorn'):\n"
+        "    t = time.perf_counter(); __import__(name)\n"
+        "    print(name, time.perf_counter() - t)\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    for line in out.splitlines():
+        name, seconds = line.split()
+        print(f"  {name:>13}: {float(seconds) * 1e3:5.1f} ms")
+
+
+def main():
+    if sys.argv[1:] == ["--probe"]:
+        probe_table_load()
+        return
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--api-port", type=int, default=18091)
+    parser.add_argument("--api-delay", type=float, default=0.05, help="opóźnienie atrapy Bot API (s)")
+    args = parser.parse_args()
+
+    subprocess.run([sys.executable, "verdict_table.py", "snapshot"], cwd=ROOT, check=True)
+    stub = start_in_subprocess(args.api_port, args.api_delay)
+    try:
+        print(f"opóźnienie Bot API: {args.api_delay * 1e3:.0f} ms, przebiegów: {args.runs}")
+        print(f"{'wariant':>22} {'1. odpowiedź ms':>16} {'1. werdykt ms':>14}  wywołania API (ostatni przebieg)")
+        results = {name: ([], []) for name in VARIANTS}
+        calls = {}
+        # warianty na przemian – wolne dryfy maszyny rozkładają się równo
+        for run in range(args.runs):
+            for name, extra_env in VARIANTS.items():
+                first, verdict, calls[name] = one_run(args, extra_env, user_id=1000 + run)
+                results[name][0].append(first)
+                results[name][1].append(verdict)
+        for name, (firsts, verdicts) in results.items():
+            print(
+                f"{name:>22} {statistics.median(firsts) * 1e3:>16.0f} "
+                f"{statistics.median(verdicts) * 1e3:>14.0f}  {calls[name]}"
+            )
+    finally:
+        stub.terminate()
+
+    print("\nocena na pętli w trakcie wczytywania tabeli:")
+    ok = table_load_on_loop({"CPU_SNAPSHOT_PATH": ""})
+    ok = table_load_on_loop({}) and ok
+    print("\nodłożone importy (po telegram.ext i fastapi):")
+    deferred_imports()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Raporty systemowe (sysinfo.extract_sysinfo) na syntetycznych plikach
+kilku-kilkunastu MB: msinfo32 .txt (UTF-16 z BOM), msinfo32 .nfo (XML,
+UTF-16) i system_profiler (UTF-8).
+
+  - "na końcu": procesor/RAM dopiero na końcu pliku – pełny przebieg,
+    przepustowość MB/s
+  - "na początku": jak w prawdziwym raporcie (System Summary) – czytanie
+    kończy się po kilku KB
+  - szczyt pamięci (tracemalloc) bez samego pliku wejściowego
+  - limit czasu: 20 MB z budżetem 50 ms
+
+Uruchomienie: python benchmarks/bench_sysinfo.py [--sizes 2 8 20]
+"""
+import argparse
+import codecs
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sysinfo import extract_sysinfo, iter_chunks
+
+MB = 1024 * 1024
+
+TXT_FIELDS = (
+    "Processor\tIntel(R) Core(TM) i5-8250U CPU @ 1.60GHz, 1800 Mhz, 4 Core(s), 8 Logical Processor(s)\t\n"
+    "Installed Physical Memory (RAM)\t8,00 GB\t\n"
+)
+TXT_FILLER = "Driver\tc:\\windows\\system32\\drivers\\{0:06d}.sys\tRunning\tManual\tOK\tNormal\t\n"
+
+NFO_FIELDS = (
+    "<Data>\n<Item><![CDATA[Processor]]></Item>\n"
+    "<Value><![CDATA[AMD Ryzen 5 5500U with Radeon Graphics, 2100 Mhz, 6 Core(s)]]></Value>\n</Data>\n"
+    "<Data>\n<Item><![CDATA[Installed Physical Memory (RAM)]]></Item>\n"
+    "<Value><![CDATA[16,0 GB]]></Value>\n</Data>\n"
+)
+NFO_FILLER = (
+    "<Data>\n<Item><![CDATA[Driver {0:06d}]]></Item>\n"
+    "<Value><![CDATA[c:\\windows\\system32\\drivers\\{0:06d}.sys]]></Value>\n</Data>\n"
+)
+
+MAC_FIELDS = "      Chip: Apple M1\n      Memory: 8 GB\n"
+MAC_FILLER = "          Kext {0:06d}:\n            Version: 1.0.{0}\n            Loaded: Yes\n"
+
+
+def build(fields, filler, size, fields_first, head="", tail=""):
+    parts = [head]
+    if fields_first:
+        parts.append(fields)
+    total = sum(len(p) for p in parts)
+    i = 0
+    while total < size:
+        line = filler.format(i)
+        parts.append(line)
+        total += len(line)
+        i += 1
+    if not fields_first:
+        parts.append(fields)
+    parts.append(tail)
+    return "".join(parts)
+
+
+def make_txt(size, fields_first):
+    text = build(TXT_FIELDS, TXT_FILLER, size // 2, fields_first, "[System Summary]\n\nItem\tValue\t\n")
+    return codecs.BOM_UTF16_LE + text.encode("utf-16-le")
+
+
+def make_nfo(size, fields_first):
+    text = build(
+        NFO_FIELDS, NFO_FILLER, size // 2, fields_first,
+        '<?xml version="1.0" encoding="UTF-16"?>\n<MsInfo>\n<Category name="System Summary">\n',
+        "</Category>\n</MsInfo>\n",
+    )
+    return codecs.BOM_UTF16_LE + text.encode("utf-16-le")
+
+
+def make_mac(size, fields_first):
+    return build(MAC_FIELDS, MAC_FILLER, size, fields_first, "Hardware:\n\n    Hardware Overview:\n\n").encode()
+
+
+def run(data, **limits):
+    start = time.perf_counter()
+    info = extract_sysinfo(iter_chunks(io.BytesIO(data)), **limits)
+    return info, time.perf_counter() - start
+
+
+def peak_memory(data):
+    tracemalloc.start()
+    extract_sysinfo(iter_chunks(io.BytesIO(data)), time_budget=60)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 8, 20], help="rozmiary w MB")
+    args = parser.parse_args()
+
+    formats = {"msinfo32 .txt": make_txt, "msinfo32 .nfo": make_nfo, "system_profiler": make_mac}
+    print(f"{'format':>16} {'MB':>4} {'na końcu ms':>12} {'MB/s':>7} {'na początku ms':>15} "
+          f"{'pamięć KiB':>11}  wynik")
+    for name, make in formats.items():
+        for size in args.sizes:
+            late = make(size * MB, fields_first=False)
+            early = make(size * MB, fields_first=True)
+            info, full = run(late, max_bytes=64 * MB, time_budget=60)
+            _, first = run(early, max_bytes=64 * MB, time_budget=60)
+            peak = peak_memory(late)
+            print(
+                f"{name:>16} {size:>4} {full * 1e3:>12.0f} {len(late) / MB / full:>7.1f} "
+                f"{first * 1e3:>15.2f} {peak / 1024:>11.0f}  {info.cpu}, {info.ram_gb} GB"
+            )
+
+    data = make_nfo(20 * MB, fields_first=False)
+    info, elapsed = run(data, time_budget=0.05)
+    print(f"budżet 50 ms, .nfo 20 MB: przerwano po {elapsed * 1e3:.0f} ms "
+          f"({info.bytes_read / MB:.1f} MB, stopped={info.stopped})")
+    info, elapsed = run(data, max_bytes=4 * MB, time_budget=60)
+    print(f"limit 4 MB, .nfo 20 MB: przerwano po {elapsed * 1e3:.0f} ms "
+          f"({info.bytes_read / MB:.1f} MB, stopped={info.stopped})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Wiele botów w jednym procesie (BOTS_CONFIG) zamiast osobnego wdrożenia
+na bota: pamięć (RSS) i czas startu procesu z N botami oraz koszt
+pierwszego update'u do bota (leniwe initialize: getMe + start()).
+Bot API zastępuje atrapa (benchmarks/stub_bot_api.py) z opóźnieniem
+udającym sieć.
+
+Każdy bot ma w konfiguracji własne menu; na końcu atrapa musi mieć od
+każdego tokenu odpowiedź z jego menu (inaczej kod wyjścia 1).
+
+Uruchomienie: python benchmarks/bench_tenants.py [--bots 1,10,50] [--api-delay 0.02]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+
+import httpx
+
+from bench_webhook import make_update
+from stub_bot_api import start_in_subprocess
+
+
+def rss_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def token(i: int) -> str:
+    return f"{100000 + i}:BENCH"
+
+
+def menu(i: int) -> str:
+    return f"📋 *Menu szkoły {i}*\n\n1️⃣ Sprawdź komputer"
+
+
+def start_bot(args, extra_env):
+    env = dict(
+        os.environ,
+        WEBHOOK_URL="https://bench.invalid",
+        TELEGRAM_BASE_URL=f"http://127.0.0.1:{args.api_port}/bot",
+        PORT=str(args.port),
+        CPU_KB_WATCH_INTERVAL="0",
+        GSHEET_WEBHOOK_URL="",
+        **extra_env,
+    )
+    env.pop("TELEGRAM_TOKEN", None)
+    env.pop("BOTS_CONFIG", None)
+    env.update(extra_env)
+    return subprocess.Popen(
+        [sys.executable, "bot.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(client, port, started, timeout=120):
+    while True:
+        try:
+            if client.get(f"http://127.0.0.1:{port}/metrics").status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() - started > timeout:
+            raise RuntimeError("bot nie wystartował")
+        time.sleep(0.01)
+
+
+def one_run(args, bots: int, multi: bool):
+    """bots=1 i multi=False: dzisiejsze wdrożenie z TELEGRAM_TOKEN."""
+    httpx.post(f"http://127.0.0.1:{args.api_port}/reset")
+    if multi:
+        config = {"bots": {
+            f"szkola-{i}": {"token": token(i), "texts": {"main_menu": menu(i)}}
+            for i in range(bots)
+        }}
+        path = os.path.join(tempfile.mkdtemp(), "bots.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False)
+        env = {"BOTS_CONFIG": path}
+        urls = [f"http://127.0.0.1:{args.port}/webhook/szkola-{i}" for i in range(bots)]
+    else:
+        env = {"TELEGRAM_TOKEN": token(0)}
+        urls = [f"http://127.0.0.1:{args.port}/webhook"]
+
+    started = time.perf_counter()
+    proc = start_bot(args, env)
+    try:
+        with httpx.Client(timeout=30) as client:
+            startup = wait_ready(client, args.port, started)
+            idle = rss_mib(proc.pid)
+            first, warm = [], []
+            for i, url in enumerate(urls):
+                t = time.perf_counter()
+                response = client.post(url, json=make_update(10_000 + i, "/start"))
+                first.append(time.perf_counter() - t)
+                assert response.status_code == 200, response.status_code
+                t = time.perf_counter()
+                client.post(url, json=make_update(10_000 + i, "/start"))
+                warm.append(time.perf_counter() - t)
+            active = rss_mib(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(30)
+
+    sent = httpx.get(f"http://127.0.0.1:{args.api_port}/bots").json()
+    wrong = 0
+    for i in range(len(urls)):
+        expected = menu(i) if multi else None
+        got = sent.get(token(i), {})
+        if got.get("sent") != 2 or (expected is not None and got.get("last") != expected):
+            wrong += 1
+    return {
+        "startup": startup,
+        "idle": idle,
+        "active": active,
+        "first": statistics.median(first),
+        "warm": statistics.median(warm),
+        "wrong": wrong,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bots", default="1,10,50")
+    parser.add_argument("--port", type=int, default=18095)
+    parser.add_argument("--api-port", type=int, default=18096)
+    parser.add_argument("--api-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    stub = start_in_subprocess(args.api_port, args.api_delay)
+    try:
+        print(f"opóźnienie Bot API {args.api_delay * 1e3:.0f} ms")
+        print(f"{'wariant':>20} {'start s':>8} {'RSS MiB':>8} {'RSS akt.':>9} "
+              f"{'1. upd ms':>10} {'kolejny ms':>11} {'błędne':>7}")
+        single = one_run(args, 1, multi=False)
+        rows = [("1 bot (TELEGRAM_TOKEN)", single)]
+        for n in [int(x) for x in args.bots.split(",")]:
+            rows.append((f"{n} botów (BOTS_CONFIG)", one_run(args, n, multi=True)))
+        failed = False
+        for name, r in rows:
+            print(f"{name:>20} {r['startup']:>8.2f} {r['idle']:>8.1f} {r['active']:>9.1f} "
+                  f"{r['first'] * 1e3:>10.1f} {r['warm'] * 1e3:>11.1f} {r['wrong']:>7}")
+            failed |= bool(r["wrong"])
+
+        counts = [int(x) for x in args.bots.split(",")]
+        base = rows[1][1]
+        print("\nkoszt każdego kolejnego bota (względem 1 bota z BOTS_CONFIG):")
+        for n, (_, r) in zip(counts, rows[1:]):
+            if n <= counts[0]:
+                continue
+            extra = n - counts[0]
+            print(f"  {n:>4} botów: RSS bezczynny {(r['idle'] - base['idle']) * 1024 / extra:7.0f} KiB, "
+                  f"po 1. update {(r['active'] - base['active']) * 1024 / extra:7.0f} KiB, "
+                  f"start {(r['startup'] - base['startup']) * 1e3 / extra:6.1f} ms")
+            print(f"             osobne wdrożenia: {n * single['active']:7.0f} MiB "
+                  f"zamiast {r['active']:.0f} MiB")
+    finally:
+        stub.terminate()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Narzut śledzenia (tracing.Tracer) na ścieżce 4 zagnieżdżonych funkcji
+(webhook -> process_update -> handle_message -> evaluate_hardware,
+evaluate_hardware prawdziwe):
+  - wyłączone (TRACE_SAMPLE=0 – funkcje bez opakowania)
+  - włączone, żądanie niepróbkowane
+  - próbka: same spany / spany + cProfile (bez zapisu plików)
+oraz czas zapisu plików jednej próbki (JSON + pstats, z rotacją).
+
+Uruchomienie: python benchmarks/bench_tracing.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import evaluator
+from tracing import Tracer
+
+N = 20_000
+INPUT = "Intel Core i5-8250U, 8GB RAM"
+
+
+def build_path(tracer):
+    traced = tracer.traced
+    # bez TRACE_SAMPLE w środowisku evaluate_hardware nie jest opakowane
+    evaluate = traced("evaluate_hardware")(evaluator.evaluate_hardware)
+
+    @traced("handle_message")
+    def handle_message(text):
+        return evaluate(text)
+
+    @traced("process_update")
+    def process_update(text):
+        return handle_message(text)
+
+    @traced("webhook")
+    def webhook(text):
+        return process_update(text)
+
+    return webhook
+
+
+def per_call_us(tracer, n=N):
+    webhook = build_path(tracer)
+    webhook(INPUT)
+    start = time.perf_counter()
+    for _ in range(n):
+        webhook(INPUT)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+class NoWrite(Tracer):
+    def _write(self, trace):
+        pass
+
+
+def main():
+    base = per_call_us(Tracer(sample_every=0))
+    print(f"wyłączone:                 {base:6.2f} µs / żądanie")
+    unsampled = per_call_us(NoWrite(sample_every=10 ** 9))
+    print(f"włączone, bez próbki:      {unsampled:6.2f} µs  (+{unsampled - base:.2f})")
+    spans = per_call_us(NoWrite(sample_every=1, profile=False))
+    print(f"próbka, spany:             {spans:6.2f} µs  (+{spans - base:.2f})")
+    profiled = per_call_us(NoWrite(sample_every=1), n=N // 10)
+    print(f"próbka, spany + cProfile:  {profiled:6.2f} µs  (+{profiled - base:.2f})")
+
+    with tempfile.TemporaryDirectory() as directory:
+        tracer = Tracer(sample_every=1, directory=directory, keep=50)
+        webhook = build_path(tracer)
+        n = 500
+        start = time.perf_counter()
+        for _ in range(n):
+            webhook(INPUT)
+        with_files = (time.perf_counter() - start) / n * 1e6
+        print(f"próbka + zapis plików:     {with_files:6.0f} µs  "
+              f"(w katalogu {len(os.listdir(directory))} plików, keep=50)")
+
+    print("\nnarzut przy próbkowaniu 1 na N (µs / żądanie, średnio):")
+    for every in (10, 100, 1000):
+        cost = (unsampled - base) + (with_files - base) / every
+        print(f"  N={every:>5}: {cost:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
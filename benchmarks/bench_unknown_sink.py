@@ -0,0 +1,158 @@
+"""
+Opóźnienie handlera przy logowaniu nieznanych CPU, gdy webhook arkusza
+jest szybki, wolny (3 s na odpowiedź) albo niedostępny.
+
+Lokalny serwer-atrapa zastępuje Google Sheets. Mierzymy czas wywołania
+evaluate_hardware() w pętli zdarzeń i opóźnienie pętli (ping co 10 ms).
+
+Potem poprawność (kod wyjścia 1 przy błędzie): stop() w trakcie
+zbierania paczki nie gubi wpisów (wszystkie w spill), a paczki odrzucone
+przez arkusz (4xx) są liczone osobno i nie wracają do kolejki.
+
+Uruchomienie: python benchmarks/bench_unknown_sink.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import evaluator
+from unknown_sink import UnknownCpuSink
+
+
+class StubSheet(BaseHTTPRequestHandler):
+    delay = 0.0
+    status = 200
+    rows = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(StubSheet.delay)
+        StubSheet.rows += body.count(b'"cpu"')
+        try:
+            self.send_response(StubSheet.status)
+            self.end_headers()
+            self.wfile.write(b"ok")
+        except BrokenPipeError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSheet)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def measure(url, spill_path, events=500):
+    sink = UnknownCpuSink(url, spill_path=spill_path, maxsize=200, flush_interval=0.2,
+                          max_retries=2, backoff=0.1, timeout=5.0)
+    evaluator.UNKNOWN_CPU_SINK = sink
+    # każdy nieznany CPU osobnym wierszem (domyślnie tylko podsumowania)
+    evaluator.UNKNOWN_CPU_LOG_MODE = "rows"
+    await sink.start()
+
+    lags = []
+    stop = asyncio.Event()
+
+    async def pinger():
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            t = loop.time()
+            await asyncio.sleep(0.01)
+            lags.append(loop.time() - t - 0.01)
+
+    ping = asyncio.create_task(pinger())
+    calls = []
+    for i in range(events):
+        t = time.perf_counter()
+        evaluator.evaluate_hardware(f"Nieznany CPU {i}, 8GB RAM")
+        calls.append(time.perf_counter() - t)
+        await asyncio.sleep(0.001)
+
+    stop.set()
+    await ping
+    await sink.stop(timeout=1.0)
+    return calls, lags, sink
+
+
+def report(name, calls, lags, sink):
+    calls_us = sorted(c * 1e6 for c in calls)
+    lag_ms = sorted(l * 1e3 for l in lags) or [0.0]
+    p99 = calls_us[int(len(calls_us) * 0.99) - 1]
+    print(
+        f"{name:>10}: handler p50 {statistics.median(calls_us):6.1f} µs, p99 {p99:6.1f} µs, "
+        f"max lag pętli {max(lag_ms):5.1f} ms, wysłane {sink.sent}, spill {sink.spilled}"
+    )
+
+
+async def lost_rows(url, spill_path, status, rows=30):
+    """(wysłane, odrzucone, spill) po stop() – paczka zbierana, gdy przychodzi stop()."""
+    StubSheet.status = status
+    sink = UnknownCpuSink(url, spill_path=spill_path, batch_size=1000, flush_interval=0.5,
+                          max_retries=0, timeout=5.0)
+    await sink.start()
+    for i in range(rows):
+        sink.submit({"cpu": f"Nieznany CPU {i}"})
+    await asyncio.sleep(0.05)
+    if status == 200:
+        # stop() przed końcem flush_interval: worker czeka na kolejne wpisy
+        await sink.stop(timeout=0.0)
+    else:
+        await asyncio.sleep(1.0)
+        await sink.stop(timeout=1.0)
+    return sink.sent, sink.rejected, sink.spilled
+
+
+def correctness(url, tmp) -> bool:
+    ok = True
+    spill = os.path.join(tmp, "stop.jsonl")
+    sent, rejected, spilled = asyncio.run(lost_rows(url, spill, 200))
+    print(f"stop w trakcie zbierania: wysłane {sent}, spill {spilled} (z 30)")
+    if sent + spilled != 30:
+        print("  BŁĄD: wpisy zgubione przy stop()")
+        ok = False
+    spill = os.path.join(tmp, "rejected.jsonl")
+    sent, rejected, spilled = asyncio.run(lost_rows(url, spill, 400))
+    kept = 0
+    if os.path.exists(spill + ".rejected"):
+        with open(spill + ".rejected", encoding="utf-8") as f:
+            kept = sum(1 for _ in f)
+    print(f"arkusz odpowiada 400:     wysłane {sent}, odrzucone {rejected}, spill {spilled}, "
+          f"w .rejected {kept}")
+    if sent or spilled or rejected != 30 or kept != 30:
+        print("  BŁĄD: 4xx liczone jako wysłane albo wracają do kolejki")
+        ok = False
+    StubSheet.status = 200
+    return ok
+
+
+def main():
+    server = start_stub()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, delay, target in (
+            ("szybki", 0.0, url),
+            ("wolny", 3.0, url),
+            ("niedostępny", 0.0, "http://127.0.0.1:9/"),
+        ):
+            StubSheet.delay = delay
+            spill = os.path.join(tmp, f"{name}.jsonl")
+            report(name, *asyncio.run(measure(target, spill)))
+        StubSheet.delay = 0.0
+        ok = correctness(url, tmp)
+    server.shutdown()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
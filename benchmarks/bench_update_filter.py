@@ -0,0 +1,236 @@
+"""
+Wstępne odrzucanie update'ów w webhooku (bot.is_relevant + szybszy
+dekoder JSON) na realistycznej mieszance typów: wiadomości tekstowe,
+naklejki, zdjęcia, dołączenia/wyjścia z grupy, edycje, posty kanałów,
+my_chat_member, callback_query, zapytania inline, raporty .txt.
+
+  "przed" – json.loads + Update.de_json dla każdego update'u, a dla
+            pomijanych jeszcze Application.process_update (handlery go
+            odrzucają)
+  "po"    – json_loads (orjson, jeśli jest) + is_relevant; Update.de_json
+            tylko dla obsługiwanych
+
+Obsługa samych obsługiwanych update'ów (handlery) jest w obu wariantach
+ta sama i nie wchodzi do pomiaru. Raportuje czas CPU na update, szczyt
+pamięci na update (tracemalloc) i pamięć grafu obiektów Update.
+
+Uruchomienie: python benchmarks/bench_update_filter.py [--updates 20000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+from stub_bot_api import start_in_subprocess
+
+API_PORT = 18094
+
+
+def _user(uid):
+    return {"id": uid, "is_bot": False, "first_name": f"Uczeń {uid}", "language_code": "pl"}
+
+
+def _private(uid):
+    return {"id": uid, "type": "private", "first_name": f"Uczeń {uid}"}
+
+
+def _group(gid):
+    return {"id": -gid, "type": "supergroup", "title": "Klasa Roblox"}
+
+
+def _message(uid, chat, **extra):
+    return {"message_id": random.randint(1, 10 ** 6), "date": 1760000000,
+            "chat": chat, "from": _user(uid), **extra}
+
+
+STICKER = {
+    "file_id": "CAACAgIAAxkBAAEB" + "x" * 40, "file_unique_id": "AgADxyz", "type": "regular",
+    "width": 512, "height": 512, "is_animated": False, "is_video": False, "emoji": "😂",
+    "set_name": "RobloxMemes",
+    "thumbnail": {"file_id": "AAMCAgADGQEAAQ" + "y" * 40, "file_unique_id": "AQADxyz",
+                  "file_size": 5000, "width": 128, "height": 128},
+}
+PHOTO = [
+    {"file_id": f"AgACAgIAAxkBAAI{i}" + "z" * 40, "file_unique_id": f"AQAD{i}",
+     "file_size": 1000 * (i + 1), "width": 90 * (i + 1), "height": 60 * (i + 1)}
+    for i in range(4)
+]
+
+
+def make_update(kind, update_id, rng):
+    uid = rng.randint(1, 50_000)
+    group = _group(rng.randint(1, 200))
+    if kind == "tekst":
+        body = {"message": _message(uid, _private(uid), text="i5-8250U, 8GB RAM")}
+    elif kind == "raport .txt":
+        body = {"message": _message(uid, _private(uid), document={
+            "file_id": "BQACAgIAAxkBAAI" + "d" * 40, "file_unique_id": "AgADd",
+            "file_name": "msinfo.txt", "mime_type": "text/plain", "file_size": 180_000})}
+    elif kind == "naklejka":
+        body = {"message": _message(uid, group, sticker=STICKER)}
+    elif kind == "zdjęcie":
+        body = {"message": _message(uid, group, photo=PHOTO, caption="mój komputer")}
+    elif kind == "dołączenie":
+        body = {"message": _message(uid, group, new_chat_members=[_user(uid)],
+                                    new_chat_member=_user(uid), new_chat_participant=_user(uid))}
+    elif kind == "wyjście":
+        body = {"message": _message(uid, group, left_chat_member=_user(uid),
+                                    left_chat_participant=_user(uid))}
+    elif kind == "edycja":
+        body = {"edited_message": _message(uid, _private(uid), text="i5-8250U, 16GB RAM",
+                                           edit_date=1760000100)}
+    elif kind == "post kanału":
+        body = {"channel_post": {"message_id": 5, "date": 1760000000,
+                                 "chat": {"id": -100123, "type": "channel", "title": "Ogłoszenia"},
+                                 "sender_chat": {"id": -100123, "type": "channel", "title": "Ogłoszenia"},
+                                 "text": "Nowa lekcja w piątek!"}}
+    elif kind == "my_chat_member":
+        member = {"user": _user(1), "status": "member"}
+        body = {"my_chat_member": {"chat": group, "from": _user(uid), "date": 1760000000,
+                                   "old_chat_member": {**member, "status": "left"},
+                                   "new_chat_member": member}}
+    elif kind == "callback_query":
+        body = {"callback_query": {"id": str(uid), "from": _user(uid), "chat_instance": "123",
+                                   "data": "menu:1",
+                                   "message": _message(1, _private(uid), text="📋 Menu główne")}}
+    elif kind == "inline":
+        body = {"inline_query": {"id": str(uid), "from": _user(uid), "query": "i5-12",
+                                 "offset": "", "chat_type": "sender"}}
+    else:
+        raise ValueError(kind)
+    return json.dumps({"update_id": update_id, **body}, ensure_ascii=False).encode()
+
+
+# udział w ruchu bota działającego w czatach prywatnych i kilku grupach klasowych
+MIX = {
+    "tekst": 45,
+    "raport .txt": 1,
+    "inline": 8,
+    "naklejka": 12,
+    "zdjęcie": 6,
+    "dołączenie": 4,
+    "wyjście": 2,
+    "edycja": 8,
+    "post kanału": 4,
+    "my_chat_member": 3,
+    "callback_query": 7,
+}
+
+
+def per_update(fn, bodies, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(bodies)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(bodies) * 1e6
+
+
+def peak_per_update(fn, bodies):
+    tracemalloc.start()
+    total = 0
+    for body in bodies:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn([body])
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / len(bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=20_000)
+    args = parser.parse_args()
+
+    stub = start_in_subprocess(API_PORT)
+    os.environ.setdefault("TELEGRAM_TOKEN", "123456:BENCH")
+    os.environ.setdefault("WEBHOOK_URL", "https://bench.invalid")
+    os.environ["TELEGRAM_BASE_URL"] = f"http://127.0.0.1:{API_PORT}/bot"
+    os.environ["CPU_KB_WATCH_INTERVAL"] = "0"
+    try:
+        import bot
+        from telegram import Update
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(bot.application.initialize())
+        tg = bot.application.bot
+        process = bot.application.process_update
+
+        rng = random.Random(7)
+        kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=args.updates)
+        bodies = [make_update(kind, i + 1, rng) for i, kind in enumerate(kinds)]
+        relevant = [bot.is_relevant(json.loads(b)) for b in bodies]
+        ignored = [b for b, keep in zip(bodies, relevant) if not keep]
+
+        # "przed" bez is_relevant w środku pomiaru: pomijane znamy z góry
+        ignored_set = {id(b) for b in ignored}
+
+        async def before_async(batch):
+            for body in batch:
+                update = Update.de_json(json.loads(body), tg)
+                if id(body) in ignored_set:
+                    await process(update)
+
+        def before(batch):
+            loop.run_until_complete(before_async(batch))
+
+        def after(batch):
+            for body in batch:
+                data = bot.json_loads(body)
+                if bot.is_relevant(data):
+                    Update.de_json(data, tg)
+
+        def loads_only(loads):
+            def run(batch):
+                for body in batch:
+                    loads(body)
+            return run
+
+        print(f"{args.updates} update'ów, obsługiwane: {sum(relevant) / len(bodies):.0%}, "
+              f"dekoder: {bot.json_loads.__module__}")
+        counts = Counter(kinds)
+        print("  " + ", ".join(f"{kind} {counts[kind] / len(kinds):.0%}" for kind in MIX))
+        print()
+
+        print(f"{'':>22} {'przed µs':>9} {'po µs':>8} {'przed KiB':>10} {'po KiB':>7}")
+        sample = 2000
+        rows = [("cała mieszanka", bodies), ("tylko pomijane", ignored)]
+        for kind in ("naklejka", "edycja", "tekst"):
+            rows.append((kind, [b for b, k in zip(bodies, kinds) if k == kind]))
+        for name, batch in rows:
+            cpu_before = per_update(before, batch)
+            cpu_after = per_update(after, batch)
+            mem_before = peak_per_update(before, batch[:sample])
+            mem_after = peak_per_update(after, batch[:sample])
+            print(f"{name:>22} {cpu_before:>9.1f} {cpu_after:>8.1f} "
+                  f"{mem_before / 1024:>10.1f} {mem_after / 1024:>7.1f}")
+
+        print()
+        stdlib = per_update(loads_only(json.loads), bodies)
+        fast = per_update(loads_only(bot.json_loads), bodies)
+        print(f"samo dekodowanie JSON: json.loads {stdlib:.1f} µs, {bot.json_loads.__module__} {fast:.1f} µs")
+
+        tracemalloc.start()
+        kept = [Update.de_json(json.loads(b), tg) for b in ignored[:sample]]
+        graph = tracemalloc.get_traced_memory()[0] / len(kept)
+        tracemalloc.stop()
+        del kept
+        print(f"graf obiektów Update pomijanego update'u: {graph / 1024:.1f} KiB")
+        loop.run_until_complete(bot.application.shutdown())
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Test obciążeniowy webhooka: syntetyczne update'y Telegrama wysyłane do
+/webhook przez klienta ASGI w tym samym procesie. Bot API zastępuje
+atrapa (benchmarks/stub_bot_api.py) w osobnym procesie.
+
+Scenariusze użytkowników: menu, ocena sprzętu (znane i nieznane CPU),
+instrukcje OS, niezrozumiałe wiadomości. Raportuje p50 / p95 / p99
+i przepustowość dla kilku poziomów współbieżności.
+
+"w ciele" – odpowiedzi zwrócone w ciele webhooka (REPLY_MODE=inline),
+"API/upd" – wywołania sendMessage w atrapie na jeden update.
+
+Każdy scenariusz (jeden użytkownik = jeden czat) ma znaną liczbę
+odpowiedzi: przy REPLY_MODE=api wszystkie idą przez sendMessage,
+przy inline każdy update ma dokładnie jedną odpowiedź w ciele webhooka
+i żadnego sendMessage (odpowiedzi sklejone). Scenariusz z inną liczbą
+wywołań albo błąd HTTP -> kod wyjścia 1.
+
+Uruchomienie: python benchmarks/bench_webhook.py [--mode sync|queue]
+    [--reply-mode api|inline] [--levels 1,8,32,128] [--metrics]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+
+from stub_bot_api import start_in_subprocess
+
+HARDWARE = [
+    "i5-8250U, 8GB RAM",
+    "Intel Core i7-1165G7, 16GB",
+    "Ryzen 5 5500U, 16 GB",
+    "Celeron N4020, 4GB",
+    "Intel N100, 8GB",
+    "Apple M1, 8GB",
+    "i3-10110u, 8GB",
+]
+UNKNOWN_HARDWARE = [
+    "Pentium 4 3.0GHz, 8GB",
+    "Xeon E5-2670, 32GB",
+    "jakiś laptop, 8GB",
+]
+
+# (wiadomość, liczba odpowiedzi bota) – wynik oceny, instrukcja OS
+# i "3" kończą się menu
+SCENARIOS = [
+    [("/start", 1), ("1", 1), ("{hw}", 2)],
+    [("1", 1), ("{hw}", 2)],
+    [("1", 1), ("{unknown}", 2)],
+    [("2", 1), ("1", 2)],
+    [("2", 1), ("2", 2)],
+    [("3", 2)],
+    [("co to jest?", 1)],
+]
+
+_update_ids = itertools.count(1)
+
+
+def make_update(user_id: int, text: str) -> dict:
+    update_id = next(_update_ids)
+    user = {"id": user_id, "is_bot": False, "first_name": f"Uczeń {user_id}"}
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+        "from": user,
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return {"update_id": update_id, "message": message}
+
+
+def user_script(rng: random.Random):
+    """(wiadomość, liczba odpowiedzi) kolejnych kroków jednego scenariusza."""
+    for text, replies in rng.choice(SCENARIOS):
+        yield text.format(hw=rng.choice(HARDWARE), unknown=rng.choice(UNKNOWN_HARDWARE)), replies
+
+
+def expected_calls(steps, reply_mode: str):
+    """(sendMessage, odpowiedzi w ciele) dla scenariusza."""
+    if reply_mode == "inline":
+        return 0, len(steps)
+    return sum(replies for _, replies in steps), 0
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def run_level(client, concurrency, users_per_worker, seed, drain=None):
+    """Zwraca też scenariusze: user_id -> (kroki, odpowiedzi w ciele)."""
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    inline = 0
+    flows = {}
+    next_user = itertools.count(concurrency * 1000 + seed * 100000)
+
+    async def worker():
+        nonlocal errors, inline
+        for _ in range(users_per_worker):
+            user_id = next(next_user)
+            steps = list(user_script(rng))
+            answered = 0
+            for text, _ in steps:
+                payload = make_update(user_id, text)
+                t = time.perf_counter()
+                response = await client.post("/webhook", json=payload)
+                latencies.append(time.perf_counter() - t)
+                if response.status_code != 200:
+                    errors += 1
+                elif b'"method"' in response.content:
+                    inline += 1
+                    answered += 1
+            flows[user_id] = (steps, answered)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    # w trybie queue przepustowość liczymy do obsłużenia ostatniego update'u
+    if drain is not None:
+        await drain()
+    elapsed = time.perf_counter() - start
+    return sorted(latencies), elapsed, errors, inline, flows
+
+
+def check_flows(flows, chats, reply_mode: str) -> int:
+    """Liczba scenariuszy z inną liczbą sendMessage / odpowiedzi w ciele niż oczekiwana."""
+    wrong = 0
+    for user_id, (steps, answered) in flows.items():
+        expected = expected_calls(steps, reply_mode)
+        got = (chats.get(str(user_id), 0), answered)
+        if got != expected:
+            wrong += 1
+            if wrong <= 5:
+                print(f"  scenariusz {[text for text, _ in steps]}: sendMessage / w ciele "
+                      f"oczekiwano {expected}, jest {got}")
+    return wrong
+
+
+async def main(args):
+    import bot
+
+    await bot.on_startup()
+    transport = httpx.ASGITransport(app=bot.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # rozgrzewka
+        await run_level(client, 4, 5, seed=0)
+        # odpowiedzi w ciele tylko w trybie sync (w queue handler kończy się przed obsługą)
+        reply_mode = bot.REPLY_MODE if bot.WEBHOOK_MODE == "sync" else "api"
+
+        print(f"tryb webhooka: {bot.WEBHOOK_MODE}, odpowiedzi: {bot.REPLY_MODE}")
+        print(
+            f"{'współb.':>8} {'update':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'upd/s':>9} {'błędy':>6} {'w ciele':>8} {'API/upd':>8}"
+        )
+        failed = False
+        for level in args.levels:
+            users = max(1, args.updates // (level * 2))
+            drain = bot.dispatcher.join if bot.WEBHOOK_MODE == "queue" else None
+            httpx.post(f"http://127.0.0.1:{args.port}/reset")
+            lat, elapsed, errors, inline, flows = await run_level(
+                client, level, users, seed=level, drain=drain
+            )
+            sent = httpx.get(f"http://127.0.0.1:{args.port}/stats").json().get("sendMessage", 0)
+            print(
+                f"{level:>8} {len(lat):>7} {percentile(lat, 50) * 1e3:>8.2f} "
+                f"{percentile(lat, 95) * 1e3:>8.2f} {percentile(lat, 99) * 1e3:>8.2f} "
+                f"{len(lat) / elapsed:>9.0f} {errors:>6} {inline:>8} {sent / len(lat):>8.2f}"
+            )
+            chats = httpx.get(f"http://127.0.0.1:{args.port}/chats").json()
+            wrong = check_flows(flows, chats, reply_mode)
+            if wrong:
+                print(f"  niezgodne scenariusze: {wrong}/{len(flows)}")
+            failed |= bool(errors or wrong)
+
+        if args.metrics:
+            text = (await client.get("/metrics")).text
+            print_stage_summary(text)
+
+    await bot.on_shutdown()
+    stats = httpx.get(f"http://127.0.0.1:{args.port}/stats").json()
+    print(f"wywołania Bot API (ostatni poziom): {stats}")
+    return failed
+
+
+def print_stage_summary(text):
+    """Średni czas etapów z /metrics (bot_stage_duration_seconds)."""
+    sums, counts = {}, {}
+    for line in text.splitlines():
+        if not line.startswith("bot_stage_duration_seconds_"):
+            continue
+        name, value = line.rsplit(" ", 1)
+        stage = name.split('stage="', 1)[1].split('"', 1)[0]
+        if name.startswith("bot_stage_duration_seconds_sum"):
+            sums[stage] = float(value)
+        elif name.startswith("bot_stage_duration_seconds_count"):
+            counts[stage] = int(value)
+    print(f"{'etap':>18} {'liczba':>8} {'średnio µs':>11}")
+    for stage, count in counts.items():
+        mean = sums[stage] / count * 1e6 if count else 0.0
+        print(f"{stage:>18} {count:>8} {mean:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("sync", "queue"), default="sync")
+    parser.add_argument("--reply-mode", choices=("api", "inline"), default="api")
+    parser.add_argument("--levels", default="1,8,32,128")
+    parser.add_argument("--updates", type=int, default=2000, help="przybliżona liczba update'ów na poziom")
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--metrics", action="store_true", help="wypisz średnie czasy etapów z /metrics")
+    parser.add_argument("--api-delay", type=float, default=0.0, help="opóźnienie atrapy Bot API (s)")
+    args = parser.parse_args()
+    args.levels = [int(x) for x in args.levels.split(",")]
+
+    stub = start_in_subprocess(args.port, args.api_delay)
+    os.environ.setdefault("TELEGRAM_TOKEN", "123456:BENCH")
+    os.environ.setdefault("WEBHOOK_URL", "https://bench.invalid")
+    os.environ["TELEGRAM_BASE_URL"] = f"http://127.0.0.1:{args.port}/bot"
+    os.environ["WEBHOOK_MODE"] = args.mode
+    os.environ["REPLY_MODE"] = args.reply_mode
+    os.environ.setdefault("CPU_KB_WATCH_INTERVAL", "0")
+    os.environ.pop("GSHEET_WEBHOOK_URL", None)
+    try:
+        failed = asyncio.run(main(args))
+    finally:
+        stub.terminate()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,143 @@
+"""
+Atrapa Telegram Bot API do benchmarków: odpowiada na metody, których
+używa bot, i liczy wywołania. Uruchamiana w osobnym procesie, żeby nie
+dzieliła GIL z mierzonym botem.
+
+    python benchmarks/stub_bot_api.py --port 8081 [--delay 0.02]
+
+Bot kierujemy na atrapę przez TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot
+Licznik wywołań: GET /stats (JSON), sendMessage na czat: GET /chats,
+sendMessage na token bota (liczba, ostatni tekst): GET /bots, reset: POST /reset
+"""
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Checker", "username": "checker_bot"}
+
+
+class StubBotApi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # cała odpowiedź w jednym write – bez opóźnień Nagle / delayed ACK
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    delay = 0.0
+    calls = Counter()
+    chats = Counter()
+    bots = {}          # token -> {"sent": n, "last": tekst}
+    webhooks = {}      # token -> (url, allowed_updates)
+    lock = threading.Lock()
+    message_id = 0
+
+    def _params(self) -> dict:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not body:
+            return {}
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(body)
+        return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+
+    def _reply(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.lock:
+                self._reply(dict(self.calls))
+        elif self.path == "/chats":
+            with self.lock:
+                self._reply(dict(self.chats))
+        elif self.path == "/bots":
+            with self.lock:
+                self._reply(self.bots)
+        else:
+            self._reply({"ok": False}, 404)
+
+    def do_POST(self):
+        if self.path == "/reset":
+            self._params()
+            with self.lock:
+                StubBotApi.calls.clear()
+                StubBotApi.chats.clear()
+                StubBotApi.bots.clear()
+            self._reply({"ok": True})
+            return
+
+        method = self.path.rsplit("/", 1)[-1]
+        token = self.path.split("/")[1][len("bot"):]
+        params = self._params()
+        with self.lock:
+            StubBotApi.calls[method] += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "setWebhook":
+            allowed = params.get("allowed_updates")
+            allowed = json.loads(allowed) if isinstance(allowed, str) else allowed
+            with self.lock:
+                StubBotApi.webhooks[token] = (params.get("url", ""), allowed)
+            result = True
+        elif method == "getWebhookInfo":
+            with self.lock:
+                url, allowed = StubBotApi.webhooks.get(token, ("", None))
+            result = {"url": url, "has_custom_certificate": False, "pending_update_count": 0}
+            if allowed is not None:
+                result["allowed_updates"] = allowed
+        elif method == "sendMessage":
+            with self.lock:
+                StubBotApi.message_id += 1
+                message_id = StubBotApi.message_id
+                StubBotApi.chats[str(params.get("chat_id", 0))] += 1
+                bot = StubBotApi.bots.setdefault(token, {"sent": 0, "last": ""})
+                bot["sent"] += 1
+                bot["last"] = params.get("text", "")
+            result = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        self._reply({"ok": True, "result": result})
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, delay: float = 0.0, ready=None):
+    StubBotApi.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubBotApi)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
+
+
+def start_in_subprocess(port: int, delay: float = 0.0) -> multiprocessing.Process:
+    ready = multiprocessing.Event()
+    proc = multiprocessing.Process(target=serve, args=(port, delay, ready), daemon=True)
+    proc.start()
+    ready.wait(10)
+    return proc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=0.0, help="opóźnienie odpowiedzi (s)")
+    args = parser.parse_args()
+    serve(args.port, args.delay)
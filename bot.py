@@ -1,33 +1,188 @@
+import asyncio
+import functools
+import hmac
+import logging
 import os
-from fastapi import FastAPI, Request
-import uvicorn
-
-from telegram import Update
+import time
+import httpx
+from fastapi import FastAPI, Request, Response
+
+try:
+    # szybszy dekoder JSON dla webhooka, jeśli jest zainstalowany
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     ApplicationBuilder,
+    ApplicationHandlerStop,
     CommandHandler,
+    InlineQueryHandler,
     MessageHandler,
+    TypeHandler,
     ContextTypes,
     filters,
 )
 
-from evaluator import evaluate_hardware
+from evaluator import (
+    evaluate_hardware,
+    start_kb_watcher,
+    suggest_cpus,
+    suggestions_ready,
+    verdict_cache_stats,
+    warm_fuzzy_index,
+    warm_suggestions,
+    warm_verdict_cache,
+    CPU_SUGGEST_CACHE,
+    HARDWARE_MESSAGES,
+    UNKNOWN_CPU_SINK,
+    UNKNOWN_CPU_SUMMARY,
+    VERDICT_OBSERVERS,
+)
+from dispatcher import UpdateDispatcher, mark_output, track_output
+from flood import FloodGuard, ALLOW, NOTICE
+import handoff
+import metrics
+import replies
+from shadow import ShadowEvaluator
+from outbound import OutboundScheduler, PRIORITY_MENU, PRIORITY_RESULT
+from sysinfo import CHUNK_SIZE, extract_from_text, extract_sysinfo
+from tenants import BotConfig, Tenant, Tenants, load_config, state_path
+from tracing import TRACER, traced
+
+logger = logging.getLogger(__name__)
 
 
 # =========================
 # KONFIGURACJA
 # =========================
 
-TOKEN = os.environ["TELEGRAM_TOKEN"]
+# wiele botów w jednym procesie (szkoły / języki): plik JSON z tokenami,
+# tekstami i ustawieniami (zob. tenants.py), webhook każdego pod
+# /webhook/<bot_id>; bez BOTS_CONFIG jeden bot z TELEGRAM_TOKEN pod /webhook
+BOTS_CONFIG = os.environ.get("BOTS_CONFIG")
+TOKEN = None if BOTS_CONFIG else os.environ["TELEGRAM_TOKEN"]
 WEBHOOK_URL = os.environ["WEBHOOK_URL"]
 PORT = int(os.environ.get("PORT", 8080))
+# inny adres Bot API (np. lokalna atrapa w benchmarkach)
+TELEGRAM_BASE_URL = os.environ.get("TELEGRAM_BASE_URL")
+
+# "sync"  – webhook odpowiada po obsłudze update'u (domyślnie)
+# "queue" – webhook od razu zwraca 200, update'y obsługuje pula workerów
+WEBHOOK_MODE = os.environ.get("WEBHOOK_MODE", "sync")
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", 4))
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", 1000))
+
+# wspólny stan rozmów (SQLite) – pozwala uruchomić kilka workerów;
+# bez STATE_DB_PATH stan trzymany tylko w pamięci procesu
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH")
+STATE_FLUSH_INTERVAL = float(os.environ.get("STATE_FLUSH_INTERVAL", 1.0))
+
+# co ile sekund sprawdzać zmiany bazy CPU (0 = bez przeładowania)
+CPU_KB_WATCH_INTERVAL = float(os.environ.get("CPU_KB_WATCH_INTERVAL", 10))
+
+# "full" – startup czeka na webhook, log nieznanych CPU i tabele evaluatora
+# "fast" – (scale-to-zero) serwer przyjmuje update'y zaraz po getMe,
+#          reszta startu dzieje się w tle
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "full")
+
+# "api"    – każda odpowiedź to osobne wywołanie sendMessage
+# "inline" – (tylko WEBHOOK_MODE=sync) odpowiedzi sklejane, ostatnia wraca
+#            w ciele odpowiedzi webhooka zamiast osobnego wywołania API
+REPLY_MODE = os.environ.get("REPLY_MODE", "api")
+
+# harmonogram wysyłki pod limity Telegrama (globalny + na czat, priorytety,
+# sklejanie, obsługa 429); domyślnie wyłączony
+OUTBOUND_SCHEDULER = os.environ.get("OUTBOUND_SCHEDULER", "0") == "1"
+OUTBOUND_GLOBAL_RATE = float(os.environ.get("OUTBOUND_GLOBAL_RATE", 25))
+OUTBOUND_CHAT_RATE = float(os.environ.get("OUTBOUND_CHAT_RATE", 1.0))
+
+# raporty systemowe (msinfo32 .txt/.nfo, system_profiler) – wklejone albo
+# jako plik; getFile Bot API i tak nie pobierze więcej niż 20 MB
+SYSINFO_MAX_BYTES = int(os.environ.get("SYSINFO_MAX_BYTES", 20 * 1024 * 1024))
+SYSINFO_TIME_BUDGET = float(os.environ.get("SYSINFO_TIME_BUDGET", 2.0))
+# ile raportów przetwarzanych naraz (w wątkach, poza pętlą zdarzeń)
+SYSINFO_CONCURRENCY = int(os.environ.get("SYSINFO_CONCURRENCY", 2))
+
+# limit wiadomości na czat i na użytkownika (wiadomości/s, zapas);
+# FLOOD_CHAT_RATE=0 wyłącza ochronę
+FLOOD_CHAT_RATE = float(os.environ.get("FLOOD_CHAT_RATE", 0.5))
+FLOOD_CHAT_BURST = float(os.environ.get("FLOOD_CHAT_BURST", 5))
+FLOOD_USER_RATE = float(os.environ.get("FLOOD_USER_RATE", 0.5))
+FLOOD_USER_BURST = float(os.environ.get("FLOOD_USER_BURST", 5))
+FLOOD_NOTICE_INTERVAL = float(os.environ.get("FLOOD_NOTICE_INTERVAL", 30))
+
+# tryb inline (@bot i5-12...) – trzeba go włączyć w BotFather (/setinline);
+# INLINE_CACHE_TIME: ile sekund Telegram trzyma odpowiedź na ten sam tekst
+INLINE_CACHE_TIME = int(os.environ.get("INLINE_CACHE_TIME", 300))
+INLINE_RESULTS = int(os.environ.get("INLINE_RESULTS", 10))
+INLINE_MIN_QUERY = int(os.environ.get("INLINE_MIN_QUERY", 2))
+# "1" – indeks podpowiedzi budowany przy starcie zamiast przy pierwszym zapytaniu
+INLINE_WARM = os.environ.get("INLINE_WARM", "0") == "1"
+
+# zamknięcie (SIGTERM): jeden termin od sygnału na wszystko – otwarte
+# połączenia (uvicorn), przyjęte update'y i wysyłki, zatrzymanie aplikacji;
+# co nie zdążyło, trafia do pliku, który przejmie następny start
+SHUTDOWN_TIMEOUT = float(os.environ.get("SHUTDOWN_TIMEOUT", 8))
+# końcówka terminu zarezerwowana na zatrzymanie sinka i Application
+SHUTDOWN_TEARDOWN = float(os.environ.get("SHUTDOWN_TEARDOWN", min(1.0, SHUTDOWN_TIMEOUT / 4)))
+SHUTDOWN_HANDOFF_PATH = os.environ.get("SHUTDOWN_HANDOFF_PATH", "pending_updates.jsonl")
+
+# tryb cienia: kandydat evaluatora (inny evaluator.py i/lub inne źródło
+# bazy CPU) ocenia w procesie w tle co N-te wejście oceniane przez
+# aktywny; użytkownik widzi tylko werdykt aktywnego, rozbieżności pod
+# GET /shadow; bez obu zmiennych wyłączony
+SHADOW_EVALUATOR = os.environ.get("SHADOW_EVALUATOR")
+SHADOW_CPU_KB_SOURCE = os.environ.get("SHADOW_CPU_KB_SOURCE")
+SHADOW_SAMPLE = int(os.environ.get("SHADOW_SAMPLE", 1))
+
+# punkty diagnostyczne (GET /unknown-cpus i GET /shadow – surowy tekst od
+# użytkowników, GET /debug/flamegraph) odpowiadają tylko na nagłówek
+# X-Admin-Token równy ADMIN_TOKEN; bez ADMIN_TOKEN są wyłączone (404) –
+# aplikacja FastAPI stoi publicznie, pod tym samym portem co webhook
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
 
 # =========================
 # BOT TELEGRAM
 # =========================
 
-application = ApplicationBuilder().token(TOKEN).build()
+# bot na webhooku nie woła getUpdates – jeden klient HTTP zamiast dwóch
+# (każdy to osobne wczytanie certyfikatów CA przy starcie); przy wielu
+# botach jeden klient dla wszystkich – token jest w adresie metody
+shared_request = None
+if STARTUP_MODE == "fast" or BOTS_CONFIG:
+    shared_request = HTTPXRequest(connection_pool_size=256)
+
+
+def build_application(tenant: Tenant):
+    builder = ApplicationBuilder().token(tenant.config.token)
+    if shared_request is not None:
+        builder = builder.request(shared_request).get_updates_request(shared_request)
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    if OUTBOUND_SCHEDULER:
+        # limity Telegrama są na bota – harmonogram też
+        builder = builder.rate_limiter(
+            OutboundScheduler(global_rate=OUTBOUND_GLOBAL_RATE, chat_rate=OUTBOUND_CHAT_RATE)
+        )
+    if STATE_DB_PATH:
+        from persistence import SQLitePersistence
+
+        builder = builder.persistence(SQLitePersistence(
+            state_path(STATE_DB_PATH, tenant.bot_id), update_interval=STATE_FLUSH_INTERVAL,
+        ))
+    application = builder.build()
+    add_handlers(application, tenant)
+    return application
+
+
+def scheduler_of(application):
+    """OutboundScheduler bota albo None (OUTBOUND_SCHEDULER=0)."""
+    limiter = application.bot.rate_limiter
+    return limiter if isinstance(limiter, OutboundScheduler) else None
 
 
 MAIN_MENU = (
@@ -52,13 +207,273 @@ SPECIFIC_INFO = (
     "• Windows 8, 7 i starsze wersje nie obsługują Roblox Studio\n"
 )
 
+WINDOWS_HOWTO = (
+    "🪟 *Windows – jak sprawdzić specyfikację*\n\n"
+    "Sposób dokładny\n"
+    "1. Kliknij w ikonke windowsa - zazwyczaj lewy dolny róg\n"
+    "2. Wybierz *Ustawienia - ikonka koła zębatego*\n"
+    "3. Wybierz *System*\n"
+    "4. Po lewej stronie okna zjedź na sam dół listy i wybierz - informacje\n"
+    "5. Pojawi się informacja o Procesorze i Pamięci RAM \n\n"
+    "Sposób szybki - mniej dokłady\n"
+    "1. Skrót kalwiszowy windows+R\n"
+    "2. Wpisz msinfo32 -> enter\n"
+    "3. Dostęp do modelu procesora\n\n"
+    "Sposób gdy mamy drugi komputer - bez uruchomienia (laptop)\n"
+    "1. Sprawdzenie dokładnego modelu laptopa - zazwyczaj najlepka z tyłu \n"
+    "2. Wyszukaj specyfikacje konkretnego modelu w google\n"
+)
+
+MACOS_HOWTO = (
+    "🍎 *macOS – jak sprawdzić specyfikację*\n\n"
+    "1. Kliknij w logo Apple \n"
+    "2. Wybierz *Ten Mac*\n"
+    "3. Sprawdź:\n"
+    "   • Chip / Procesor\n"
+    "   • Pamięć (RAM)\n\n"
+)
+
+FLOOD_NOTICE = "⏳ Za dużo wiadomości naraz. Kolejne przeczytam za chwilę."
+
+# wszystko, co bot pisze użytkownikowi (poza werdyktami evaluatora –
+# HARDWARE_MESSAGES); każdy bot z BOTS_CONFIG może nadpisać dowolny klucz
+TEXTS = {
+    "main_menu": MAIN_MENU,
+    "check_prompt": CHECK_PROMPT,
+    "os_menu": OS_MENU,
+    "specific_info": SPECIFIC_INFO,
+    "windows_howto": WINDOWS_HOWTO,
+    "macos_howto": MACOS_HOWTO,
+    "choose_os": "❌ Wybierz 1 lub 2.",
+    "not_understood": "❓ Nie rozumiem.\nWpisz /start, aby zobaczyć opcje.",
+    "flood_notice": FLOOD_NOTICE,
+    "report_no_cpu": "❌ Nie znalazłem procesora w raporcie.",
+    "report_too_big": " Plik jest za duży.",
+    "report_too_slow": " Przetwarzanie trwało za długo.",
+    "report_result": "🔎 Z raportu: {cpu}, RAM: {ram} GB\n{result}",
+    "file_too_big": "❌ Plik jest za duży (limit {limit} MB).",
+}
+
+# ustawienia, które bot z BOTS_CONFIG może mieć inne niż reszta
+SETTINGS = {
+    "inline_cache_time": INLINE_CACHE_TIME,
+    "inline_results": INLINE_RESULTS,
+    "flood": FLOOD_CHAT_RATE > 0,   # False – bez ochrony przed zalewem
+}
+
+if BOTS_CONFIG:
+    _configs = load_config(BOTS_CONFIG, TEXTS, HARDWARE_MESSAGES, SETTINGS)
+else:
+    _configs = [BotConfig("", TOKEN, {}, {}, {})]
+TENANTS = Tenants([
+    Tenant(config, build_application, TEXTS, HARDWARE_MESSAGES, SETTINGS) for config in _configs
+])
+
+
+shadow = None
+if SHADOW_EVALUATOR or SHADOW_CPU_KB_SOURCE:
+    shadow = ShadowEvaluator(SHADOW_EVALUATOR, SHADOW_CPU_KB_SOURCE, sample_every=SHADOW_SAMPLE)
+    VERDICT_OBSERVERS.append(shadow.observe)
+
+
+def tenant_of(update: Update) -> Tenant:
+    return TENANTS.of_bot(update.get_bot())
+
+_REPLY_SECONDS = metrics.stage("reply")
+
+
+_REPLIES_API = metrics.REPLIES_TOTAL.labels("api")
+_REPLIES_BUFFERED = metrics.REPLIES_TOTAL.labels("buffered")
+
+
+@traced("reply_text")
+async def reply(update: Update, text: str, priority=PRIORITY_RESULT, **kwargs):
+    if replies.buffer_reply(update.effective_chat.id, text, **kwargs):
+        _REPLIES_BUFFERED.inc()
+        return None
+    # od tej chwili update nie może być obsłużony drugi raz po zamknięciu
+    mark_output()
+    tenant = tenant_of(update)
+    if scheduler_of(tenant.application) is not None:
+        return _schedule_reply(tenant.application, update, text, priority, kwargs)
+    started = time.perf_counter()
+    try:
+        return await update.message.reply_text(text, **kwargs)
+    finally:
+        _REPLY_SECONDS.observe(time.perf_counter() - started)
+        _REPLIES_API.inc()
+
+
+def _schedule_reply(application, update: Update, text: str, priority, kwargs):
+    """
+    Z harmonogramem handler nie czeka na wysyłkę: wiadomość trafia do
+    kolejki (kolejność zachowana), więc wynik i menu z tego samego
+    update'u skleją się w jedną. Błędy wysyłki idą do error handlerów
+    Application, a stop() czeka na te zadania.
+    """
+    # reply_text nie przyjmuje rate_limit_args – send_message z tym samym
+    # cytowaniem, co reply_text (poza czatem prywatnym)
+    chat = update.effective_chat
+    if chat.type != chat.PRIVATE:
+        kwargs.setdefault("reply_to_message_id", update.message.message_id)
+    started = time.perf_counter()
+    task = application.create_task(
+        update.get_bot().send_message(chat.id, text, rate_limit_args={"priority": priority}, **kwargs),
+        update=update,
+    )
+    task.add_done_callback(lambda _: _REPLY_SECONDS.observe(time.perf_counter() - started))
+    _REPLIES_API.inc()
+    return task
+
+
+async def show_menu(update: Update):
+    await reply(update, tenant_of(update).texts["main_menu"], priority=PRIORITY_MENU, parse_mode="Markdown")
+
+
+async def send_pending(bot, message: replies.PendingMessage):
+    mark_output()
+    started = time.perf_counter()
+    try:
+        await bot.send_message(
+            message.chat_id, message.text, parse_mode=message.parse_mode, **(message.extra or {})
+        )
+    finally:
+        _REPLY_SECONDS.observe(time.perf_counter() - started)
+        _REPLIES_API.inc()
+
+
+# =========================
+# OCHRONA PRZED ZALEWEM
+# =========================
+
+# jeden strażnik dla wszystkich botów: czat prywatny ma to samo id
+# w każdym bocie, więc limit użytkownika jest wspólny – chroni proces
+flood_guard = None
+if FLOOD_CHAT_RATE > 0 and any(tenant.settings["flood"] for tenant in TENANTS):
+    flood_guard = FloodGuard(
+        chat_rate=FLOOD_CHAT_RATE,
+        chat_burst=FLOOD_CHAT_BURST,
+        user_rate=FLOOD_USER_RATE,
+        user_burst=FLOOD_USER_BURST,
+        notice_interval=FLOOD_NOTICE_INTERVAL,
+    )
+
+
+async def flood_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Grupa -1: przed wszystkimi handlerami; odrzucone nie idą dalej."""
+    # tylko nowe wiadomości – na nie odpowiadamy (reply -> update.message)
+    if update.message is None or update.effective_chat is None:
+        return
+    user = update.effective_user
+    decision = flood_guard.check(
+        update.effective_chat.id, user.id if user else None, time.monotonic()
+    )
+    if decision == ALLOW:
+        return
+    if decision == NOTICE:
+        await reply(update, tenant_of(update).texts["flood_notice"])
+    raise ApplicationHandlerStop
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(MAIN_MENU, parse_mode="Markdown")
+    await reply(update, tenant_of(update).texts["main_menu"], parse_mode="Markdown")
+
+
+# =========================
+# RAPORTY SYSTEMOWE
+# =========================
+
+_SYSINFO_SECONDS = metrics.stage("sysinfo_extract")
+# tworzone w on_startup: w Pythonie 3.9 semafor wiąże się z pętlą
+# z chwili utworzenia, a uvicorn uruchamia własną
+_SYSINFO_SLOTS = None
+# klient do pobierania plików strumieniowo (download_to_memory PTB trzyma
+# cały plik w pamięci); tworzony przy pierwszym raporcie
+_FILES_CLIENT = None
+
+
+def _files_client() -> httpx.AsyncClient:
+    global _FILES_CLIENT
+    if _FILES_CLIENT is None:
+        _FILES_CLIENT = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=30.0))
+    return _FILES_CLIENT
+
+
+def _pull(chunks, loop):
+    """
+    Porcje pobieranego pliku dla extract_sysinfo w wątku: każdą pobiera
+    pętla zdarzeń dopiero wtedy, gdy ekstraktor jej potrzebuje – w pamięci
+    jest najwyżej jedna porcja, a koniec czytania kończy pobieranie.
+    """
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(chunks.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
 
 
+async def reply_sysinfo(update: Update, context: ContextTypes.DEFAULT_TYPE, info):
+    tenant = tenant_of(update)
+    if info.cpu is None:
+        text = tenant.texts["report_no_cpu"]
+        if info.stopped == "size":
+            text += tenant.texts["report_too_big"]
+        elif info.stopped == "time":
+            text += tenant.texts["report_too_slow"]
+        await reply(update, text)
+        return
+
+    ram = f"{info.ram_gb}GB RAM" if info.ram_gb is not None else ""
+    result = evaluate_hardware(f"{info.cpu}, {ram}", tenant.verdicts)
+    context.user_data.clear()
+    await reply(update, tenant.texts["report_result"].format(
+        cpu=info.cpu, ram=info.ram_gb or "?", result=result,
+    ))
+    await show_menu(update)
+
+
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    document = update.message.document
+    if document.file_size and document.file_size > SYSINFO_MAX_BYTES:
+        await reply(update, tenant_of(update).texts["file_too_big"].format(limit=SYSINFO_MAX_BYTES // 2 ** 20))
+        return
+
+    # semafor: kilka wielkich raportów naraz nie zajmie wszystkich wątków;
+    # plik czytany w trakcie pobierania – procesor i RAM są na początku
+    # raportu, reszty zwykle nie pobieramy (budżet czasu obejmuje pobieranie)
+    async with _SYSINFO_SLOTS:
+        file = await document.get_file()
+        started = time.perf_counter()
+        async with _files_client().stream("GET", file.file_path) as response:
+            response.raise_for_status()
+            info = await asyncio.to_thread(
+                extract_sysinfo,
+                _pull(response.aiter_bytes(CHUNK_SIZE), asyncio.get_running_loop()),
+                SYSINFO_MAX_BYTES,
+                SYSINFO_TIME_BUDGET,
+            )
+        _SYSINFO_SECONDS.observe(time.perf_counter() - started)
+    await reply_sysinfo(update, context, info)
+
+
+@traced("handle_message")
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text.strip()
     mode = context.user_data.get("mode")
+    tenant = tenant_of(update)
+    texts = tenant.texts
+
+    # =========================
+    # WKLEJONY RAPORT (msinfo32, system_profiler)
+    # =========================
+
+    if text.count("\n") >= 2:
+        started = time.perf_counter()
+        info = extract_from_text(text, time_budget=SYSINFO_TIME_BUDGET)
+        _SYSINFO_SECONDS.observe(time.perf_counter() - started)
+        if info.cpu is not None:
+            await reply_sysinfo(update, context, info)
+            return
 
     # =========================
     # TRYB: JAK SPRAWDZIĆ WYMAGANIA (PODMENU OS)
@@ -66,40 +481,16 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if mode == "choose_os":
         if text == "1":
-            await update.message.reply_text(
-                "🪟 *Windows – jak sprawdzić specyfikację*\n\n"
-                "Sposób dokładny\n"
-                "1. Kliknij w ikonke windowsa - zazwyczaj lewy dolny róg\n"
-                "2. Wybierz *Ustawienia - ikonka koła zębatego*\n"
-                "3. Wybierz *System*\n"
-                "4. Po lewej stronie okna zjedź na sam dół listy i wybierz - informacje\n"
-                "5. Pojawi się informacja o Procesorze i Pamięci RAM \n\n"
-                "Sposób szybki - mniej dokłady\n"
-                "1. Skrót kalwiszowy windows+R\n"
-                "2. Wpisz msinfo32 -> enter\n"
-                "3. Dostęp do modelu procesora\n\n"
-                "Sposób gdy mamy drugi komputer - bez uruchomienia (laptop)\n"
-                "1. Sprawdzenie dokładnego modelu laptopa - zazwyczaj najlepka z tyłu \n"
-                "2. Wyszukaj specyfikacje konkretnego modelu w google\n",
-                parse_mode="Markdown",
-            )
+            await reply(update, texts["windows_howto"], parse_mode="Markdown")
 
         elif text == "2":
-            await update.message.reply_text(
-                "🍎 *macOS – jak sprawdzić specyfikację*\n\n"
-                "1. Kliknij w logo Apple \n"
-                "2. Wybierz *Ten Mac*\n"
-                "3. Sprawdź:\n"
-                "   • Chip / Procesor\n"
-                "   • Pamięć (RAM)\n\n",
-                parse_mode="Markdown",
-            )
+            await reply(update, texts["macos_howto"], parse_mode="Markdown")
         else:
-            await update.message.reply_text("❌ Wybierz 1 lub 2.")
+            await reply(update, texts["choose_os"])
             return
 
         context.user_data.clear()
-        await update.message.reply_text(MAIN_MENU, parse_mode="Markdown")
+        await show_menu(update)
         return
 
     # =========================
@@ -107,10 +498,10 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # =========================
 
     if mode == "check_hardware":
-        result = evaluate_hardware(text)
+        result = evaluate_hardware(text, tenant.verdicts)
         context.user_data.clear()
-        await update.message.reply_text(result)
-        await update.message.reply_text(MAIN_MENU, parse_mode="Markdown")
+        await reply(update, result)
+        await show_menu(update)
         return
 
     # =========================
@@ -119,30 +510,97 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if text == "1":
         context.user_data["mode"] = "check_hardware"
-        await update.message.reply_text(CHECK_PROMPT, parse_mode="Markdown")
+        await reply(update, texts["check_prompt"], parse_mode="Markdown")
         return
 
     if text == "2":
         context.user_data["mode"] = "choose_os"
-        await update.message.reply_text(OS_MENU, parse_mode="Markdown")
+        await reply(update, texts["os_menu"], parse_mode="Markdown")
         return
 
     if text == "3":
-        await update.message.reply_text(SPECIFIC_INFO, parse_mode="Markdown")
-        await update.message.reply_text(MAIN_MENU, parse_mode="Markdown")
+        await reply(update, texts["specific_info"], parse_mode="Markdown")
+        await show_menu(update)
         return
 
     # =========================
     # NIEZNANE
     # =========================
 
-    await update.message.reply_text(
-        "❓ Nie rozumiem.\nWpisz /start, aby zobaczyć opcje.",
-        parse_mode="Markdown",
-    )
+    await reply(update, texts["not_understood"], parse_mode="Markdown")
+
 
-application.add_handler(CommandHandler("start", start))
-application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+# =========================
+# TRYB INLINE – PODPOWIEDZI CPU
+# =========================
+
+_VERDICT_EMOJI = {"NO": "❌", "OK": "✅", "VERY_GOOD": "🚀"}
+
+
+@functools.lru_cache(maxsize=1024)
+def _articles(suggestions: tuple, tenant: Tenant) -> list:
+    # te same podpowiedzi (krotka z cache evaluatora) -> te same obiekty
+    messages = tenant.verdicts
+    return [
+        InlineQueryResultArticle(
+            id=str(i),
+            title=f"{_VERDICT_EMOJI.get(verdict, '❓')} {name}",
+            description=messages[verdict],
+            input_message_content=InputTextMessageContent(f"{name}: {messages[verdict]}"),
+        )
+        for i, (name, verdict) in enumerate(suggestions)
+    ]
+
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.inline_query.query.strip()
+    tenant = tenant_of(update)
+    results = []
+    if len(query) >= INLINE_MIN_QUERY:
+        if not suggestions_ready():
+            await asyncio.to_thread(warm_suggestions)
+        results = _articles(suggest_cpus(query, tenant.settings["inline_results"]), tenant)
+    # wyniki nie zależą od użytkownika – Telegram może je dzielić między nimi
+    mark_output()
+    await update.inline_query.answer(results, cache_time=tenant.settings["inline_cache_time"])
+
+
+# tylko nowe wiadomości – edycje i posty kanałów nie mają update.message
+NEW_MESSAGE = filters.UpdateType.MESSAGE
+
+
+def add_handlers(application, tenant: Tenant):
+    if flood_guard is not None and tenant.settings["flood"]:
+        application.add_handler(TypeHandler(Update, flood_check), group=-1)
+    application.add_handler(CommandHandler("start", start, filters=NEW_MESSAGE))
+    application.add_handler(InlineQueryHandler(inline_query))
+    application.add_handler(MessageHandler(NEW_MESSAGE & filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(
+        NEW_MESSAGE & (filters.Document.FileExtension("txt") | filters.Document.FileExtension("nfo")),
+        handle_document,
+    ))
+
+
+# jeden bot: Application od razu, jak dotąd; przy BOTS_CONFIG każdy bot
+# buduje swoją przy pierwszym użyciu (tenants.Tenant)
+application = None if BOTS_CONFIG else TENANTS.get("").application
+
+# To samo, co akceptują handlery wyżej, sprawdzane na surowym dict z JSON-a:
+# reszta (naklejki, zdjęcia, dołączenia do grupy, edycje, posty kanałów,
+# my_chat_member...) dostaje 200 bez budowania obiektów Update.
+# Zmiana handlerów = zmiana tutaj.
+ALLOWED_UPDATES = ("message", "inline_query")
+REPORT_EXTENSIONS = (".txt", ".nfo")
+
+
+def is_relevant(data: dict) -> bool:
+    message = data.get("message")
+    if message is not None:
+        if "text" in message:
+            return True
+        document = message.get("document")
+        return document is not None and (document.get("file_name") or "").lower().endswith(REPORT_EXTENSIONS)
+    return "inline_query" in data
 
 
 # =========================
@@ -151,19 +609,394 @@ application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_m
 
 app = FastAPI()
 
+_JSON_SECONDS = metrics.stage("webhook_json")
+_DE_JSON_SECONDS = metrics.stage("update_de_json")
+_PROCESS_SECONDS = metrics.stage("process_update")
+_UPDATES_HANDLED = metrics.UPDATES_TOTAL.labels("handled")
+_UPDATES_IGNORED = metrics.UPDATES_TOTAL.labels("ignored")
+_REPLIES_INLINE = metrics.REPLIES_TOTAL.labels("inline")
+
+
+@traced("process_update")
+async def process_update(update: Update):
+    started = time.perf_counter()
+    try:
+        await tenant_of(update).application.process_update(update)
+    finally:
+        _PROCESS_SECONDS.observe(time.perf_counter() - started)
+
+
+def outbound_stats() -> dict:
+    """Suma statystyk harmonogramów uruchomionych botów."""
+    total = {"pending": 0, "sent": 0, "merged": 0, "retried": 0}
+    for tenant in TENANTS.started():
+        for key, value in scheduler_of(tenant.application).stats().items():
+            total[key] += value
+    return total
+
+
+dispatcher = UpdateDispatcher(
+    process_update,
+    workers=WEBHOOK_WORKERS,
+    maxsize=WEBHOOK_QUEUE_SIZE,
+)
+
+metrics.REGISTRY.gauge_callback("bot_cpu_cache", "Cache werdyktów CPU", verdict_cache_stats)
+metrics.REGISTRY.gauge_callback(
+    "bot_unknown_cpu_sink", "Log nieznanych CPU", UNKNOWN_CPU_SINK.stats
+)
+metrics.REGISTRY.gauge_callback(
+    "bot_unknown_cpu_summary", "Najczęstsze nieznane CPU", UNKNOWN_CPU_SUMMARY.stats
+)
+metrics.REGISTRY.gauge_callback(
+    "bot_cpu_suggest_cache", "Cache podpowiedzi CPU (inline)", CPU_SUGGEST_CACHE.stats
+)
+metrics.REGISTRY.gauge_callback("bot_dispatcher", "Kolejka update'ów", dispatcher.stats)
+if flood_guard is not None:
+    metrics.REGISTRY.gauge_callback("bot_flood", "Ochrona przed zalewem", flood_guard.stats)
+metrics.REGISTRY.gauge_callback("bot_handoff", "Praca przekazana przy zamknięciu", lambda: _HANDOFF)
+if TRACER.enabled:
+    metrics.REGISTRY.gauge_callback("bot_tracing", "Próbkowanie śladów", TRACER.stats)
+if OUTBOUND_SCHEDULER:
+    metrics.REGISTRY.gauge_callback("bot_outbound", "Harmonogram wysyłki", outbound_stats)
+if BOTS_CONFIG:
+    metrics.REGISTRY.gauge_callback("bot_tenants", "Boty w procesie", TENANTS.stats)
+if shadow is not None:
+    metrics.REGISTRY.gauge_callback("bot_shadow", "Tryb cienia – kandydat evaluatora", shadow.stats)
+
+
+# gotowe ciało zamiast dict – bez jsonable_encoder FastAPI, te same bajty
+_OK_BODY = b'{"ok":true}'
+
+
+def _ok() -> Response:
+    return Response(_OK_BODY, media_type="application/json")
+
+
+def _is_admin(req: Request) -> bool:
+    token = req.headers.get("x-admin-token")
+    if not ADMIN_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+_startup_task = None
+_draining = False
+_shutdown_deadline = None   # time.monotonic(); od pierwszego SIGTERM
+_HANDOFF = {
+    "saved_updates": 0, "saved_messages": 0, "saved_answered": 0,
+    "resumed_updates": 0, "resumed_messages": 0, "skipped_answered": 0,
+}
+# tryb sync: (bot_id, update_id) -> znacznik track_output() żądań w toku.
+# Te, które zamknięcie przerwało po wysłaniu odpowiedzi, Telegram ponowi –
+# następna instancja tylko je potwierdzi
+_in_flight = {}
+_ALREADY_ANSWERED = set()   # ...przejęte od poprzedniej instancji
+
+
+def webhook_url(tenant: Tenant) -> str:
+    if tenant.bot_id:
+        return f"{WEBHOOK_URL}/webhook/{tenant.bot_id}"
+    return f"{WEBHOOK_URL}/webhook"
+
+
+async def ensure_webhook(tenant: Tenant):
+    """setWebhook tylko wtedy, gdy Telegram ma zapisany inny adres."""
+    # bez initialize() – wystarczy token, getMe przyjdzie z pierwszym update'em
+    bot = tenant.bot
+    url = webhook_url(tenant)
+    info = await bot.get_webhook_info()
+    # allowed_updates: pozostałych typów Telegram w ogóle nie wysyła
+    if info.url != url or set(info.allowed_updates or ()) != set(ALLOWED_UPDATES):
+        await bot.set_webhook(url, allowed_updates=list(ALLOWED_UPDATES))
+
+
+async def finish_startup():
+    await asyncio.gather(*(ensure_webhook(tenant) for tenant in TENANTS))
+    await UNKNOWN_CPU_SINK.start()
+    await UNKNOWN_CPU_SUMMARY.start()
+    # tabela werdyktów (ze snapshotu, jeśli jest) + rozgrzanie cache,
+    # potem indeks literówek (do tego czasu nieznane CPU bez dopasowania);
+    # w wątku, żeby nie zatrzymać obsługi pierwszych update'ów
+    await asyncio.to_thread(warm_verdict_cache)
+    await asyncio.to_thread(warm_fuzzy_index)
+    if INLINE_WARM:
+        await asyncio.to_thread(warm_suggestions)
+    if shadow is not None:
+        await shadow.start()
+
+
+async def _finish_startup_in_background():
+    try:
+        await finish_startup()
+    except Exception:
+        logger.exception("Błąd dokończenia startu w tle")
+
 
 @app.on_event("startup")
 async def on_startup():
-    await application.initialize()
-    await application.bot.set_webhook(f"{WEBHOOK_URL}/webhook")
+    global _startup_task, _SYSINFO_SLOTS
+    _SYSINFO_SLOTS = asyncio.Semaphore(SYSINFO_CONCURRENCY)
+    default = TENANTS.get("")
+    if default is not None:
+        # jeden bot – initialize() + start() od razu, jak dotąd; przy
+        # BOTS_CONFIG każdy bot przy swoim pierwszym update'cie
+        await default.ready()
+    if STARTUP_MODE == "fast":
+        _startup_task = asyncio.create_task(_finish_startup_in_background())
+    else:
+        await finish_startup()
+    if CPU_KB_WATCH_INTERVAL > 0:
+        start_kb_watcher(CPU_KB_WATCH_INTERVAL)
+    if WEBHOOK_MODE == "queue":
+        await dispatcher.start()
+    await resume_handoff()
+
+
+async def _stop_applications(started):
+    # stop() + shutdown() zapisują resztę stanu rozmów; najpierw stop()
+    # wszystkich – shutdown() zamyka wspólnego klienta HTTP
+    for tenant in started:
+        await tenant.application.stop()
+    for tenant in started:
+        await tenant.application.shutdown()
+
+
+async def resume_handoff():
+    """Praca zostawiona przez poprzednią instancję (zob. on_shutdown)."""
+    updates, messages, answered = handoff.claim(SHUTDOWN_HANDOFF_PATH)
+    _ALREADY_ANSWERED.update(answered)
+    if updates:
+        # także w trybie sync – przez kolejkę, żeby kolejne zamknięcie
+        # dokończyło je tak samo
+        await dispatcher.start()
+        rejected = {}
+        for bot_id, data in updates:
+            tenant = await _handoff_tenant(bot_id)
+            if tenant is None:
+                continue
+            if dispatcher.submit(Update.de_json(data, tenant.bot)):
+                _HANDOFF["resumed_updates"] += 1
+            else:
+                rejected.setdefault(bot_id, []).append(data)
+        for bot_id, rows in rejected.items():
+            handoff.save(SHUTDOWN_HANDOFF_PATH, rows, bot_id=bot_id)
+    by_bot = {}
+    for bot_id, message in messages:
+        by_bot.setdefault(bot_id, []).append(message)
+    for bot_id, batch in by_bot.items():
+        tenant = await _handoff_tenant(bot_id)
+        if tenant is not None:
+            tenant.application.create_task(_resend(tenant.bot, batch))
+    if updates or messages or answered:
+        logger.warning(
+            "Przejęto z %s: %d update'ów, %d wiadomości, %d już obsłużonych",
+            SHUTDOWN_HANDOFF_PATH, len(updates), len(messages), len(answered),
+        )
+
+
+async def _handoff_tenant(bot_id: str):
+    tenant = TENANTS.get(bot_id)
+    if tenant is None:
+        logger.warning("Przejęta praca dla bota %r, którego nie ma w konfiguracji – pomijam", bot_id)
+        return None
+    await tenant.ready()
+    return tenant
+
+
+async def _resend(bot, messages):
+    for message in messages:
+        try:
+            await bot.send_message(**message)
+            _HANDOFF["resumed_messages"] += 1
+        except Exception:
+            logger.exception("Nie udało się wysłać przejętej wiadomości do %s", message["chat_id"])
+
+
+def begin_shutdown() -> float:
+    """
+    Od teraz 503 na nowe update'y. Zwraca termin zamknięcia
+    (time.monotonic()) – liczony od pierwszego wywołania, wspólny dla
+    uvicorna i on_shutdown.
+    """
+    global _draining, _shutdown_deadline
+    _draining = True
+    if _shutdown_deadline is None:
+        _shutdown_deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    return _shutdown_deadline
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """
+    Nowe update'y dostają 503 (Telegram ponowi dostawę), przyjęte są
+    dokańczane do terminu z begin_shutdown() minus SHUTDOWN_TEARDOWN.
+    Co nie zdążyło – update'y z kolejki (przerwane w trakcie tylko, jeśli
+    nic jeszcze nie wysłały) i niewysłane wiadomości harmonogramu –
+    trafia do SHUTDOWN_HANDOFF_PATH dla następnego startu. Zatrzymanie
+    sinka i aplikacji mieści się w reszcie terminu.
+    """
+    global _FILES_CLIENT
+    deadline = begin_shutdown()
+    work_deadline = deadline - SHUTDOWN_TEARDOWN
+
+    def remaining(until=work_deadline):
+        return max(0.0, until - time.monotonic())
+
+    if _startup_task is not None:
+        await asyncio.wait([_startup_task], timeout=remaining())
+    started = TENANTS.started()
+    # bot_id -> (update'y, wiadomości, obsłużone update_id)
+    left = {}
+    # uvicorn anulował już żądania, które nie zdążyły w terminie
+    for (bot_id, update_id), output in _in_flight.items():
+        if output[0]:
+            left.setdefault(bot_id, ([], [], []))[2].append(update_id)
+    for update in await dispatcher.drain(remaining()):
+        left.setdefault(tenant_of(update).bot_id, ([], [], []))[0].append(update.to_dict())
+    for tenant in started:
+        scheduler = scheduler_of(tenant.application)
+        if scheduler is None:
+            continue
+        for endpoint, data in await scheduler.drain(remaining()):
+            message = handoff.outbound_message(endpoint, data)
+            if message is None:
+                logger.warning("Zamknięcie: pominięto niewysłane %s", endpoint)
+            else:
+                left.setdefault(tenant.bot_id, ([], [], []))[1].append(message)
+    for bot_id, (updates, messages, answered) in left.items():
+        if handoff.save(SHUTDOWN_HANDOFF_PATH, updates, messages, bot_id=bot_id, answered=answered):
+            _HANDOFF["saved_updates"] += len(updates)
+            _HANDOFF["saved_messages"] += len(messages)
+            _HANDOFF["saved_answered"] += len(answered)
+    if left:
+        logger.warning(
+            "Zamknięcie: %d update'ów, %d wiadomości zapisane do %s",
+            _HANDOFF["saved_updates"], _HANDOFF["saved_messages"], SHUTDOWN_HANDOFF_PATH,
+        )
+
+    if shadow is not None:
+        await shadow.stop()
+    # ostatnie podsumowanie musi trafić do sinka przed jego zatrzymaniem;
+    # sink dostaje połowę reszty terminu (co nie wyjdzie, zapisuje do pliku)
+    await UNKNOWN_CPU_SUMMARY.stop()
+    await UNKNOWN_CPU_SINK.stop(timeout=remaining(deadline) / 2)
+    try:
+        await asyncio.wait_for(_stop_applications(started), timeout=remaining(deadline))
+    except asyncio.TimeoutError:
+        logger.warning("Zamknięcie: aplikacje nie zatrzymały się w terminie SHUTDOWN_TIMEOUT")
+    if _FILES_CLIENT is not None:
+        await _FILES_CLIENT.aclose()
+        _FILES_CLIENT = None
 
 
 @app.post("/webhook")
 async def telegram_webhook(req: Request):
-    data = await req.json()
-    update = Update.de_json(data, application.bot)
-    await application.process_update(update)
-    return {"ok": True}
+    tenant = TENANTS.get("")
+    if tenant is None:
+        return Response(status_code=404)
+    return await handle_webhook(req, tenant)
+
+
+@app.post("/webhook/{bot_id}")
+async def tenant_webhook(req: Request, bot_id: str):
+    tenant = TENANTS.get(bot_id)
+    if tenant is None:
+        return Response(status_code=404)
+    return await handle_webhook(req, tenant)
+
+
+@traced("webhook")
+async def handle_webhook(req: Request, tenant: Tenant):
+    if _draining:
+        # instancja się zamyka – Telegram ponowi dostawę do następnej
+        return Response(status_code=503)
+    started = time.perf_counter()
+    data = json_loads(await req.body())
+    decoded = time.perf_counter()
+    _JSON_SECONDS.observe(decoded - started)
+    if not is_relevant(data):
+        _UPDATES_IGNORED.inc()
+        return _ok()
+    if _ALREADY_ANSWERED and (tenant.bot_id, data.get("update_id")) in _ALREADY_ANSWERED:
+        # ponowiona dostawa update'u, na który poprzednia instancja już odpisała
+        _ALREADY_ANSWERED.discard((tenant.bot_id, data["update_id"]))
+        _HANDOFF["skipped_answered"] += 1
+        return _ok()
+    _UPDATES_HANDLED.inc()
+    if not tenant.started:
+        # pierwszy update do tego bota: getMe + start()
+        await tenant.ready()
+        decoded = time.perf_counter()
+    update = Update.de_json(data, tenant.bot)
+    _DE_JSON_SECONDS.observe(time.perf_counter() - decoded)
+
+    if WEBHOOK_MODE == "queue":
+        # pełna kolejka -> 503, Telegram ponowi dostawę później
+        if not dispatcher.submit(update):
+            return Response(status_code=503)
+        return _ok()
+
+    key = (tenant.bot_id, update.update_id)
+    _in_flight[key] = track_output()
+    try:
+        return await _process_sync(update, tenant)
+    finally:
+        _in_flight.pop(key, None)
+
+
+async def _process_sync(update: Update, tenant: Tenant) -> Response:
+    if REPLY_MODE != "inline":
+        await process_update(update)
+        return _ok()
+
+    token = replies.start_buffering()
+    try:
+        await process_update(update)
+    finally:
+        pending = replies.stop_buffering(token)
+
+    # kolejność zachowana: wcześniejsze wiadomości wysłane, zanim
+    # Telegram wykona tę z ciała odpowiedzi
+    last = pending.pop() if pending and not pending[-1].extra else None
+    for message in pending:
+        await send_pending(tenant.bot, message)
+    if last is None:
+        return _ok()
+    _REPLIES_INLINE.inc()
+    return replies.webhook_payload(last)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/unknown-cpus")
+async def unknown_cpus(req: Request, limit: int = 20):
+    if not _is_admin(req):
+        return Response(status_code=404)
+    return {"stats": UNKNOWN_CPU_SUMMARY.stats(), "top": UNKNOWN_CPU_SUMMARY.top(limit)}
+
+
+if TRACER.enabled:
+    @app.get("/debug/flamegraph")
+    async def flamegraph(req: Request, source: str = "spans"):
+        """Zsumowane stosy próbek (source=spans|profile) dla flamegraph.pl / speedscope."""
+        if not _is_admin(req):
+            return Response(status_code=404)
+        return Response(TRACER.folded(source), media_type="text/plain; charset=utf-8")
+
+
+if shadow is not None:
+    @app.get("/shadow")
+    async def shadow_report(req: Request, limit: int = 10):
+        """Rozbieżności kandydata z aktywnym evaluatorem (pary werdyktów + najczęstsze wejścia)."""
+        if not _is_admin(req):
+            return Response(status_code=404)
+        return shadow.report(limit)
 
 
 # =========================
@@ -171,4 +1004,19 @@ async def telegram_webhook(req: Request):
 # =========================
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    import uvicorn
+
+    class _Server(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            # 503 od razu po SIGTERM – także na otwartych połączeniach,
+            # zanim uvicorn je zamknie i wywoła on_shutdown; czekanie
+            # uvicorna na połączenia liczy się do tego samego terminu
+            deadline = begin_shutdown()
+            self.config.timeout_graceful_shutdown = max(
+                0.0, deadline - SHUTDOWN_TEARDOWN - time.monotonic()
+            )
+            super().handle_exit(sig, frame)
+
+    _Server(uvicorn.Config(
+        app, host="0.0.0.0", port=PORT, timeout_graceful_shutdown=SHUTDOWN_TIMEOUT,
+    )).run()
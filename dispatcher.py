@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# znacznik [wysłano?] update'u obsługiwanego w bieżącym zadaniu (worker
+# albo żądanie webhooka w trybie sync) – widoczny w jego handlerach
+_current_output = ContextVar("update_output", default=None)
+
+
+def track_output() -> list:
+    """Nowy znacznik dla update'u obsługiwanego od teraz w tym zadaniu."""
+    flag = [False]
+    _current_output.set(flag)
+    return flag
+
+
+def mark_output():
+    """
+    Handler wysyła (albo zleca wysłanie) wiadomości dla bieżącego
+    update'u. Przerwany przy zamknięciu nie może być wtedy obsłużony
+    drugi raz – wysłałby ją ponownie. Bez track_output() nic nie robi.
+    """
+    flag = _current_output.get()
+    if flag is not None:
+        flag[0] = True
+
+# ==================================================
+# KOLEJKA UPDATE'ÓW + PULA WORKERÓW
+# ==================================================
+
+
+class UpdateDispatcher:
+    """
+    Przyjmuje update'y z webhooka bez czekania na ich obsługę.
+
+    - N workerów, każdy z własną ograniczoną kolejką
+    - update trafia do kolejki wg id czatu -> kolejność w obrębie czatu
+      zachowana, różne czaty obsługiwane równolegle
+    - pełna kolejka -> submit() zwraca False (webhook odpowiada 503,
+      Telegram ponowi dostawę później)
+    - powtórzone update_id są odrzucane (pamiętamy ostatnie `dedup_size`)
+    - kolejki powstają w start(), już w pętli serwera (Python 3.9 wiąże
+      asyncio.Queue z pętlą z chwili utworzenia); submit() przed start()
+      zwraca False
+    - drain() przy zamknięciu: koniec przyjmowania (submit -> False),
+      dokończenie kolejki w terminie, zwrot tego, czego nie zdążono;
+      update przerwany po wysłaniu odpowiedzi (mark_output) nie jest
+      zwracany – porzucony zamiast obsłużony dwa razy
+    """
+
+    def __init__(self, process, workers=4, maxsize=1000, dedup_size=10000):
+        self._process = process
+        self._workers = workers
+        self._queue_size = max(1, maxsize // workers)
+        self._queues = []
+        self._tasks = []
+        self._active = [None] * workers   # update obsługiwany przez worker
+        self._replied = [[False]] * workers  # ...i jego znacznik track_output()
+        self._closed = False
+        self._stopping = False            # workery nie biorą kolejnych update'ów
+        self._seen = OrderedDict()
+        self._dedup_size = dedup_size
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.abandoned = 0                # przerwane po wysłaniu odpowiedzi
+
+    def submit(self, update) -> bool:
+        """
+        Wstawia update do kolejki. Zwraca False, gdy kolejka jest pełna
+        (duplikat liczy się jako przyjęty – Telegram nie musi go ponawiać),
+        przed start() albo po close().
+        """
+        if self._closed or not self._queues:
+            self.rejected += 1
+            return False
+        update_id = update.update_id
+        if update_id in self._seen:
+            self.duplicates += 1
+            return True
+
+        queue = self._queues[self._shard(update)]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+        self._seen[update_id] = None
+        if len(self._seen) > self._dedup_size:
+            self._seen.popitem(last=False)
+        self.accepted += 1
+        return True
+
+    def _shard(self, update) -> int:
+        chat = update.effective_chat
+        if chat is not None:
+            key = chat.id
+        elif update.effective_user is not None:
+            key = update.effective_user.id
+        else:
+            key = update.update_id
+        return hash(key) % len(self._queues)
+
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "pending": self.pending(),
+            "abandoned": self.abandoned,
+        }
+
+    # --------------------------
+    # Cykl życia
+    # --------------------------
+
+    async def start(self):
+        if self._tasks:
+            return
+        if not self._queues:
+            self._queues = [asyncio.Queue(maxsize=self._queue_size) for _ in range(self._workers)]
+        self._closed = False
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._worker(i, q)) for i, q in enumerate(self._queues)
+        ]
+
+    def close(self):
+        """Kolejne submit() zwracają False (webhook -> 503)."""
+        self._closed = True
+
+    async def join(self):
+        for queue in self._queues:
+            await queue.join()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def drain(self, timeout: float, grace: float = 2.0) -> list:
+        """
+        close() + obsługa kolejek najwyżej `timeout` s łącznie. Ostatnie
+        `grace` s terminu (najwyżej połowa) są dla update'ów w trakcie:
+        od tej chwili workery kończą bieżący update (przerwany mógł już
+        coś wysłać, więc powtórzenie go zdubluje odpowiedź), ale nie biorą
+        kolejnych. Co nie skończy się do terminu, jest przerywane. Zwraca
+        update'y nieobsłużone: przerwane, zanim cokolwiek wysłały, potem
+        czekające w kolejkach, w kolejności przyjęcia w obrębie kolejki.
+        """
+        self.close()
+        if self._tasks:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            grace = min(grace, timeout / 2)
+            try:
+                await asyncio.wait_for(self.join(), timeout - grace)
+            except asyncio.TimeoutError:
+                pass
+            self._stopping = True
+            busy = []
+            for task, update in zip(self._tasks, self._active):
+                if update is None:
+                    task.cancel()
+                else:
+                    busy.append(task)
+            if busy:
+                await asyncio.wait(busy, timeout=max(0.0, deadline - loop.time()))
+        interrupted = []
+        for update, replied in zip(self._active, self._replied):
+            if update is None:
+                continue
+            if replied[0]:
+                self.abandoned += 1
+                logger.warning(
+                    "Update %s przerwany po wysłaniu odpowiedzi – bez przekazania", update.update_id
+                )
+            else:
+                interrupted.append(update)
+        await self.stop()
+
+        unfinished = interrupted
+        for queue in self._queues:
+            while not queue.empty():
+                unfinished.append(queue.get_nowait())
+                queue.task_done()
+        return unfinished
+
+    async def _worker(self, index, queue):
+        while True:
+            update = await queue.get()
+            self._active[index] = update
+            self._replied[index] = track_output()
+            try:
+                await self._process(update)
+            except Exception:
+                logger.exception("Błąd obsługi update %s", update.update_id)
+            finally:
+                self._active[index] = None
+                queue.task_done()
+            if self._stopping:
+                return
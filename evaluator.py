@@ -1,234 +1,545 @@
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import pickle
 import re
 import os
-import requests
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import NamedTuple, Optional
+
+import knowledge_base
+import metrics
+import fuzzy
+from fuzzy import FuzzyIndex, FuzzyMatch
+from heavy_hitters import UnknownCpuSummary
+from prefix_index import PrefixIndex
+from tracing import traced
+from knowledge_base import load_overrides, normalize
+from lru import LRUCache
+from matcher import PatternMatcher
+from unknown_sink import UnknownCpuSink
+import verdict_table
+
+logger = logging.getLogger(__name__)
 
-def normalize(text: str) -> str:
-    return re.sub(r"[^a-z0-9]", "", text.lower())
-
-
-EXACT_CPU_OVERRIDES = {
-
-    # ===== Intel Core i3 – stare / słabe =====
-    "i3-3120m": "NO",
-    "i3-4005u": "NO",
-    "i3-4010u": "NO",
-    "i3-5005u": "NO",
-    "i3-6100u": "NO",
-    "i3-7020u": "NO",
-    "i3-8130u": "NO",
-    "i3-8145u": "NO",
-    "i3-10110u": "NO",
-    "i3-1110g4": "NO",
-    "i3-1000g1": "NO",
-    "i3-1120g4": "NO",
-    "i3-1125g4": "NO",
-
-    # ===== Intel Core i3 – nowe, ale wymagają promocji =====
-    "i3-12100": "VERY_GOOD",
-    "i3-1215U": "VERY_GOOD",
-    "i3-1320": "VERY_GOOD",
-    "i3-n305": "VERY_GOOD",
-
-    # ===== Intel Core i5 – stare mobile =====
-    "i5-7267u": "NO",
-    "i5-7267": "NO",
-    "i5-5200u": "NO",
-    "i5-5300u": "NO",
-    "i5-6200u": "NO",
-    "i5-6300u": "NO",
-    "i5-7200u": "NO",
-    "i5-7300u": "NO",
-
-    # ===== Intel Core i5 – błędnie zaniżane =====
-    "i5-9400f": "VERY_GOOD",
-    "i5-1035g7": "VERY_GOOD",
-    "i5-1030g7": "VERY_GOOD",
-    "i5-1030g4": "VERY_GOOD",
-    "i5-1038ng7": "VERY_GOOD",
-    "i5-1235u": "VERY_GOOD",
-    "i5-1215U": "VERY_GOOD",
-    "i5-1240p": "VERY_GOOD",
-    "i5-1240u": "VERY_GOOD",
-
-    # ===== Intel Core i7 – stare, mylące =====
-    "i7-3610qm": "NO",
-    "i7-4700mq": "NO",
-    "i7-6500u": "NO",
-    "i7-6600u": "NO",
-    "i7-7500u": "NO",
-    "i7-7600u": "NO",
-
-    # ===== Intel Core i7 – błędnie zaniżane =====
-    "i7-1165g7": "VERY_GOOD",
-    "i7-1180g7": "VERY_GOOD",
-    "i7-1260p": "VERY_GOOD",
-    "i7-1265u": "VERY_GOOD",
-    "i7-1065g7": "VERY_GOOD",
-    "i7-1068ng7": "VERY_GOOD",
-
-    # ===== Pentium – znane wyjątki =====
-    "gold 6405u": "OK",
-    "gold 7505": "VERY_GOOD",
-    "gold 8505": "VERY_GOOD",
-
-    # ===== Stare desktopowe Intela =====
-    "i5-2400": "NO",
-    "i7-2600k": "NO",
-
-    # ===== Intel Y-series (zawsze NO) =====
-    "i5-8200y": "NO",
-    "i5-8210y": "NO",
-    "i7-8500y": "NO",
-    "i7-8600y": "NO", 
-
-    "pentium silver n6000": "NO",
-    "pentium silver j5005": "NO",
-
-    "i3-8300": "NO",
-    "i3-8300h": "NO", 
-
-
-    # ===== i3 – nowe mobile, błędnie zaniżane =====
-"i3-1215u": "OK",
-"i3-1315u": "OK",
-"i3-1220u": "OK",
-"i3-1230u": "OK",
-"i3-1210u": "OK",
-"i3-1220p": "OK",
-
-# ===== i5 – Ice Lake / Tiger Lake błędnie NO =====
-"i5-1035g1": "OK",
-"i5-1035g1,": "OK",
-"i5-1145g7": "OK",
-"i5-1135g7": "VERY_GOOD",
-"i5-1035g4": "VERY_GOOD",
-
-# ===== i7 – Tiger Lake U błędnie NO =====
-"i7-1185g7": "VERY_GOOD",
-
-# ===== i5 – cases gdzie expected=VERY_GOOD =====
-"i5-1035g1": "VERY_GOOD",
-"i5-1145g7": "VERY_GOOD",
-
-# ===== i3 desktop / mobile edge =====
-"i3-1215u": "OK",
-
-# ===== ultra / promotion mismatch (nie error, ale ujednolicenie) =====
-"ultra 7 155u": "OK",
-
-    # i3 – 2C / 4T (Clarkdale)
-    "i3-530": "NO",
-    "i3-540": "NO",
-    "i3-550": "NO",
-
-    # i5 – 2C / 4T (Clarkdale)
-    "i5-650": "NO",
-    "i5-660": "NO",
-    "i5-670": "NO",
-    "i5-680": "NO",
-
-    # i7 – 4C / 8T (Lynnfield, ale bardzo stare IPC)
-    "i7-860": "NO",
-    "i7-870": "NO",
-    "i7-880": "NO",
- # ===== Intel Core – korekty po testach (manual overrides) =====
-
-    # --- Broadwell / Skylake U – ZA SŁABE ---
-    "i3-5010u": "NO",
-    "i3-5020u": "NO",
-    "i5-5250u": "NO",
-    "i7-5500u": "NO",
-    "i7-5600u": "NO",
-    "i5-5200h": "NO",
-    "i5-5287u": "NO",
-    "i7-5700hq": "NO",
-    "i7-5750hq": "NO",
-    "i5-5675c": "NO",
-    "i7-5775c": "NO",
-
-    # --- Skylake i3 ---
-    "i3-6006u": "NO",
-    "i3-6157u": "NO",
-    "i3-6100": "NO",
-    "i3-6300": "NO",
-
-    # --- Skylake / Kaby Lake i5 / i7 – nadal za słabe ---
-    "i5-6260u": "NO",
-    "i5-7260u": "NO",
-    "i7-7567u": "NO",
-    "i7-7660u": "NO",
-    "i5-6350hq": "NO",
-
-    # --- Kaby Lake i3 ---
-    "i3-7100u": "NO",
-    "i3-7130u": "NO",
-    "i3-7100": "NO",
-    "i3-7300": "NO",
-
-    # --- Desktop i5 / i7 – korekty ---
-    "i5-6500t": "OK",
-
-    "i3-8100": "NO",
-    "i3-8350k": "NO",
-
-    "i5-8400": "VERY_GOOD",
-    "i5-8600": "VERY_GOOD",
-    "i5-8600k": "VERY_GOOD",
-
-    "i7-8700": "VERY_GOOD",
-    "i7-8700k": "VERY_GOOD",
-
-    # --- Coffee Lake i3 ---
-    "i3-9100": "NO",
-    "i3-9350k": "NO",
-
-    # --- Coffee Lake i5 ---
-    "i5-9400": "VERY_GOOD",
-    "i5-9600k": "VERY_GOOD",
-
-    # --- Comet Lake i3 ---
-    "i3-10100": "NO",
-    "i3-10300": "NO",
-
-    # --- Ice Lake ---
-    "i7-1060g7": "OK",
-
-    # --- Rocket Lake i3 ---
-    "i3-11100": "NO",
-
-    # --- Alder Lake / Raptor Lake U / P – ZA NISKIE IPC w algorytmie ---
-    "i5-1245u": "VERY_GOOD",
-    "i7-1255u": "VERY_GOOD",
-    "i5-1250p": "VERY_GOOD",
-    "i7-1270p": "VERY_GOOD",
-
-    "i5-1335u": "VERY_GOOD",
-    "i5-1345u": "VERY_GOOD",
-    "i7-1355u": "VERY_GOOD",
-    "i7-1365u": "VERY_GOOD",
-    "i5-1340p": "VERY_GOOD",
-    "i7-1360p": "VERY_GOOD",
-    "i5-1334u": "VERY_GOOD",
-    "i7-1350p": "VERY_GOOD",
-
-    # ===== Intel Core – ostatnie korekty po testach =====
-
-    # Coffee Lake i7 – desktop (pełna wydajność)
-    "i7-8700": "VERY_GOOD",
-    "i7-8700k": "VERY_GOOD",
-
-    # Skylake desktop i5 – ZA SŁABY
-    "i5-6400": "NO",
-
-    # Skylake low-power desktop
-    "i5-6500t": "OK",
+# ==================================================
+# TWARDE OVERRIDES – Z BAZY WIEDZY (data/cpu_overrides.json)
+# ==================================================
 
-}
+CPU_KB_INDEX_PATH = os.environ.get("CPU_KB_INDEX", knowledge_base.INDEX_PATH)
+CPU_KB_SOURCE_PATH = os.environ.get("CPU_KB_SOURCE", knowledge_base.SOURCE_PATH)
 
-NORMALIZED_CPU_OVERRIDES = {
-    normalize(k): v for k, v in EXACT_CPU_OVERRIDES.items()
-}
+CPU_KB_VERSION, NORMALIZED_CPU_OVERRIDES = load_overrides(
+    CPU_KB_INDEX_PATH, CPU_KB_SOURCE_PATH
+)
+
+# automat budowany raz przy imporcie – jedno przejście po tekście,
+# przy kilku trafieniach wygrywa najdłuższy klucz
+CPU_OVERRIDE_MATCHER = PatternMatcher(NORMALIZED_CPU_OVERRIDES)
+
+
+# ==================================================
+# CACHE WERDYKTÓW CPU
+# ==================================================
+
+# klucz: tekst po strip() + lower(); normalize() byłby za agresywny –
+# reguły rozróżniają np. "intel n100" i "inteln100"
+CPU_VERDICT_CACHE = LRUCache(
+    maxsize=int(os.environ.get("CPU_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("CPU_CACHE_TTL", 3600)),
+)
+
+# najczęstsze zapytania – do rozgrzania cache przy starcie
+COMMON_CPU_INPUTS = (
+    "i5-8250U",
+    "i5-1135G7",
+    "i5-10210U",
+    "i7-8550U",
+    "i3-1115G4",
+    "Ryzen 5 5500U",
+    "Ryzen 3 3200U",
+    "N100",
+    "Apple M1",
+)
+
+
+def set_cpu_overrides(overrides: dict):
+    """
+    Podmienia tabelę overrides (klucze dowolne, normalizowane tutaj)
+    i czyści cache werdyktów. Zbudowany już indeks dopasowania
+    przybliżonego jest budowany od nowa przed podmianą (~0,5 s) – wołać
+    poza pętlą zdarzeń (watcher bazy robi to w swoim wątku).
+    """
+    global NORMALIZED_CPU_OVERRIDES, CPU_OVERRIDE_MATCHER, _FUZZY_INDEX
+    normalized = {normalize(k): v for k, v in overrides.items()}
+    matcher = PatternMatcher(normalized)
+    with _FUZZY_LOCK:
+        fuzzy_index = _build_fuzzy_index(normalized) if _FUZZY_INDEX is not None else None
+        NORMALIZED_CPU_OVERRIDES, CPU_OVERRIDE_MATCHER = normalized, matcher
+        _FUZZY_INDEX = fuzzy_index
+    _activate_verdict_table()
+    _reset_prefix_index()
+    CPU_VERDICT_CACHE.clear()
+
+
+def reload_overrides():
+    """
+    Wczytuje indeks bazy wiedzy od nowa. Nowy automat jest budowany obok
+    starego i podmieniany jednym przypisaniem – obsługa zapytań nie staje.
+    """
+    global CPU_KB_VERSION
+    version, overrides = load_overrides(CPU_KB_INDEX_PATH, CPU_KB_SOURCE_PATH)
+    set_cpu_overrides(overrides)
+    CPU_KB_VERSION = version
+
+
+def _kb_stamp():
+    stamp = []
+    for path in (CPU_KB_INDEX_PATH, CPU_KB_SOURCE_PATH):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+
+def start_kb_watcher(interval: float = 5.0):
+    """
+    Wątek w tle: co `interval` s sprawdza pliki bazy wiedzy
+    i przeładowuje overrides po zmianie.
+    """
+    def watch():
+        stamp = _kb_stamp()
+        while True:
+            time.sleep(interval)
+            current = _kb_stamp()
+            if current == stamp:
+                continue
+            stamp = current
+            try:
+                reload_overrides()
+                logger.info("Przeładowano bazę CPU (wersja %s)", CPU_KB_VERSION)
+            except (OSError, ValueError):
+                # błędny plik – zostaje poprzednia tabela do następnej zmiany
+                logger.exception("Nie udało się przeładować bazy CPU")
+
+    thread = threading.Thread(target=watch, name="cpu-kb-watcher", daemon=True)
+    thread.start()
+    return thread
+
+
+# ==================================================
+# ZAMROŻONA TABELA WERDYKTÓW (data/cpu_verdicts.json.gz)
+# ==================================================
+
+CPU_VERDICT_TABLE_PATH = os.environ.get("CPU_VERDICT_TABLE", verdict_table.TABLE_PATH)
+
+# wczytana tabela; aktywna tylko, gdy zbudowano ją z tymi samymi overrides –
+# po zmianie bazy CPU (także przeładowaniu w locie) wątek w tle przelicza
+# ją z nowymi overrides (~2 s), a do tego czasu odpowiadają reguły
+_LOADED_VERDICT_TABLE = None
+CPU_VERDICT_TABLE = {}
+_TABLE_PREFIXES = ()
+_TABLE_REBUILDING = False
+_TABLE_GENERATION = 0    # unieważnia przeliczanie po kolejnej zmianie
+
+# tabelę wczytujemy leniwie, przy pierwszym CPU spoza cache poza pętlą
+# zdarzeń (bot: warm_verdict_cache w wątku) – import evaluatora i start
+# bota nie czekają na ~140 tys. wpisów
+_TABLE_LOADED = False
+_TABLE_LOCK = threading.Lock()
+
+
+def _activate_verdict_table():
+    global CPU_VERDICT_TABLE, _TABLE_PREFIXES
+    table = _LOADED_VERDICT_TABLE
+    if table is None:
+        CPU_VERDICT_TABLE, _TABLE_PREFIXES = {}, ()
+        return
+    if table.get("rules_sha256") != rules_fingerprint():
+        logger.warning(
+            "Tabela werdyktów zbudowana dla innych reguł CPU – wyłączona; "
+            "uruchom: python verdict_table.py build"
+        )
+        CPU_VERDICT_TABLE, _TABLE_PREFIXES = {}, ()
+        return
+    if table["overrides_sha256"] != verdict_table.overrides_fingerprint(
+        NORMALIZED_CPU_OVERRIDES
+    ):
+        logger.warning(
+            "Tabela werdyktów nieaktualna wobec bazy CPU – przeliczana w tle; "
+            "na stałe: python verdict_table.py build"
+        )
+        CPU_VERDICT_TABLE, _TABLE_PREFIXES = {}, ()
+        _start_table_rebuild(table)
+        return
+    CPU_VERDICT_TABLE = table["verdicts"]
+    _TABLE_PREFIXES = tuple(table.get("strip_prefixes", ()))
+
+
+def _start_table_rebuild(table: dict):
+    global _TABLE_REBUILDING, _TABLE_GENERATION
+    _TABLE_GENERATION += 1
+    _TABLE_REBUILDING = True
+    threading.Thread(
+        target=_rebuild_verdict_table, args=(table, _TABLE_GENERATION),
+        name="cpu-table-rebuild", daemon=True,
+    ).start()
+
+
+def _rebuild_verdict_table(table: dict, generation: int):
+    """Werdykty tych samych modeli z bieżącymi overrides; podmiana na końcu."""
+    global _LOADED_VERDICT_TABLE, _TABLE_REBUILDING
+    started = time.perf_counter()
+    fingerprint = verdict_table.overrides_fingerprint(NORMALIZED_CPU_OVERRIDES)
+    verdicts = {}
+    for model in table["verdicts"]:
+        if generation != _TABLE_GENERATION:
+            return   # kolejna zmiana bazy – liczy ją nowszy wątek
+        verdicts[model] = _evaluate_cpu_uncached(model)
+    with _TABLE_LOCK:
+        if generation != _TABLE_GENERATION:
+            return
+        _LOADED_VERDICT_TABLE = {**table, "overrides_sha256": fingerprint, "verdicts": verdicts}
+        _TABLE_REBUILDING = False
+        _activate_verdict_table()
+    logger.info(
+        "Tabela werdyktów przeliczona dla bazy CPU w %.1f s (%d modeli)",
+        time.perf_counter() - started, len(verdicts),
+    )
+
+
+def load_verdict_table(path: str = None):
+    """
+    Wczytuje tabelę – ze snapshotu, jeśli jest aktualny, inaczej z pliku
+    z kontrolą próbki względem reguł (tabela zbudowana przed zmianą reguł
+    nie zostanie użyta). Zwraca liczbę modeli w użyciu.
+    """
+    global _LOADED_VERDICT_TABLE, _TABLE_LOADED
+    table = None if path else _read_snapshot("table")
+
+    if table is None:
+        path = path or CPU_VERDICT_TABLE_PATH
+        try:
+            table = verdict_table.load_table(path)
+        except (OSError, ValueError):
+            logger.exception("Nie udało się wczytać tabeli werdyktów %s", path)
+            table = None
+
+        if table is not None:
+            mismatched = verdict_table.spot_check(table, _evaluate_cpu_uncached)
+            if mismatched:
+                logger.warning(
+                    "Tabela werdyktów niezgodna z regułami (np. %s) – "
+                    "uruchom: python verdict_table.py build",
+                    mismatched[0],
+                )
+                table = None
+
+    _LOADED_VERDICT_TABLE = table
+    _TABLE_LOADED = True
+    _activate_verdict_table()
+    return len(CPU_VERDICT_TABLE)
+
+
+def disable_verdict_table():
+    """
+    Werdykty bez zamrożonej tabeli – tylko baza wiedzy i reguły (np.
+    kandydat w trybie cienia: tabela ze starych reguł zakryłaby zmianę).
+    """
+    global _LOADED_VERDICT_TABLE, _TABLE_LOADED, _TABLE_REBUILDING, _TABLE_GENERATION
+    with _TABLE_LOCK:
+        _LOADED_VERDICT_TABLE = None
+        _TABLE_LOADED = True
+        _TABLE_GENERATION += 1
+        _TABLE_REBUILDING = False
+    _activate_verdict_table()
+    _reset_prefix_index()
+    CPU_VERDICT_CACHE.clear()
+
+
+def _ensure_verdict_table():
+    with _TABLE_LOCK:
+        if not _TABLE_LOADED:
+            load_verdict_table()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _table_lookup(key: str):
+    if not _TABLE_LOADED:
+        if _on_event_loop():
+            # na pętli nie wczytujemy tabeli i nie czekamy na _TABLE_LOCK
+            # (w trybie fast wczytuje ją wątek finish_startup) – do tego
+            # czasu te same werdykty dają reguły
+            return None
+        _ensure_verdict_table()
+    verdict = CPU_VERDICT_TABLE.get(key)
+    if verdict is None and CPU_VERDICT_TABLE:
+        for prefix in _TABLE_PREFIXES:
+            if key.startswith(prefix):
+                return CPU_VERDICT_TABLE.get(key[len(prefix):])
+    return verdict
+
+
+# ==================================================
+# SNAPSHOT – GOTOWE TABELE DLA SZYBKIEGO STARTU
+# ==================================================
+#
+# Tabela werdyktów i indeks dopasowania przybliżonego zapisane pickle'em.
+# Ważny tylko dla tych samych plików bazy CPU, tabeli i kodu reguł –
+# inaczej jest pomijany i wszystko budujemy jak zwykle.
+#
+# Przy budowie obrazu kontenera:  python verdict_table.py snapshot
+
+CPU_SNAPSHOT_PATH = os.environ.get(
+    "CPU_SNAPSHOT_PATH", os.path.join(knowledge_base.DATA_DIR, "evaluator.snapshot")
+)
+
+
+def _snapshot_stamp() -> str:
+    digest = hashlib.sha256(sys.version.encode())
+    for path in (
+        CPU_KB_INDEX_PATH,
+        CPU_KB_SOURCE_PATH,
+        CPU_VERDICT_TABLE_PATH,
+        __file__,
+        knowledge_base.__file__,
+        verdict_table.__file__,
+        fuzzy.__file__,
+    ):
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _read_snapshot(part: str):
+    """Część snapshotu ("table" / "fuzzy") albo None, gdy brak lub nieaktualny."""
+    if not CPU_SNAPSHOT_PATH or not os.path.exists(CPU_SNAPSHOT_PATH):
+        return None
+    try:
+        with open(CPU_SNAPSHOT_PATH, "rb") as f:
+            snapshot = pickle.load(f)
+        if snapshot.get("stamp") != _snapshot_stamp():
+            logger.info("Snapshot evaluatora nieaktualny – pomijam %s", CPU_SNAPSHOT_PATH)
+            return None
+        blob = snapshot.get(part)
+        return pickle.loads(blob) if blob is not None else None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        logger.exception("Nie udało się wczytać snapshotu %s", CPU_SNAPSHOT_PATH)
+        return None
+
+
+def write_snapshot(path: str = None) -> str:
+    path = path or CPU_SNAPSHOT_PATH
+    _ensure_verdict_table()
+    snapshot = {
+        "stamp": _snapshot_stamp(),
+        "table": pickle.dumps(_LOADED_VERDICT_TABLE, pickle.HIGHEST_PROTOCOL),
+        "fuzzy": pickle.dumps(
+            (verdict_table.overrides_fingerprint(NORMALIZED_CPU_OVERRIDES), _fuzzy_index()),
+            pickle.HIGHEST_PROTOCOL,
+        ),
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+# ==================================================
+# DOPASOWANIE PRZYBLIŻONE – OSTATNIA PRÓBA PRZED "UNKNOWN"
+# ==================================================
+
+# poniżej tej pewności zostaje UNKNOWN (i wpis do arkusza)
+CPU_FUZZY_MIN_CONFIDENCE = float(os.environ.get("CPU_FUZZY_MIN_CONFIDENCE", 0.8))
+
+# ~140 tys. nazw, budowa ~0,5 s: bot buduje go w wątku (warm_fuzzy_index
+# przy starcie, set_cpu_overrides w watcherze bazy). Na pętli zdarzeń do
+# tego czasu nieznane CPU zostają UNKNOWN bez dopasowania; poza nią
+# (CLI, golden, kandydat shadow) indeks powstaje przy pierwszym użyciu.
+_FUZZY_INDEX = None
+_FUZZY_LOCK = threading.Lock()
+
+
+def fuzzy_ready() -> bool:
+    return _FUZZY_INDEX is not None
+
+
+def warm_fuzzy_index():
+    """Wczytanie (snapshot) albo budowa indeksu – blokuje, wołać poza pętlą."""
+    _fuzzy_index()
+
+
+def _usable_fuzzy_index() -> Optional[FuzzyIndex]:
+    index = _FUZZY_INDEX
+    if index is None and not _on_event_loop():
+        index = _fuzzy_index()
+    return index
+
+
+def _fuzzy_index() -> FuzzyIndex:
+    global _FUZZY_INDEX
+    index = _FUZZY_INDEX
+    if index is None:
+        with _FUZZY_LOCK:
+            if _FUZZY_INDEX is None:
+                _FUZZY_INDEX = _load_fuzzy_index() or _build_fuzzy_index()
+            index = _FUZZY_INDEX
+    return index
+
+
+def _build_fuzzy_index(overrides: dict = None) -> FuzzyIndex:
+    index = FuzzyIndex(verdict_table.enumerate_sku_space())
+    for key in NORMALIZED_CPU_OVERRIDES if overrides is None else overrides:
+        index.add(key, key, known=True)
+    return index
+
+
+def _load_fuzzy_index():
+    stored = _read_snapshot("fuzzy")
+    if stored is None:
+        return None
+    fingerprint, index = stored
+    # overrides podmienione w locie (set_cpu_overrides) -> budujemy od nowa
+    if fingerprint != verdict_table.overrides_fingerprint(NORMALIZED_CPU_OVERRIDES):
+        return None
+    return index
+
+
+def _model_verdict(model: str) -> str:
+    return _table_lookup(model) or _evaluate_cpu_uncached(model)
+
+
+def fuzzy_match(cpu_name: str) -> Optional[FuzzyMatch]:
+    """
+    Najbliższy znany model dla nazwy z literówką, np. "i5 825ou" -> i5-8250u.
+    Zwraca (model, werdykt, pewność, liczba kandydatów) albo None – także
+    na pętli zdarzeń, zanim indeks jest gotowy.
+    """
+    index = _usable_fuzzy_index()
+    return index.match(cpu_name, _model_verdict) if index is not None else None
+
+
+# ==================================================
+# PODPOWIEDZI PO PREFIKSIE (TRYB INLINE)
+# ==================================================
+
+# odpowiedzi per prefiks; czyszczone razem z indeksem przy zmianie overrides
+CPU_SUGGEST_CACHE = LRUCache(maxsize=int(os.environ.get("CPU_SUGGEST_CACHE_SIZE", 8192)))
+
+# tylko modele, które istnieją – nie cała przestrzeń SKU z tabeli
+CPU_MODELS_PATH = os.environ.get("CPU_MODELS", verdict_table.MODELS_PATH)
+
+_PREFIX_INDEX = None
+_PREFIX_LOCK = threading.Lock()
+
+# modele obsługiwane osobnymi regułami (poza tabelą i bazą wiedzy)
+APPLE_SUGGESTIONS = ("apple m1", "apple m2", "apple m3", "apple m4")
+
+
+def _reset_prefix_index():
+    global _PREFIX_INDEX
+    _PREFIX_INDEX = None
+    CPU_SUGGEST_CACHE.clear()
+
+
+def _prefix_index() -> PrefixIndex:
+    global _PREFIX_INDEX
+    index = _PREFIX_INDEX
+    if index is None:
+        with _PREFIX_LOCK:
+            if _PREFIX_INDEX is None:
+                _PREFIX_INDEX = _build_prefix_index()
+            index = _PREFIX_INDEX
+    return index
+
+
+def _build_prefix_index() -> PrefixIndex:
+    """
+    Realne modele z CPU_MODELS_PATH z werdyktem z tabeli albo reguł +
+    klucze bazy wiedzy + Intel N i Apple M; te ostatnie idą w wynikach
+    pierwsze. Tabela obejmuje też numery, których nie ma (i5-1200,
+    i5-12005) – podpowiadamy tylko z listy.
+    Klucze bez prefiksu producenta, jak zapytania ("inteln100" -> "n100").
+    """
+    _ensure_verdict_table()
+    try:
+        models = verdict_table.load_models(CPU_MODELS_PATH)
+    except OSError:
+        logger.exception("Nie udało się wczytać listy modeli %s", CPU_MODELS_PATH)
+        models = []
+    strip = fuzzy.strip_vendor
+    entries = []
+    for model in models:
+        verdict = _model_verdict(model)
+        # model, którego reguły nie oceniają (np. Core Ultra spoza bazy), nic nie podpowie
+        if verdict != "UNKNOWN":
+            entries.append((strip(normalize(model), 1), model, verdict, False))
+    entries.extend(
+        (strip(key, 1), key, verdict, True) for key, verdict in NORMALIZED_CPU_OVERRIDES.items()
+    )
+    for name in sorted(INTEL_N_FORCE) + list(APPLE_SUGGESTIONS):
+        entries.append((strip(normalize(name), 1), name, evaluate_cpu(name), True))
+    return PrefixIndex(entries)
+
+
+def suggestions_ready() -> bool:
+    return _PREFIX_INDEX is not None
+
+
+def warm_suggestions():
+    """Budowa indeksu (~0,1 s) – zwykle przy pierwszym zapytaniu inline."""
+    _prefix_index()
+
+
+def suggest_cpus(query: str, limit: int = 10) -> tuple:
+    """
+    Modele CPU zaczynające się od wpisanego tekstu: krotka (nazwa, werdykt).
+    "Intel Core i5-12" -> modele i512...
+    """
+    key = fuzzy.strip_vendor(normalize(query), min_rest=1)
+    if not key:
+        return ()
+    cached = CPU_SUGGEST_CACHE.get((key, limit))
+    if cached is None:
+        cached = tuple(_prefix_index().search(key, limit))
+        CPU_SUGGEST_CACHE.put((key, limit), cached)
+    return cached
+
+
+def warm_verdict_cache(inputs=COMMON_CPU_INPUTS):
+    for cpu in inputs:
+        evaluate_cpu(cpu)
+
+
+def verdict_cache_stats() -> dict:
+    return {
+        **CPU_VERDICT_CACHE.stats(),
+        "table_size": len(CPU_VERDICT_TABLE),
+        # bez tabeli: brak pliku, inne reguły albo przeliczanie po zmianie bazy
+        "table_disabled": int(_TABLE_LOADED and not CPU_VERDICT_TABLE),
+        "table_rebuilding": int(_TABLE_REBUILDING),
+    }
 
 
 
@@ -255,21 +566,29 @@ INTEL_N_FORCE = {
 
 GSHEET_WEBHOOK_URL = os.environ.get("GSHEET_WEBHOOK_URL")
 
+UNKNOWN_CPU_SINK = UnknownCpuSink(
+    GSHEET_WEBHOOK_URL,
+    spill_path=os.environ.get("UNKNOWN_CPU_SPILL_PATH", "unknown_cpu_spill.jsonl"),
+    maxsize=int(os.environ.get("UNKNOWN_CPU_QUEUE_SIZE", 1000)),
+    batch_size=int(os.environ.get("UNKNOWN_CPU_BATCH_SIZE", 50)),
+    flush_interval=float(os.environ.get("UNKNOWN_CPU_FLUSH_INTERVAL", 2.0)),
+)
+
+# "summary": co UNKNOWN_CPU_SUMMARY_INTERVAL s top-K nieznanych CPU
+# z licznikami; "rows": jak dawniej, wiersz na każde zdarzenie
+UNKNOWN_CPU_LOG_MODE = os.environ.get("UNKNOWN_CPU_LOG", "summary")
+
+UNKNOWN_CPU_SUMMARY = UnknownCpuSummary(
+    UNKNOWN_CPU_SINK,
+    capacity=int(os.environ.get("UNKNOWN_CPU_TRACKED", 256)),
+    top_k=int(os.environ.get("UNKNOWN_CPU_TOP_K", 20)),
+    interval=float(os.environ.get("UNKNOWN_CPU_SUMMARY_INTERVAL", 300)),
+)
+
 # ==================================================
 # POMOCNICZE
 # ==================================================
 
-def extract_intel_model(cpu: str):
-    return re.search(r"(i[3579]-\d{4,5}[a-z]*)", cpu.lower())
-
-def extract_intel_generation(model: str):
-    m = re.search(r"i[3579]-(\d{4,5})", model) 
-    if not m:
-         return None 
-    num = m.group(1) 
-    return int(num[:2]) if len(num) == 5 else int(num[0])
-
-
 def extract_ram_gb(text: str):
     m = re.search(r"(\d+)\s*gb", text.lower())
     return int(m.group(1)) if m else None
@@ -278,126 +597,541 @@ def extract_ram_gb(text: str):
 # GOOGLE SHEETS – LOG UNKNOWN
 # ==================================================
 
+# nie blokuje – licznik w pamięci (top-K dla API) + wiersz do kolejki
+# tylko w trybie "rows"; wysyłka paczkami w tle
 def log_unknown_cpu(cpu: str, ram: int):
-    if not GSHEET_WEBHOOK_URL:
-        return
-    try:
-        requests.post(
-            GSHEET_WEBHOOK_URL,
-            json={
-                "cpu": cpu,
-                "ram": ram,
-                "date": datetime.utcnow().isoformat()
-            },
-            timeout=5
-        )
-    except Exception:
-        pass
+    UNKNOWN_CPU_SUMMARY.add(cpu, ram)
+    if UNKNOWN_CPU_LOG_MODE == "rows":
+        UNKNOWN_CPU_SINK.submit({
+            "cpu": cpu,
+            "ram": ram,
+            "date": datetime.utcnow().isoformat()
+        })
 
 # ==================================================
-# GŁÓWNA OCENA CPU
+# REGUŁY CPU – JEDEN PRZEBIEG PO TEKŚCIE
 # ==================================================
 
-def evaluate_cpu(cpu_name: str) -> str:
-    raw = cpu_name.lower()
-    norm = normalize(cpu_name)
-
-    # ✅ 000. TWARDY OVERRIDE – BEZ DALSZEJ LOGIKI
-    norm_cpu = normalize(cpu_name)
-
-    for key, value in NORMALIZED_CPU_OVERRIDES.items():
-        if key in norm_cpu:
-            return value
-
-
+# granice sekcji dla rules_fingerprint()
+_RULES_SECTION = "# REGUŁY CPU – JEDEN PRZEBIEG PO TEKŚCIE"
+_EVALUATION_SECTION = "# GŁÓWNA OCENA CPU"
+
+# "celeron" / "atom" szukamy tak, jakby tekst był znormalizowany
+# (dowolne znaki nie-alfanumeryczne między literami)
+def _spaced(word: str) -> str:
+    return r"[^a-z0-9]*".join(word)
+
+
+# wszystkie wpisy INTEL_N_FORCE zaczynają się od "i"
+_INTEL_N_PATTERN = "i(?:" + "|".join(
+    re.escape(n[1:]) for n in sorted(INTEL_N_FORCE, key=len, reverse=True)
+) + ")"
+
+# (rodzaj, priorytet, wzorzec) – niższy priorytet wygrywa;
+# każdy wzorzec zaczyna się od zwykłej litery
+CPU_TOKENS = (
+    ("intel_n", 0, _INTEL_N_PATTERN),
+    ("celeron", 1, _spaced("celeron")),
+    ("atom", 1, _spaced("atom")),
+    ("ryzen_weak", 2, r"ryzen\s*3\s*(?P<weak_model>2200|2300|3200)u"),
+    ("apple", 3, r"apple m(?P<apple_gen>\d+)?"),
+    ("m_chip", 3, r"m(?<!\wm)(?P<m_gen>[123])\b"),
+    ("snapdragon_x", 4, r"snapdragon x"),
+    ("snapdragon", 5, r"snapdragon"),
+    ("core_ultra", 6, r"core ultra"),
+    ("intel_core", 7, r"i(?P<core_tier>[3579])-(?P<core_number>\d{4,5})(?P<core_suffix>[a-z]*)"),
+    ("ryzen", 8, r"ryzen\s*(?P<ryzen_tier>[3579])?(?:\s*(?P<ryzen_number>\d{4})(?P<ryzen_suffix>[a-z]*))?"),
+)
+
+
+def _compile_tokens(tokens):
+    """
+    Jeden regex dla całej tabeli: konsumujemy tylko pierwszą literę,
+    resztę sprawdzamy w lookahead. Tokeny mogą się więc nakładać,
+    a `re` szybko przeskakuje pozycje, od których nic się nie zaczyna.
+    """
+    by_first = {}
+    for kind, _, pattern in sorted(tokens, key=lambda t: t[1]):
+        by_first.setdefault(pattern[0], []).append(f"(?P<{kind}>{pattern[1:]})")
+    return re.compile("|".join(
+        f"{first}(?=" + "|".join(branches) + ")" for first, branches in by_first.items()
+    ))
+
+
+_TOKEN_RE = _compile_tokens(CPU_TOKENS)
+_TOKEN_PRIORITY = {kind: priority for kind, priority, _ in CPU_TOKENS}
+_NO_TOKEN = max(_TOKEN_PRIORITY.values()) + 1
+
+
+class CpuParse(NamedTuple):
+    vendor: Optional[str]
+    family: Optional[str]
+    generation: Optional[int] = None
+    model: Optional[str] = None
+    suffix: str = ""
+
+
+UNPARSED = CpuParse(None, None)
+
+
+def _intel_generation(number: str) -> int:
+    return int(number[:2]) if len(number) == 5 else int(number[0])
+
+
+def parse_cpu(raw: str) -> CpuParse:
+    """
+    Jeden przebieg po tekście (małe litery) -> struktura CPU
+    z rodzaju o najwyższym priorytecie.
+    """
+    best = None
+    best_priority = _NO_TOKEN
+    priorities = _TOKEN_PRIORITY
+    # ryzen: seria z pierwszego wystąpienia, które ją podaje
+    ryzen_tiered = None
+    for m in _TOKEN_RE.finditer(raw):
+        kind = m.lastgroup
+        priority = priorities[kind]
+        # przy tym samym rodzaju liczy się pierwsze (najbardziej lewe) trafienie
+        if priority < best_priority:
+            best, best_priority = m, priority
+            if priority == 0:
+                break
+        if kind == "ryzen" and ryzen_tiered is None and m.group("ryzen_tier"):
+            ryzen_tiered = m
+
+    if best is None:
+        return UNPARSED
+
+    kind = best.lastgroup
+    if kind == "intel_core":
+        number = best.group("core_number")
+        suffix = best.group("core_suffix")
+        # numeru nie ma: 5 cyfr spoza gen 10–14 ("i5-82500u") albo ucięte
+        # g1/g4/g7 gen 10–11 ("i7-1165g") – UNKNOWN, potem dopasowanie przybliżone
+        if (len(number) == 5 and number[0] != "1") or (
+            suffix == "g" and number[0] == "1" and len(number) == 4
+            and not raw[best.end("core_suffix"):best.end("core_suffix") + 1].isdigit()
+        ):
+            return UNPARSED
+        return CpuParse(
+            "intel",
+            "i" + best.group("core_tier"),
+            generation=_intel_generation(number),
+            model=number,
+            suffix=suffix,
+        )
+    if kind == "intel_n":
+        return CpuParse("intel", "n", model="n" + best.group(kind).rsplit("n", 1)[-1])
+    if kind in ("celeron", "atom"):
+        return CpuParse("intel", kind)
+    if kind == "ryzen_weak":
+        return CpuParse("amd", "ryzen 3", model=best.group("weak_model"), suffix="u")
+    if kind in ("apple", "m_chip"):
+        gen = best.group("apple_gen") or best.group("m_gen")
+        return CpuParse("apple", "m", generation=int(gen) if gen else None)
+    if kind == "snapdragon_x":
+        return CpuParse("qualcomm", "snapdragon x")
+    if kind == "snapdragon":
+        return CpuParse("qualcomm", "snapdragon")
+    if kind == "core_ultra":
+        return CpuParse("intel", "core ultra")
+
+    if ryzen_tiered is None:
+        return CpuParse("amd", "ryzen")
+    return CpuParse(
+        "amd",
+        "ryzen " + ryzen_tiered.group("ryzen_tier"),
+        model=ryzen_tiered.group("ryzen_number"),
+        suffix=ryzen_tiered.group("ryzen_suffix") or "",
+    )
+
+
+# (vendor, family, warunek, werdykt) – pierwsza pasująca reguła wygrywa;
+# family None = dowolna, warunek None = zawsze
+CPU_RULES = (
     # 0️⃣ INTEL N – HARD BYPASS
-    for n in INTEL_N_FORCE:
-        if n in raw:
-            return "VERY_GOOD"
+    ("intel", "n", None, "VERY_GOOD"),
 
     # 1️⃣ BEZWZGLĘDNE NO
-    if "celeron" in norm or "atom" in norm:
-        return "NO"
-
-    if "ryzen" in norm and re.search(r"ryzen\s*3\s*(2200u|2300u|3200u)", raw):
-        return "NO"
+    ("intel", "celeron", None, "NO"),
+    ("intel", "atom", None, "NO"),
+    ("amd", "ryzen 3", lambda p: p.model in ("2200", "2300", "3200") and p.suffix.startswith("u"), "NO"),
 
     # 2️⃣ APPLE / SNAPDRAGON / ULTRA
-    if "apple m" in raw or re.search(r"\bm[123]\b", raw):
-        return "VERY_GOOD"
+    ("apple", None, None, "VERY_GOOD"),
+    ("qualcomm", "snapdragon x", None, "VERY_GOOD"),
+    ("qualcomm", "snapdragon", None, "NO"),
+    ("intel", "core ultra", None, "VERY_GOOD"),
 
-    if "snapdragon x" in raw:
-        return "VERY_GOOD"
-    if "snapdragon" in raw:
-        return "NO"
+    # 3️⃣ INTEL CORE
+    # stare generacje = NO (Twoje testy!)
+    ("intel", ("i3", "i5", "i7", "i9"), lambda p: p.generation <= 4, "NO"),
+    # wydajne suffixy = VERY_GOOD
+    ("intel", ("i3", "i5", "i7", "i9"), lambda p: "h" in p.suffix or "p" in p.suffix, "VERY_GOOD"),
+    # desktop i3 gen ≥12 = VERY_GOOD
+    ("intel", "i3", lambda p: p.generation >= 12 and not p.suffix.endswith("u"), "VERY_GOOD"),
+    # i3 mobilne = OK
+    ("intel", "i3", None, "OK"),
+    # i5 mobilne 8–9 gen = OK
+    ("intel", "i5", lambda p: p.generation in (8, 9), "OK"),
+    # reszta i5 / i7 / i9
+    ("intel", ("i5", "i7", "i9"), None, "VERY_GOOD"),
 
-    if "core ultra" in raw:
-        return "VERY_GOOD"
+    # 4️⃣ AMD RYZEN
+    ("amd", "ryzen 3", None, "OK"),
+    ("amd", ("ryzen 5", "ryzen 7", "ryzen 9"), None, "VERY_GOOD"),
+)
+
+
+# (vendor, family) -> reguły, które mogą pasować; budowane przy pierwszym użyciu
+_RULES_BY_FAMILY = {}
+
+
+def _rules_for(vendor, family):
+    key = (vendor, family)
+    rules = _RULES_BY_FAMILY.get(key)
+    if rules is None:
+        rules = tuple(
+            (condition, verdict)
+            for rule_vendor, rule_family, condition, verdict in CPU_RULES
+            if rule_vendor == vendor and (
+                rule_family is None
+                or rule_family == family
+                or (isinstance(rule_family, tuple) and family in rule_family)
+            )
+        )
+        _RULES_BY_FAMILY[key] = rules
+    return rules
 
-    # 3️⃣ INTEL CORE
-    m = extract_intel_model(raw)
-    if m:
-        model = m.group(1)
-        gen = extract_intel_generation(model)
 
-        # stare generacje = NO (Twoje testy!)
-        if gen is not None and gen <= 4:
-            return "NO"
+def apply_cpu_rules(cpu: CpuParse) -> str:
+    for condition, verdict in _rules_for(cpu.vendor, cpu.family):
+        if condition is None or condition(cpu):
+            return verdict
+    return "UNKNOWN"
+
 
-        # wydajne suffixy = VERY_GOOD
-        if any(x in model for x in ("h", "hq", "hk", "hx", "p")):
-            return "VERY_GOOD"
+_RULES_FINGERPRINT = None
+
+
+def rules_fingerprint() -> str:
+    """
+    sha256 definicji reguł – zapisywany w tabeli werdyktów, żeby tabela
+    zbudowana przed zmianą reguł nie była używana. Liczony ze źródła
+    sekcji "REGUŁY CPU" tego pliku (CPU_TOKENS, parse_cpu, CPU_RULES
+    z warunkami, apply_cpu_rules) i z INTEL_N_FORCE. Źródło, a nie
+    bytecode – ten zależy od wersji Pythona.
+    """
+    global _RULES_FINGERPRINT
+    if _RULES_FINGERPRINT is None:
+        # sorted – kolejność zbioru zależy od PYTHONHASHSEED (tak samo
+        # _INTEL_N_PATTERN, dlatego nie repr(CPU_TOKENS))
+        parts = [repr(sorted(INTEL_N_FORCE))]
+        try:
+            with open(__file__, encoding="utf-8") as f:
+                source = f.read()
+            # całe linie banerów, nie stałe poniżej
+            start = source.find(f"\n{_RULES_SECTION}\n")
+            end = source.find(f"\n{_EVALUATION_SECTION}\n")
+            # bez znaczników – cały plik (każda zmiana unieważni tabelę)
+            parts.append(source[start:end] if 0 <= start < end else source)
+        except OSError:
+            # bez plików źródłowych (np. same .pyc)
+            for rule in CPU_RULES:
+                code = getattr(rule[2], "__code__", None)
+                parts.append(repr(rule[:2] + rule[3:]))
+                if code is not None:
+                    parts.append(repr((code.co_code, code.co_consts, code.co_names)))
+        _RULES_FINGERPRINT = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+    return _RULES_FINGERPRINT
 
-        # desktop i3 gen ≥12 = VERY_GOOD
-        if model.startswith("i3") and gen >= 12 and not model.endswith("u"):
-            return "VERY_GOOD"
 
-        # i3 mobilne = OK
-        if model.startswith("i3"):
-            return "OK"
+# ==================================================
+# GŁÓWNA OCENA CPU
+# ==================================================
 
-        # i5 mobilne 8–9 gen = OK
-        if model.startswith("i5") and gen in (8, 9):
-            return "OK"
+_TABLE_SECONDS = metrics.stage("cpu_table")
+_OVERRIDES_SECONDS = metrics.stage("cpu_overrides")
+_RULES_SECONDS = metrics.stage("cpu_rules")
+_FUZZY_SECONDS = metrics.stage("cpu_fuzzy")
 
-        # reszta i5 / i7 / i9
-        if model.startswith(("i5", "i7", "i9")):
-            return "VERY_GOOD"
 
-    # 4️⃣ AMD RYZEN
-    if "ryzen" in norm:
-        m = re.search(r"ryzen\s*([3579])", raw)
-        if not m:
-            return "UNKNOWN"
-        return "OK" if m.group(1) == "3" else "VERY_GOOD"
+def evaluate_cpu(cpu_name: str) -> str:
+    key = cpu_name.strip().lower()
+    verdict = CPU_VERDICT_CACHE.get(key)
+    if verdict is None:
+        started = time.perf_counter()
+        verdict = _table_lookup(key)
+        _TABLE_SECONDS.observe(time.perf_counter() - started)
+        if verdict is None:
+            verdict = _evaluate_cpu_uncached(key)
+        if verdict == "UNKNOWN":
+            verdict = _evaluate_cpu_fuzzy(key)
+            if verdict is None:
+                # indeks dopasowania jeszcze się buduje – bez zapisu do
+                # cache, żeby po jego zbudowaniu dostać dopasowanie
+                return "UNKNOWN"
+        CPU_VERDICT_CACHE.put(key, verdict)
+    return verdict
+
+
+def _evaluate_cpu_fuzzy(cpu: str) -> Optional[str]:
+    """Werdykt najbliższego modelu, "UNKNOWN" albo None – indeks niegotowy."""
+    index = _usable_fuzzy_index()
+    if index is None:
+        return None
+    started = time.perf_counter()
+    match = index.match(cpu, _model_verdict)
+    _FUZZY_SECONDS.observe(time.perf_counter() - started)
+    if match is None or match.confidence < CPU_FUZZY_MIN_CONFIDENCE:
+        return "UNKNOWN"
+    logger.info(
+        "CPU %r dopasowane do %s (pewność %.2f, kandydatów %d)",
+        cpu, match.model, match.confidence, match.candidates,
+    )
+    return match.verdict
+
+
+def _evaluate_cpu_uncached(cpu: str) -> str:
+    # ✅ 000. TWARDY OVERRIDE – BEZ DALSZEJ LOGIKI
+    started = time.perf_counter()
+    override = CPU_OVERRIDE_MATCHER.lookup(normalize(cpu))
+    checked = time.perf_counter()
+    _OVERRIDES_SECONDS.observe(checked - started)
+    if override is not None:
+        return override
+
+    verdict = apply_cpu_rules(parse_cpu(cpu))
+    _RULES_SECONDS.observe(time.perf_counter() - checked)
+    return verdict
 
-    return "UNKNOWN"
 
 # ==================================================
 # PUBLIC API
 # ==================================================
 
-def evaluate_hardware(user_input: str) -> str:
+HARDWARE_MESSAGES = {
+    "BAD_FORMAT": "❌ Podaj dane w formacie: `CPU, 8GB RAM`",
+    "NO_RAM": "❌ Nie wykryto ilości RAM (np. 8GB).",
+    "LOW_RAM": "❌ Za mało RAM (minimum 8 GB).",
+    "NO": "❌ Procesor zbyt słaby na Roblox Studio.",
+    "OK": "✅ Roblox Studio będzie działał poprawnie.",
+    "VERY_GOOD": "🚀 Roblox Studio będzie działał bardzo płynnie.",
+    "UNKNOWN": "❓ Procesor nieznany – zapisano do analizy. Zapytaj o ten konkretny przypadek na czacie - URGENT.",
+}
+
+
+def classify_hardware(user_input: str):
+    """
+    Zwraca (werdykt, cpu, ram_gb); werdykt to klucz HARDWARE_MESSAGES.
+    """
     if "," not in user_input:
-        return "❌ Podaj dane w formacie: `CPU, 8GB RAM`"
+        return "BAD_FORMAT", None, None
 
     cpu, ram = [x.strip() for x in user_input.split(",", 1)]
     ram_gb = extract_ram_gb(ram)
 
     if ram_gb is None:
-        return "❌ Nie wykryto ilości RAM (np. 8GB)."
+        return "NO_RAM", cpu, None
 
     if ram_gb < 8:
-        return "❌ Za mało RAM (minimum 8 GB)."
+        return "LOW_RAM", cpu, ram_gb
+
+    return evaluate_cpu(cpu), cpu, ram_gb
+
+
+_EVALUATE_SECONDS = metrics.stage("evaluate_hardware")
 
-    result = evaluate_cpu(cpu)
+# wołane po każdej ocenie jako observe(wejście, werdykt), np.
+# shadow.ShadowEvaluator.observe; muszą być tanie i nie rzucać wyjątków
+VERDICT_OBSERVERS = []
 
-    if result == "NO":
-        return "❌ Procesor zbyt słaby na Roblox Studio."
-    if result == "OK":
-        return "✅ Roblox Studio będzie działał poprawnie."
-    if result == "VERY_GOOD":
-        return "🚀 Roblox Studio będzie działał bardzo płynnie."
 
-    log_unknown_cpu(cpu, ram_gb)
-    return "❓ Procesor nieznany – zapisano do analizy. Zapytaj o ten konkretny przypadek na czacie - URGENT."
+@traced("evaluate_hardware")
+def evaluate_hardware(user_input: str, messages: dict = HARDWARE_MESSAGES) -> str:
+    """Werdykt jako tekst odpowiedzi; `messages` – inne teksty (np. bot w innym języku)."""
+    started = time.perf_counter()
+    result, cpu, ram_gb = classify_hardware(user_input)
+    _EVALUATE_SECONDS.observe(time.perf_counter() - started)
+    metrics.VERDICT_TOTAL.labels(result).inc()
+
+    if result == "UNKNOWN":
+        log_unknown_cpu(cpu, ram_gb)
+    for observe in VERDICT_OBSERVERS:
+        observe(user_input, result)
+
+    return messages[result]
+
+
+def evaluate_many(inputs):
+    """
+    Generator werdyktów (klucze HARDWARE_MESSAGES) dla wielu wejść
+    "CPU, 8GB RAM". Nie loguje nieznanych CPU.
+    """
+    for user_input in inputs:
+        yield classify_hardware(user_input)[0]
+
+
+def _evaluate_chunk(inputs):
+    """Werdykty paczki; None (wiersz nie do odczytania) -> ROW_ERROR."""
+    verdicts = evaluate_many([i for i in inputs if i is not None])
+    return [ROW_ERROR if i is None else next(verdicts) for i in inputs]
+
+
+# ==================================================
+# CLI – OCENA WIELU WIERSZY (CSV / JSONL)
+# ==================================================
+
+# werdykt wiersza, którego nie da się odczytać – przebieg idzie dalej
+ROW_ERROR = "ERROR"
+# tyle błędnych wierszy opisujemy na stderr, resztę tylko liczymy
+ROW_ERRORS_REPORTED = 20
+
+
+class _BadRow(dict):
+    """Wiersz nie do odczytania: {"line": numer linii, "error": opis}."""
+
+
+def _read_rows(f, fmt):
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        yield reader.fieldnames or []
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield _BadRow(line=reader.line_num, error=f"błędny CSV: {e}")
+                continue
+            if None in row:
+                # DictWriter i tak by go nie zapisał
+                yield _BadRow(line=reader.line_num, error="więcej pól niż w nagłówku")
+            else:
+                yield row
+    else:
+        yield None
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield _BadRow(line=number, error=f"błędny JSON: {e}")
+                continue
+            if isinstance(row, dict):
+                yield row
+            else:
+                yield _BadRow(line=number, error=f"oczekiwano obiektu JSON, jest {type(row).__name__}")
+
+
+def _row_input(row, args) -> Optional[str]:
+    if isinstance(row, _BadRow):
+        return None
+    spec = row.get(args.spec_column)
+    if spec:
+        return str(spec)
+    return f"{row.get(args.cpu_column) or ''}, {row.get(args.ram_column) or ''}"
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _evaluated_chunks(chunks, args):
+    """
+    (wiersze, werdykty) w kolejności wejścia. Z --workers > 1 liczy paczki
+    w puli procesów, trzymając w locie najwyżej 2 * workers paczek –
+    pamięć nie rośnie z rozmiarem pliku.
+    """
+    if args.workers <= 1:
+        for chunk in chunks:
+            yield chunk, _evaluate_chunk([_row_input(r, args) for r in chunk])
+        return
+
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for chunk in chunks:
+            inputs = [_row_input(r, args) for r in chunk]
+            in_flight.append((chunk, pool.submit(_evaluate_chunk, inputs)))
+            if len(in_flight) >= 2 * args.workers:
+                rows, future = in_flight.popleft()
+                yield rows, future.result()
+        while in_flight:
+            rows, future = in_flight.popleft()
+            yield rows, future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m evaluator",
+        description="Ocena sprzętu pod Roblox Studio dla pliku CSV / JSONL.",
+    )
+    parser.add_argument("input", help="plik wejściowy (- = stdin)")
+    parser.add_argument("-o", "--output", default="-", help="plik wyjściowy (- = stdout)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="domyślnie wg rozszerzenia")
+    parser.add_argument("--spec-column", default="spec", help='kolumna "CPU, 8GB RAM"')
+    parser.add_argument("--cpu-column", default="cpu")
+    parser.add_argument("--ram-column", default="ram")
+    parser.add_argument("--verdict-column", default="verdict")
+    parser.add_argument("--workers", type=int, default=1, help="liczba procesów")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("jsonl" if args.input.endswith((".jsonl", ".ndjson")) else "csv")
+
+    src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+
+    start = time.perf_counter()
+    count = bad = 0
+    try:
+        rows = _read_rows(src, fmt)
+        fieldnames = next(rows)
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(dst, fieldnames=fieldnames + [args.verdict_column])
+            writer.writeheader()
+
+        for chunk, verdicts in _evaluated_chunks(_chunks(rows, args.chunk_size), args):
+            for row, verdict in zip(chunk, verdicts):
+                if isinstance(row, _BadRow):
+                    bad += 1
+                    if bad <= ROW_ERRORS_REPORTED:
+                        print(f"linia {row['line']}: {row['error']}", file=sys.stderr)
+                    if writer is not None:
+                        # pusty wiersz z werdyktem – wyjście zostaje równoległe do wejścia
+                        row = {}
+                row[args.verdict_column] = verdict
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    dst.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += len(chunk)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{count} wierszy w {elapsed:.2f} s ({count / elapsed if elapsed else 0:,.0f} wierszy/s), "
+        f"błędnych: {bad}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    # worker-y puli muszą widzieć funkcje modułu "evaluator", nie "__main__"
+    import evaluator
+    sys.exit(evaluator.main())
@@ -0,0 +1,186 @@
+from array import array
+
+# ==================================================
+# OCHRONA PRZED ZALEWEM WIADOMOŚCI (PER CZAT / PER UŻYTKOWNIK)
+# ==================================================
+#
+# Kubełek żetonów jako GCRA: na klucz jedna liczba – teoretyczny czas
+# przybycia (TAT); "pełny kubełek" = TAT w przeszłości. Klucze (id czatów
+# / użytkowników, int64) i TAT leżą w dwóch tablicach array z adresowaniem
+# otwartym – 16 B na slot, bez obiektów Pythona na wpis. Bezczynne wpisy
+# zwalnia "wskazówka zegara": każda decyzja sprawdza kilka kolejnych
+# slotów, więc nie ma okresowego przeglądu całej tablicy.
+
+# sloty sprawdzane przy nowym kluczu (przy znanym – jeden)
+SWEEP_STEP = 8
+
+ALLOW = "allow"
+DROP = "drop"
+NOTICE = "notice"   # odrzucone + jedno powiadomienie dla czatu
+
+_EMPTY = -(1 << 63)
+_GOLDEN = 0x9E3779B97F4A7C15
+_U64 = (1 << 64) - 1
+
+
+class BucketTable:
+    """
+    Kubełki żetonów dla kluczy int: `rate` żetonów/s, najwyżej `burst`.
+
+    Tablica rośnie dwukrotnie przy zapełnieniu w połowie (jednorazowe
+    przepisanie wszystkich wpisów). Przy `capacity` aktywnych kluczach
+    nowe klucze są przepuszczane bez śledzenia – lepiej przepuścić niż
+    zablokować kogoś przez przepełnienie tablicy.
+    """
+
+    __slots__ = ("interval", "tolerance", "capacity", "_keys", "_tats",
+                 "_mask", "_shift", "_size", "_hand")
+
+    def __init__(self, rate: float, burst: float, capacity: int = 1 << 20, initial: int = 1024):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.capacity = capacity
+        self._size = 0
+        self._hand = 0
+        self._resize(initial)
+
+    def __len__(self):
+        return self._size
+
+    def _resize(self, slots: int):
+        old_keys = getattr(self, "_keys", ())
+        old = [(k, t) for k, t in zip(old_keys, getattr(self, "_tats", ())) if k != _EMPTY]
+        self._keys = array("q", [_EMPTY]) * slots
+        self._tats = array("d", [0.0]) * slots
+        self._mask = slots - 1
+        self._shift = 64 - (slots.bit_length() - 1)
+        self._hand = 0
+        for key, tat in old:
+            i = self._home(key)
+            while self._keys[i] != _EMPTY:
+                i = (i + 1) & self._mask
+            self._keys[i] = key
+            self._tats[i] = tat
+
+    def _home(self, key) -> int:
+        # mnożenie Fibonacciego – kolejne id nie lądują w tym samym klastrze
+        return ((key * _GOLDEN) & _U64) >> self._shift
+
+    def _find(self, key: int) -> int:
+        """Slot klucza albo pierwszy pusty slot na jego ścieżce."""
+        keys = self._keys
+        mask = self._mask
+        i = ((key * _GOLDEN) & _U64) >> self._shift
+        while True:
+            k = keys[i]
+            if k == key or k == _EMPTY:
+                return i
+            i = (i + 1) & mask
+
+    def allow(self, key: int, now: float) -> bool:
+        keys = self._keys
+        tats = self._tats
+        i = self._find(key)
+        if keys[i] == key:
+            tat = tats[i]
+            if tat < now:
+                tat = now
+            allowed = tat - now <= self.tolerance
+            if allowed:
+                tats[i] = tat + self.interval
+            # znany klucz: jeden slot pod wskazówką
+            hand = self._hand
+            if keys[hand] != _EMPTY and tats[hand] <= now:
+                self._delete(hand)
+            else:
+                self._hand = (hand + 1) & self._mask
+            return allowed
+
+        # nowy klucz: więcej sprzątania – inaczej tuż przed wskazówką
+        # zbierają się stare wpisy i rosną klastry
+        self._sweep(now, SWEEP_STEP)
+        if self._size >= self.capacity:
+            return True
+        i = self._find(key)
+        keys[i] = key
+        tats[i] = now + self.interval
+        self._size += 1
+        if self._size * 2 > len(keys):
+            self._resize(len(keys) * 2)
+        return True
+
+    def _delete(self, i: int):
+        """Usunięcie z przesunięciem wstecz – bez znaczników "usunięte"."""
+        keys, tats, mask = self._keys, self._tats, self._mask
+        j = i
+        while True:
+            j = (j + 1) & mask
+            k = keys[j]
+            if k == _EMPTY:
+                break
+            # wpis z j może wskoczyć w dziurę i, jeśli i leży między jego
+            # slotem domowym a j
+            if ((j - self._home(k)) & mask) >= ((j - i) & mask):
+                keys[i] = k
+                tats[i] = tats[j]
+                i = j
+        keys[i] = _EMPTY
+        self._size -= 1
+
+    def _sweep(self, now: float, steps: int):
+        keys, tats, mask = self._keys, self._tats, self._mask
+        hand = self._hand
+        for _ in range(steps):
+            if keys[hand] != _EMPTY and tats[hand] <= now:
+                # na miejsce usuniętego mógł wskoczyć następny – hand zostaje
+                self._delete(hand)
+            else:
+                hand = (hand + 1) & mask
+        self._hand = hand
+
+
+class FloodGuard:
+    """
+    Decyzja przed handlerami: kubełek użytkownika, potem czatu.
+    Odrzucona wiadomość dostaje powiadomienie najwyżej raz na
+    `notice_interval` s na czat, kolejne są po cichu pomijane.
+    """
+
+    def __init__(
+        self,
+        chat_rate=0.5,
+        chat_burst=5,
+        user_rate=0.5,
+        user_burst=5,
+        notice_interval=30.0,
+        capacity=1 << 20,
+    ):
+        self.chats = BucketTable(chat_rate, chat_burst, capacity)
+        self.users = BucketTable(user_rate, user_burst, capacity)
+        self.notices = BucketTable(1 / notice_interval, 1, capacity)
+
+        self.allowed = 0
+        self.dropped = 0
+        self.noticed = 0
+
+    def check(self, chat_id, user_id, now: float) -> str:
+        # czat prywatny: id czatu == id użytkownika, jeden kubełek wystarczy
+        if (
+            user_id is None or user_id == chat_id or self.users.allow(user_id, now)
+        ) and self.chats.allow(chat_id, now):
+            self.allowed += 1
+            return ALLOW
+        if self.notices.allow(chat_id, now):
+            self.noticed += 1
+            return NOTICE
+        self.dropped += 1
+        return DROP
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "dropped": self.dropped,
+            "noticed": self.noticed,
+            "chats": len(self.chats),
+            "users": len(self.users),
+        }
@@ -0,0 +1,186 @@
+import re
+from typing import NamedTuple, Optional
+
+from knowledge_base import normalize
+
+# ==================================================
+# PRZYBLIŻONE DOPASOWANIE NAZW CPU (LITERÓWKI, SPACJE)
+# ==================================================
+#
+# Indeks: nazwa znormalizowana (tylko [a-z0-9]) -> model kanoniczny.
+# Zapytanie:
+#   1. czyszczenie ("intel(r) core(tm)", "cpu", "@ 1.60ghz") + normalizacja,
+#      "o" obok cyfry -> "0"
+#   2. trafienie dokładne -> pewność 1.0 (minus ew. poprawki "o")
+#   3. wszystkie warianty w odległości edycyjnej 1 (usunięcie, wstawienie,
+#      zamiana, przestawienie sąsiednich znaków) -> lookup w indeksie;
+#      rodzina z początku klucza (i5, r7, e5, ryzen5...) nie jest
+#      edytowana, a kandydat musi mieć tę samą rodzinę i producenta
+#      ("r7 4800h" to nie literówka od i7-4800h)
+#
+# Koszt zapytania nie zależy od liczby modeli w indeksie (~600 lookupów
+# dla 8 znaków), więc indeks może mieć setki tysięcy nazw.
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+# pomyłki wzrokowe są tańsze niż dowolna zamiana znaku
+CONFUSABLE = {
+    ("o", "0"), ("0", "o"),
+    ("l", "1"), ("1", "l"),
+    ("i", "1"), ("1", "i"),
+    ("s", "5"), ("5", "s"),
+    ("z", "2"), ("2", "z"),
+    ("b", "8"), ("8", "b"),
+    ("g", "9"), ("9", "g"),
+}
+CONFUSABLE_COST = 0.5
+
+_NOISE = re.compile(
+    r"\((?:r|tm)\)|®|™|@?\s*\d+(?:[.,]\d+)?\s*ghz|\b(?:cpu|processor|procesor)\b"
+)
+_VENDOR_PREFIXES = ("intelcore", "intel", "core", "amd", "apple")
+_PREFIX_VENDORS = {
+    "intelcore": "intel", "intel": "intel", "core": "intel", "amd": "amd", "apple": "apple",
+}
+# rodzina na początku klucza: Core i3–i9, Xeon E3/E5/E7, Ryzen ("r5" / "ryzen5")
+_FAMILY = re.compile(r"ryzen[3579]?|[ier][3579]")
+_FAMILY_VENDORS = {"i": "intel", "e": "intel", "r": "amd"}
+# "o" obok cyfry to prawie zawsze zero ("i3 1oo5g1")
+_DIGIT_O = re.compile(r"(?<=\d)o|o(?=\d)")
+
+MIN_QUERY_LENGTH = 4
+# edycja o koszcie 1 dopiero od tylu znaków klucza (dwie – od dwa razy
+# tylu): na krótkim kluczu jedna zmiana to zupełnie inny model
+KEY_LENGTH_PER_EDIT = 7
+
+
+class FuzzyMatch(NamedTuple):
+    model: str          # model kanoniczny, np. "i5-8250u"
+    verdict: str
+    confidence: float   # 0..1
+    candidates: int     # ile modeli było równie blisko
+
+
+def strip_vendor(key: str, min_rest: int = MIN_QUERY_LENGTH) -> str:
+    """"intelcorei58250u" -> "i58250u" (gdy zostaje co najmniej `min_rest` znaków)."""
+    for prefix in _VENDOR_PREFIXES:
+        if key.startswith(prefix) and len(key) - len(prefix) >= min_rest:
+            return key[len(prefix):]
+    return key
+
+
+def _clean(text: str):
+    """Zwraca (klucz, producent z prefiksu albo None, koszt poprawek "o" -> "0")."""
+    normalized = normalize(_NOISE.sub(" ", text.lower()))
+    key = strip_vendor(normalized)
+    vendor = _PREFIX_VENDORS[normalized[:len(normalized) - len(key)]] if key != normalized else None
+    key, fixed = _DIGIT_O.subn("0", key)
+    return key, vendor, fixed * CONFUSABLE_COST
+
+
+def _family(key: str) -> Optional[str]:
+    m = _FAMILY.match(key)
+    return m.group() if m else None
+
+
+def _compatible(key: str, family: Optional[str], vendor: Optional[str]) -> bool:
+    """Czy model z indeksu może być tym, co wpisano (ta sama rodzina / producent)."""
+    other = _family(key)
+    if family is not None:
+        return other == family
+    return vendor is None or other is None or _FAMILY_VENDORS[other[0]] == vendor
+
+
+def _edits(key: str, start: int = 0):
+    """(wariant, koszt) w odległości edycyjnej 1; znaki przed `start` bez zmian."""
+    n = len(key)
+    for i in range(start, n):
+        # podwójnie wciśnięty klawisz ("i5 82500u") – tania pomyłka
+        yield key[:i] + key[i + 1:], CONFUSABLE_COST if i and key[i] == key[i - 1] else 1.0
+    for i in range(start, n - 1):
+        yield key[:i] + key[i + 1] + key[i] + key[i + 2:], 1.0
+    for i in range(start, n):
+        head, ch, tail = key[:i], key[i], key[i + 1:]
+        for c in ALPHABET:
+            if c != ch:
+                yield head + c + tail, CONFUSABLE_COST if (ch, c) in CONFUSABLE else 1.0
+    for i in range(start, n + 1):
+        head, tail = key[:i], key[i:]
+        for c in ALPHABET:
+            yield head + c + tail, 1.0
+
+
+class FuzzyIndex:
+    """
+    Indeks nazw CPU do dopasowania przybliżonego.
+
+    `verdict_of(model)` podaje werdykt modelu kanonicznego w chwili
+    zapytania – indeks nie trzyma werdyktów, więc nie starzeje się
+    po przeładowaniu bazy CPU. Modele `known` (z bazy CPU, nie z
+    wygenerowanej przestrzeni numerów) wygrywają z równie bliskimi
+    pozostałymi: "i7-1165g" to i7-1165g7, a nie nieistniejący i7-1165g1.
+    """
+
+    __slots__ = ("_models", "_known")
+
+    def __init__(self, models=()):
+        self._models = {}
+        self._known = set()
+        for model in models:
+            self.add(model)
+
+    def __len__(self):
+        return len(self._models)
+
+    def add(self, model: str, key: str = None, known: bool = False):
+        # pierwsza nazwa wygrywa – np. "i5-8250u" przed kluczem "i58250u"
+        model = self._models.setdefault(key or normalize(model), model)
+        if known:
+            self._known.add(model)
+
+    def match(self, text: str, verdict_of) -> Optional[FuzzyMatch]:
+        key, vendor, base_cost = _clean(text)
+        if len(key) < MIN_QUERY_LENGTH:
+            return None
+        family = _family(key)
+        if family is not None and vendor not in (None, _FAMILY_VENDORS[family[0]]):
+            return None     # "amd i5 8250u" – nie wiadomo, o co chodzi
+
+        model = self._models.get(key)
+        if model is not None:
+            verdict = verdict_of(model)
+            if verdict == "UNKNOWN":
+                return None
+            return FuzzyMatch(model, verdict, round(1.0 - base_cost / len(key), 3), 1)
+
+        best_cost = None
+        best = {}
+        for variant, cost in _edits(key, len(family or "")):
+            if best_cost is not None and cost > best_cost:
+                continue
+            model = self._models.get(variant)
+            if model is None or not _compatible(variant, family, vendor):
+                continue
+            if best_cost is None or cost < best_cost:
+                best_cost, best = cost, {}
+            best.setdefault(model, None)
+
+        if not best or (base_cost + best_cost) * KEY_LENGTH_PER_EDIT > len(key):
+            return None
+        known = [model for model in best if model in self._known]
+        if known:
+            best = dict.fromkeys(known)
+
+        # wiele równie bliskich modeli: bierzemy werdykt większości,
+        # a pewność mnożymy przez udział modeli, które się z nim zgadzają
+        votes = {}
+        for model in best:
+            verdict = verdict_of(model)
+            if verdict != "UNKNOWN":
+                votes.setdefault(verdict, []).append(model)
+        if not votes:
+            return None
+        verdict, models = max(votes.items(), key=lambda item: len(item[1]))
+        agreement = len(models) / len(best)
+        confidence = max(0.0, 1.0 - (base_cost + best_cost) / len(key)) * agreement
+        return FuzzyMatch(models[0], verdict, round(confidence, 3), len(best))
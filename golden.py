@@ -0,0 +1,343 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import evaluator
+import knowledge_base
+import parser as cpu_parser
+import verdict_table
+
+# ==================================================
+# KORPUS WZORCOWY – REGRESJA EVALUATORA I PARSERA
+# ==================================================
+#
+# Korpus: pliki TSV "wejście<TAB>oczekiwany werdykt" (werdykty jak
+# evaluate_cpu: NO / OK / VERY_GOOD / UNKNOWN; # = komentarz) plus
+# opcjonalnie wejścia syntetyczne: modele z zamrożonej tabeli werdyktów
+# i bazy CPU w pisowni użytkowników / msinfo32, z werdyktem z tabeli /
+# bazy. Oba klasyfikatory (evaluator.evaluate_cpu i
+# parser.extract_cpu_profile) oceniają każde wejście w puli procesów;
+# wynik to trafność, macierze pomyłek i rozbieżności między nimi.
+#
+# Po zmianie bazy CPU albo reguł:
+#   python golden.py --synthetic 1000000 [--fail-under 0.97]
+
+CORPUS_PATH = os.path.join(knowledge_base.DATA_DIR, "golden_cpu.tsv")
+
+VERDICTS = ("NO", "OK", "VERY_GOOD", "UNKNOWN")
+
+# profile parsera -> werdykty evaluatora
+PARSER_VERDICTS = {
+    "igpu_ok": "VERY_GOOD",
+    "igpu_limited": "OK",
+    "igpu_bad": "NO",
+    "unknown": "UNKNOWN",
+}
+
+
+def load_corpus(path: str) -> list:
+    """[(wejście, werdykt)]; nieznany werdykt -> ValueError z numerem wiersza."""
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            user_input, _, verdict = line.rpartition("\t")
+            if not user_input or verdict not in VERDICTS:
+                raise ValueError(f"{path}:{number}: oczekiwano 'wejście<TAB>{'|'.join(VERDICTS)}'")
+            rows.append((user_input, verdict))
+    return rows
+
+
+# --------------------------
+# Wejścia syntetyczne
+# --------------------------
+
+_SYNTHETIC_BASE = None
+
+
+def _synthetic_base() -> list:
+    """(model, werdykt): zamrożona tabela + wpisy źródła bazy CPU (one wygrywają)."""
+    global _SYNTHETIC_BASE
+    if _SYNTHETIC_BASE is None:
+        table = verdict_table.load_table()
+        models = dict(table["verdicts"]) if table else {}
+        for entry in knowledge_base.load_source()["entries"]:
+            models[entry["cpu"]] = entry["verdict"]
+        _SYNTHETIC_BASE = sorted(models.items())
+    return _SYNTHETIC_BASE
+
+
+def _msinfo(model: str) -> str:
+    if model.startswith("ryzen"):
+        return f"AMD {model.title()} with Radeon Graphics"
+    return f"Intel(R) Core(TM) {model.upper()} CPU @ 2.40GHz"
+
+
+# pisownia, w jakiej model przychodzi od użytkowników i z raportów
+SPELLINGS = (
+    lambda m: m,
+    lambda m: m.upper(),
+    lambda m: m.replace("-", " "),
+    lambda m: m.replace("-", ""),
+    lambda m: ("amd " if m.startswith("ryzen") else "intel core ") + m,
+    _msinfo,
+)
+
+
+def synthetic_rows(seed: int, offset: int, count: int) -> list:
+    """Wiersze offset..offset+count; ten sam seed -> te same wiersze w każdym procesie."""
+    base = _synthetic_base()
+    rng = random.Random(f"{seed}:{offset}")
+    rows = []
+    for _ in range(count):
+        model, verdict = base[rng.randrange(len(base))]
+        rows.append((rng.choice(SPELLINGS)(model), verdict))
+    return rows
+
+
+# --------------------------
+# Ocena paczki (w procesie puli)
+# --------------------------
+
+def _evaluate_chunk(task) -> dict:
+    """
+    `task`: lista wierszy albo ("synthetic", seed, offset, count) – wiersze
+    syntetyczne powstają w procesie puli, zamiast iść przez pickle.
+    Zwraca same liczniki i kilka przykładów (`examples` na parę).
+    """
+    rows, examples = task
+    if rows[0] == "synthetic":
+        rows = synthetic_rows(*rows[1:])
+    inputs = [user_input for user_input, _ in rows]
+
+    started = time.perf_counter()
+    got = [evaluator.evaluate_cpu(user_input) for user_input in inputs]
+    evaluator_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    profiles = [cpu_parser.extract_cpu_profile(user_input) for user_input in inputs]
+    parser_seconds = time.perf_counter() - started
+
+    result = {
+        "count": len(rows),
+        "evaluator_seconds": evaluator_seconds,
+        "parser_seconds": parser_seconds,
+        "evaluator": Counter(),   # (oczekiwany, evaluator) -> liczba
+        "parser": Counter(),      # (oczekiwany, parser) -> liczba
+        "between": Counter(),     # (evaluator, parser) -> liczba, tylko różne
+        "examples": {},           # (rodzaj, a, b) -> [wejście]
+    }
+    for (user_input, expected), verdict, profile in zip(rows, got, profiles):
+        other = PARSER_VERDICTS[profile]
+        result["evaluator"][(expected, verdict)] += 1
+        result["parser"][(expected, other)] += 1
+        if verdict != expected:
+            _example(result["examples"], ("evaluator", expected, verdict), user_input, examples)
+        if verdict != other:
+            result["between"][(verdict, other)] += 1
+            _example(result["examples"], ("between", verdict, other), user_input, examples)
+    return result
+
+
+def _example(found: dict, key, user_input: str, limit: int):
+    inputs = found.setdefault(key, [])
+    if len(inputs) < limit and user_input not in inputs:
+        inputs.append(user_input)
+
+
+def _merge(total: dict, part: dict, examples: int):
+    for key in ("count", "evaluator_seconds", "parser_seconds"):
+        total[key] += part[key]
+    for key in ("evaluator", "parser", "between"):
+        total[key].update(part[key])
+    for key, inputs in part["examples"].items():
+        for user_input in inputs:
+            _example(total["examples"], key, user_input, examples)
+
+
+def _tasks(rows, synthetic: int, seed: int, chunk_size: int, examples: int):
+    for i in range(0, len(rows), chunk_size):
+        yield rows[i:i + chunk_size], examples
+    for offset in range(0, synthetic, chunk_size):
+        yield ("synthetic", seed, offset, min(chunk_size, synthetic - offset)), examples
+
+
+def run(rows, synthetic: int = 0, seed: int = 1, workers: int = 1,
+        chunk_size: int = 20_000, examples: int = 5) -> dict:
+    """
+    Ocena korpusu; z workers > 1 w puli procesów, najwyżej 2 * workers
+    paczek w locie (jak CLI evaluatora).
+    """
+    total = {"count": 0, "evaluator_seconds": 0.0, "parser_seconds": 0.0,
+             "evaluator": Counter(), "parser": Counter(), "between": Counter(), "examples": {}}
+    tasks = _tasks(rows, synthetic, seed, chunk_size, examples)
+
+    # tabele i indeksy evaluatora poza pomiarem; procesy puli (fork)
+    # dostają je gotowe razem z bazą syntetyczną
+    started = time.perf_counter()
+    evaluator.warm_verdict_cache()
+    evaluator._fuzzy_index()
+    if synthetic:
+        _synthetic_base()
+    total["setup_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if workers <= 1:
+        for task in tasks:
+            _merge(total, _evaluate_chunk(task), examples)
+    else:
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for task in tasks:
+                in_flight.append(pool.submit(_evaluate_chunk, task))
+                if len(in_flight) >= 2 * workers:
+                    _merge(total, in_flight.popleft().result(), examples)
+            while in_flight:
+                _merge(total, in_flight.popleft().result(), examples)
+
+    total["seconds"] = time.perf_counter() - started
+    total["workers"] = workers
+    return total
+
+
+# ==================================================
+# RAPORT
+# ==================================================
+
+def _accuracy(confusion: Counter) -> float:
+    count = sum(confusion.values())
+    return sum(n for (expected, got), n in confusion.items() if expected == got) / count if count else 0.0
+
+
+def summary(result: dict) -> dict:
+    """Wynik run() jako JSON (--report): trafność, macierze, rozbieżności."""
+    def matrix(confusion):
+        return {expected: {got: confusion[(expected, got)] for got in VERDICTS} for expected in VERDICTS}
+
+    def rate(seconds):
+        return round(result["count"] / seconds) if seconds else None
+
+    examples = result["examples"]
+    return {
+        "count": result["count"],
+        "seconds": round(result["seconds"], 3),
+        "setup_seconds": round(result["setup_seconds"], 3),
+        "workers": result["workers"],
+        "accuracy": {
+            "evaluator": _accuracy(result["evaluator"]),
+            "parser": _accuracy(result["parser"]),
+        },
+        # na jeden proces: czas samych wywołań klasyfikatora
+        "inputs_per_second": {
+            "evaluator": rate(result["evaluator_seconds"]),
+            "parser": rate(result["parser_seconds"]),
+        },
+        "confusion": {
+            "evaluator": matrix(result["evaluator"]),
+            "parser": matrix(result["parser"]),
+        },
+        "evaluator_errors": [
+            {"expected": expected, "got": got, "count": count,
+             "inputs": examples.get(("evaluator", expected, got), [])}
+            for (expected, got), count in result["evaluator"].most_common() if expected != got
+        ],
+        "disagreements": [
+            {"evaluator": verdict, "parser": other, "count": count,
+             "inputs": examples.get(("between", verdict, other), [])}
+            for (verdict, other), count in result["between"].most_common()
+        ],
+    }
+
+
+def format_summary(report: dict, limit: int = 10) -> str:
+    count = report["count"]
+    lines = [
+        f"{count} wejść, {report['workers']} proc., {report['seconds']:.2f} s "
+        f"({count / report['seconds'] if report['seconds'] else 0:,.0f} wejść/s), "
+        f"przygotowanie tabel {report['setup_seconds']:.2f} s",
+        "",
+        f"{'':>10} {'trafność':>9} {'wejść/s (1 proc.)':>18}",
+    ]
+    for name in ("evaluator", "parser"):
+        lines.append(f"{name:>10} {report['accuracy'][name]:>9.2%} "
+                     f"{report['inputs_per_second'][name] or 0:>18,}")
+
+    for name in ("evaluator", "parser"):
+        matrix = report["confusion"][name]
+        lines += ["", f"macierz pomyłek – {name} (wiersze: oczekiwany, kolumny: wynik)",
+                  f"{'':>10}" + "".join(f"{got:>11}" for got in VERDICTS) + f"{'czułość':>10}"]
+        for expected in VERDICTS:
+            row = matrix[expected]
+            total = sum(row.values())
+            recall = f"{row[expected] / total:>10.1%}" if total else f"{'-':>10}"
+            lines.append(f"{expected:>10}" + "".join(f"{row[got]:>11}" for got in VERDICTS) + recall)
+        precision = []
+        for got in VERDICTS:
+            column = sum(matrix[expected][got] for expected in VERDICTS)
+            precision.append(f"{matrix[got][got] / column:>11.1%}" if column else f"{'-':>11}")
+        lines.append(f"{'precyzja':>10}" + "".join(precision))
+
+    for title, key, a, b in (
+        ("błędy evaluatora (oczekiwany -> wynik)", "evaluator_errors", "expected", "got"),
+        ("rozbieżności evaluator -> parser", "disagreements", "evaluator", "parser"),
+    ):
+        rows = report[key]
+        lines += ["", f"{title}: {sum(r['count'] for r in rows)}"]
+        for row in rows[:limit]:
+            lines.append(f"  {row[a]} -> {row[b]}: {row['count']}  np. "
+                         + ", ".join(repr(i) for i in row["inputs"]))
+        if len(rows) > limit:
+            lines.append(f"  ... i {len(rows) - limit} par więcej")
+    return "\n".join(lines)
+
+
+# ==================================================
+# CLI
+# ==================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Korpus wzorcowy CPU: trafność evaluatora i parsera, rozbieżności, szybkość"
+    )
+    parser.add_argument("corpus", nargs="*", default=[CORPUS_PATH], help="pliki TSV wejście<TAB>werdykt")
+    parser.add_argument("--synthetic", type=int, default=0, help="dodatkowe wejścia syntetyczne")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="liczba procesów")
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    parser.add_argument("--examples", type=int, default=5, help="przykładów na parę werdyktów")
+    parser.add_argument("--report", help="pełny raport (JSON)")
+    # kod wyjścia 1, gdy trafność evaluatora spadnie poniżej progu
+    parser.add_argument("--fail-under", type=float, help="np. 0.97")
+    args = parser.parse_args(argv)
+
+    try:
+        rows = [row for path in args.corpus for row in load_corpus(path)]
+    except ValueError as e:
+        print(f"BŁĄD: {e}", file=sys.stderr)
+        return 2
+
+    report = summary(run(rows, args.synthetic, args.seed, args.workers, args.chunk_size, args.examples))
+    print(format_summary(report))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.fail_under is not None and report["accuracy"]["evaluator"] < args.fail_under:
+        print(f"trafność evaluatora {report['accuracy']['evaluator']:.2%} < {args.fail_under:.2%}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # worker-y puli muszą widzieć funkcje modułu "golden", nie "__main__"
+    import golden
+    sys.exit(golden.main())
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# ==================================================
+# PRZEKAZANIE NIEDOKOŃCZONEJ PRACY NASTĘPNEJ INSTANCJI
+# ==================================================
+#
+# Przy zamknięciu (deploy, autoscaler) to, czego nie zdążono zrobić
+# w terminie – update'y już potwierdzone Telegramowi (tryb queue) i
+# niewysłane odpowiedzi z harmonogramu – trafia do pliku JSONL. Start
+# bota przejmuje plik atomowym rename (dwie instancje na wspólnym dysku
+# nie wezmą go obie) i kończy pracę. Przy wielu botach w procesie
+# (BOTS_CONFIG) każdy wpis pamięta bot_id; "" = jedyny bot.
+#
+# Trzeci rodzaj wpisu – update_id przerwane po wysłaniu odpowiedzi (tryb
+# sync: Telegram nie dostał 200 i ponowi dostawę). Następna instancja
+# tylko je potwierdza, zamiast odpowiadać drugi raz.
+
+# parametry sendMessage, które da się odtworzyć z samych wartości JSON
+RESEND_KEYS = (
+    "chat_id",
+    "text",
+    "parse_mode",
+    "disable_web_page_preview",
+    "disable_notification",
+    "protect_content",
+    "reply_to_message_id",
+    "allow_sending_without_reply",
+    "message_thread_id",
+)
+
+
+def outbound_message(endpoint: str, data: dict):
+    """sendMessage z harmonogramu -> dict dla Bot.send_message albo None."""
+    if endpoint != "sendMessage":
+        return None
+    message = {}
+    for key in RESEND_KEYS:
+        value = data.get(key)
+        if isinstance(value, (str, int, float, bool)):
+            message[key] = value
+    if "chat_id" not in message or "text" not in message:
+        return None
+    return message
+
+
+def save(path: str, updates=(), messages=(), bot_id: str = "", answered=()) -> int:
+    """
+    Dopisuje update'y (dict z Update.to_dict), wiadomości i update_id
+    już obsłużone; zwraca liczbę wpisów.
+    """
+    rows = [{"update": update} for update in updates]
+    rows.extend({"message": message} for message in messages)
+    rows.extend({"answered": update_id} for update_id in answered)
+    if bot_id:
+        for row in rows:
+            row["bot"] = bot_id
+    if not rows:
+        return 0
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except OSError:
+        logger.exception("Nie udało się zapisać %d niedokończonych wpisów do %s", len(rows), path)
+        return 0
+    return len(rows)
+
+
+def claim(path: str):
+    """
+    Zwraca (update'y, wiadomości, obsłużone) z pliku – listy par
+    (bot_id, dict / update_id) – i usuwa go; brak pliku -> puste listy.
+    """
+    claimed = f"{path}.{os.getpid()}"
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return [], [], []
+    except OSError:
+        logger.exception("Nie udało się przejąć %s", path)
+        return [], [], []
+
+    updates, messages, answered = [], [], []
+    try:
+        with open(claimed, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                bot_id = row.get("bot", "")
+                if "update" in row:
+                    updates.append((bot_id, row["update"]))
+                elif "message" in row:
+                    messages.append((bot_id, row["message"]))
+                elif "answered" in row:
+                    answered.append((bot_id, row["answered"]))
+        os.remove(claimed)
+    except OSError:
+        logger.exception("Nie udało się odczytać %s", claimed)
+    return updates, messages, answered
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from datetime import datetime
+
+from knowledge_base import normalize
+
+# ==================================================
+# NAJCZĘSTSZE NIEZNANE CPU (SPACE-SAVING, STAŁA PAMIĘĆ)
+# ==================================================
+#
+# Space-Saving (Metwally i in.): najwyżej `capacity` liczników. Nowy klucz
+# przy pełnej tablicy zastępuje ten z najmniejszym licznikiem i przejmuje
+# jego wartość (+1) – stąd `error` = o ile licznik może być zawyżony.
+# Każdy klucz, który wystąpił więcej niż N / capacity razy, na pewno jest
+# w tablicy. Śmieci od użytkowników wypychają się nawzajem, pamięć
+# się nie zmienia.
+
+MAX_KEY_LENGTH = 64
+MAX_SAMPLE_LENGTH = 100
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+
+class _Counter:
+    __slots__ = ("count", "error", "first_seen", "last_seen", "sample", "ram")
+
+    def __init__(self, count, error, now, sample, ram):
+        self.count = count
+        self.error = error
+        self.first_seen = now
+        self.last_seen = now
+        self.sample = sample
+        self.ram = ram
+
+
+class SpaceSaving:
+    """
+    Przybliżone top-K strumienia kluczy w stałej pamięci.
+
+    Klucze pogrupowane po liczniku (licznik -> klucze w kolejności
+    wejścia), więc minimum do wyrzucenia jest w O(1): najstarszy klucz
+    z kubełka `_min`.
+    """
+
+    __slots__ = ("capacity", "total", "_counters", "_buckets", "_min")
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.total = 0
+        self._counters = {}
+        self._buckets = {}
+        self._min = 0
+
+    def __len__(self):
+        return len(self._counters)
+
+    def add(self, key: str, now: float, sample: str = None, ram=None):
+        self.total += 1
+        counter = self._counters.get(key)
+        if counter is None:
+            count = 0
+            if len(self._counters) >= self.capacity:
+                count = self._min
+                bucket = self._buckets[count]
+                victim = next(iter(bucket))
+                del bucket[victim]
+                del self._counters[victim]
+                if not bucket:
+                    del self._buckets[count]
+            counter = self._counters[key] = _Counter(count, count, now, sample or key, ram)
+            # nowy klucz ląduje w kubełku count + 1 – niżej nie ma nikogo
+            self._min = count if count in self._buckets else count + 1
+        else:
+            count = counter.count
+            bucket = self._buckets[count]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[count]
+                if self._min == count:
+                    self._min = count + 1
+        counter.count = count + 1
+        self._buckets.setdefault(count + 1, {})[key] = None
+        counter.last_seen = now
+        if ram is not None:
+            counter.ram = ram
+
+    def top(self, k: int = None) -> list:
+        ranked = sorted(self._counters.items(), key=lambda item: -item[1].count)
+        return [
+            {
+                "key": key,
+                "cpu": c.sample,
+                "ram": c.ram,
+                "count": c.count,
+                "count_error": c.error,
+                "first_seen": _iso(c.first_seen),
+                "last_seen": _iso(c.last_seen),
+            }
+            for key, c in ranked[:k]
+        ]
+
+    def clear(self):
+        self.total = 0
+        self._counters.clear()
+        self._buckets.clear()
+        self._min = 0
+
+
+class UnknownCpuSummary:
+    """
+    Agregat nieznanych CPU zamiast wpisu na każde zdarzenie.
+
+    - `total`: od startu procesu (API /unknown-cpus)
+    - `period`: od ostatniego podsumowania; co `interval` s jego top-K
+      trafia do sinka jako wiersze (cpu, ram, date + count, count_error,
+      first_seen, last_seen) i licznik okresu się zeruje
+
+    add() wołamy z wątku pętli zdarzeń (handlery bota), jak sink.submit().
+    """
+
+    def __init__(self, sink, capacity=256, top_k=20, interval=300.0):
+        self.sink = sink
+        self.top_k = top_k
+        self.interval = interval
+        self.total = SpaceSaving(capacity)
+        self.period = SpaceSaving(capacity)
+        self.summaries = 0
+        self._task = None
+
+    def add(self, cpu: str, ram=None, now: float = None):
+        now = time.time() if now is None else now
+        # długie śmieci przycinamy przed normalizacją – stały koszt add()
+        text = (cpu or "").strip()[:4 * MAX_KEY_LENGTH]
+        key = normalize(text)[:MAX_KEY_LENGTH]
+        sample = text[:MAX_SAMPLE_LENGTH]
+        self.total.add(key, now, sample, ram)
+        self.period.add(key, now, sample, ram)
+
+    def top(self, k: int = None) -> list:
+        return self.total.top(k or self.top_k)
+
+    def stats(self) -> dict:
+        return {
+            "events": self.total.total,
+            "tracked": len(self.total),
+            "period_events": self.period.total,
+            "summaries": self.summaries,
+        }
+
+    def flush(self) -> int:
+        """Wysyła podsumowanie okresu do sinka; zwraca liczbę wierszy."""
+        if not self.period.total:
+            return 0
+        date = datetime.utcnow().isoformat()
+        rows = self.period.top(self.top_k)
+        for row in rows:
+            row["date"] = date
+            self.sink.submit(row)
+        self.period.clear()
+        self.summaries += 1
+        return len(rows)
+
+    # --------------------------
+    # Cykl życia (startup / shutdown aplikacji)
+    # --------------------------
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Ostatnie podsumowanie – przed zatrzymaniem sinka."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
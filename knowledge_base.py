@@ -0,0 +1,215 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+
+import verdict_table
+
+logger = logging.getLogger(__name__)
+
+# ==================================================
+# BAZA WIEDZY CPU – PLIK DANYCH + SKOMPILOWANY INDEKS
+# ==================================================
+#
+# data/cpu_overrides.json        – źródło edytowane ręcznie (wersjonowane)
+# data/cpu_overrides.index.json  – indeks: znormalizowany klucz -> werdykt
+#
+# Po edycji źródła:  python knowledge_base.py build
+#                    python verdict_table.py build   (check sprawdza oba)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SOURCE_PATH = os.path.join(DATA_DIR, "cpu_overrides.json")
+INDEX_PATH = os.path.join(DATA_DIR, "cpu_overrides.index.json")
+
+VERDICTS = ("NO", "OK", "VERY_GOOD")
+
+
+class KnowledgeBaseError(ValueError):
+    pass
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# ==================================================
+# WALIDACJA ŹRÓDŁA
+# ==================================================
+
+def compile_source(source: dict):
+    """
+    Waliduje i deduplikuje wpisy źródła.
+    Zwraca (overrides, errors, warnings); overrides: klucz znormalizowany -> werdykt.
+
+    - nieznany werdykt / pusty klucz -> błąd
+    - ten sam klucz po normalizacji z innym werdyktem -> błąd (konflikt)
+    - ten sam klucz z tym samym werdyktem -> ostrzeżenie (duplikat)
+    - znaki spoza [a-z0-9 -] w kluczu -> ostrzeżenie (np. "i5-1035g1,")
+    """
+    overrides = {}
+    first_seen = {}
+    errors = []
+    warnings = []
+
+    for i, entry in enumerate(source.get("entries", [])):
+        cpu = str(entry.get("cpu", ""))
+        verdict = entry.get("verdict")
+        key = normalize(cpu)
+        where = f"#{i} {cpu!r}"
+
+        if not key:
+            errors.append(f"{where}: pusty klucz po normalizacji")
+            continue
+        if verdict not in VERDICTS:
+            errors.append(f"{where}: nieznany werdykt {verdict!r}")
+            continue
+        if re.search(r"[^a-z0-9 \-]", cpu.lower()):
+            warnings.append(f"{where}: nietypowe znaki w kluczu")
+
+        if key in overrides:
+            other = first_seen[key]
+            if overrides[key] != verdict:
+                errors.append(
+                    f"{where}: konflikt z {other!r} ({overrides[key]} vs {verdict})"
+                )
+            else:
+                warnings.append(f"{where}: duplikat {other!r}")
+            continue
+
+        overrides[key] = verdict
+        first_seen[key] = cpu
+
+    return overrides, errors, warnings
+
+
+def load_source(path: str = SOURCE_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ==================================================
+# INDEKS
+# ==================================================
+
+def build_index(source_path: str = SOURCE_PATH, index_path: str = INDEX_PATH):
+    """
+    Kompiluje źródło do indeksu. Przy błędach nie zapisuje nic
+    i rzuca KnowledgeBaseError. Zwraca listę ostrzeżeń.
+    """
+    source = load_source(source_path)
+    overrides, errors, warnings = compile_source(source)
+    if errors:
+        raise KnowledgeBaseError("\n".join(errors))
+
+    index = {
+        "version": source.get("version"),
+        "source_sha256": _sha256(source_path),
+        "overrides": dict(sorted(overrides.items())),
+    }
+
+    # zapis atomowy – działający bot nigdy nie zobaczy połowy pliku
+    tmp = index_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp, index_path)
+    return warnings
+
+
+def load_index(path: str = INDEX_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        index = json.load(f)
+    if not isinstance(index.get("overrides"), dict):
+        raise KnowledgeBaseError(f"{path}: brak tabeli overrides")
+    return index
+
+
+def load_overrides(index_path: str = INDEX_PATH, source_path: str = SOURCE_PATH):
+    """
+    Zwraca (wersja, overrides). Czyta indeks; gdy go brak albo jest
+    starszy niż źródło – kompiluje źródło w pamięci.
+    """
+    index = None
+    if os.path.exists(index_path):
+        index = load_index(index_path)
+
+    if os.path.exists(source_path):
+        if index is None or index.get("source_sha256") != _sha256(source_path):
+            logger.warning("Indeks CPU nieaktualny – kompiluję %s", source_path)
+            source = load_source(source_path)
+            overrides, errors, _ = compile_source(source)
+            if errors:
+                raise KnowledgeBaseError("\n".join(errors))
+            return source.get("version"), overrides
+
+    if index is None:
+        raise KnowledgeBaseError(f"brak {index_path} i {source_path}")
+    return index.get("version"), index["overrides"]
+
+
+# ==================================================
+# CLI
+# ==================================================
+
+def _table_errors(overrides: dict, path: str = None) -> list:
+    """
+    Tabela werdyktów zbudowana z innych overrides działa dopiero po
+    przeliczeniu w tle przy każdym starcie – w repozytorium ma być aktualna.
+    """
+    path = path or verdict_table.TABLE_PATH
+    try:
+        table = verdict_table.load_table(path)
+    except (OSError, ValueError) as e:
+        return [f"nie da się wczytać tabeli werdyktów {path}: {e}"]
+    if table is None:
+        return []
+    if table["overrides_sha256"] != verdict_table.overrides_fingerprint(overrides):
+        return [f"tabela werdyktów {path} nieaktualna wobec bazy – uruchom: python verdict_table.py build"]
+    return []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Baza wiedzy CPU")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="waliduje źródło i zapisuje indeks")
+    build.add_argument("--source", default=SOURCE_PATH)
+    build.add_argument("--index", default=INDEX_PATH)
+
+    check = sub.add_parser("check", help="walidacja źródła + aktualność tabeli werdyktów")
+    check.add_argument("--source", default=SOURCE_PATH)
+    check.add_argument("--table", default=None, help="domyślnie data/cpu_verdicts.json.gz")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        overrides, errors, warnings = compile_source(load_source(args.source))
+        if not errors:
+            errors.extend(_table_errors(overrides, args.table))
+        for w in warnings:
+            print(f"UWAGA: {w}", file=sys.stderr)
+        for e in errors:
+            print(f"BŁĄD: {e}", file=sys.stderr)
+        return 1 if errors else 0
+
+    try:
+        warnings = build_index(args.source, args.index)
+    except KnowledgeBaseError as e:
+        for line in str(e).splitlines():
+            print(f"BŁĄD: {line}", file=sys.stderr)
+        return 1
+    for w in warnings:
+        print(f"UWAGA: {w}", file=sys.stderr)
+    print(f"zapisano {args.index}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ==================================================
+# OGRANICZONY CACHE LRU Z TTL
+# ==================================================
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache LRU o stałym rozmiarze z opcjonalnym TTL (sekundy, 0 = bez TTL).
+    Liczy trafienia, chybienia i wyrzucenia (przepełnienie + wygaśnięcie).
+    """
+
+    def __init__(self, maxsize=4096, ttl=0.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires = entry
+            if expires and expires <= self._clock():
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires = self._clock() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,113 @@
+from collections import deque
+
+# ==================================================
+# AHO-CORASICK – WIELE WZORCÓW W JEDNYM PRZEJŚCIU
+# ==================================================
+
+
+class PatternMatcher:
+    """
+    Automat Aho-Corasick zbudowany raz ze słownika wzorzec -> wartość.
+    Znajduje wszystkie wystąpienia wzorców w jednym przejściu po tekście.
+
+    Reguła dla nakładających się trafień: wygrywa najdłuższy wzorzec,
+    przy równej długości – ten, który zaczyna się wcześniej w tekście.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out", "_best", "_values")
+
+    def __init__(self, patterns: dict):
+        self._values = dict(patterns)
+        # stan 0 = korzeń; _goto[s] to przejścia znak -> stan
+        self._goto = [{}]
+        # _out[s] – wzorzec kończący się dokładnie w stanie s (lub None)
+        self._out = [None]
+
+        for pattern in self._values:
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(None)
+                state = nxt
+            self._out[state] = pattern
+
+        self._fail = [0] * len(self._goto)
+        # _best[s] – najdłuższy wzorzec kończący się w stanie s
+        # (własny albo osiągalny przez łańcuch fail)
+        self._best = list(self._out)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                if self._best[nxt] is None:
+                    self._best[nxt] = self._best[self._fail[nxt]]
+
+    def __len__(self):
+        return len(self._values)
+
+    def _step(self, state: int, ch: str) -> int:
+        goto = self._goto
+        fail = self._fail
+        while state and ch not in goto[state]:
+            state = fail[state]
+        return goto[state].get(ch, 0)
+
+    def find_all(self, text: str):
+        """
+        Zwraca listę (start, wzorzec) wszystkich trafień, w kolejności
+        pozycji końca w tekście.
+        """
+        hits = []
+        out = self._out
+        fail = self._fail
+        state = 0
+        for i, ch in enumerate(text):
+            state = self._step(state, ch)
+            s = state
+            while s:
+                pattern = out[s]
+                if pattern is not None:
+                    hits.append((i + 1 - len(pattern), pattern))
+                s = fail[s]
+        return hits
+
+    def longest(self, text: str):
+        """
+        Zwraca najdłuższy pasujący wzorzec (najwcześniejszy przy remisie)
+        albo None.
+        """
+        best = self._best
+        goto = self._goto
+        fail = self._fail
+        found = None
+        found_len = 0
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            pattern = best[state]
+            # dłuższy wygrywa; przy remisie zostaje wcześniejszy,
+            # bo skanujemy od lewej
+            if pattern is not None and len(pattern) > found_len:
+                found, found_len = pattern, len(pattern)
+        return found
+
+    def lookup(self, text: str):
+        """
+        Wartość dla zwycięskiego wzorca albo None.
+        """
+        pattern = self.longest(text)
+        return None if pattern is None else self._values[pattern]
@@ -0,0 +1,213 @@
+import threading
+from bisect import bisect_left
+
+# ==================================================
+# METRYKI W FORMACIE PROMETHEUSA – TANIE PRZY ZAPISIE
+# ==================================================
+#
+# Każdy wątek pisze do własnej listy liczników (jeden pisarz na listę –
+# bez blokad), scrape sumuje listy wszystkich wątków. Zapis to odczyt
+# threading.local + inkrementacja; etykiety są wiązane raz, przy starcie.
+
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class _Sharded:
+    __slots__ = ("_local", "_shards", "_size")
+
+    def __init__(self, size: int):
+        self._local = threading.local()
+        self._shards = []
+        self._size = size
+
+    def _new_shard(self) -> list:
+        # raz na wątek; list.append jest atomowe
+        shard = [0] * self._size
+        self._local.shard = shard
+        self._shards.append(shard)
+        return shard
+
+    def _totals(self) -> list:
+        totals = [0] * self._size
+        for shard in list(self._shards):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0] += amount
+
+    def value(self):
+        return self._totals()[0]
+
+
+class Histogram(_Sharded):
+    """
+    Kubełki jak w Prometheusie (le = "mniejsze lub równe").
+    Układ listy wątku: [kubełki..., +Inf, suma].
+    """
+    __slots__ = ("bounds",)
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        super().__init__(len(bounds) + 2)
+        self.bounds = tuple(bounds)
+
+    def observe(self, value: float):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """Zwraca (skumulowane kubełki z +Inf, liczba, suma)."""
+        totals = self._totals()
+        cumulative = []
+        running = 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class _Family:
+    def __init__(self, kind, name, help_text, label, values, factory):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._children = {value: factory() for value in values}
+
+    def labels(self, value):
+        return self._children[value]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return repr(value) if value == value else "NaN"
+    return str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._families = []
+        self._gauges = []
+
+    def counter(self, name, help_text, label, values) -> _Family:
+        family = _Family("counter", name, help_text, label, values, Counter)
+        self._families.append(family)
+        return family
+
+    def histogram(self, name, help_text, label, values, bounds=LATENCY_BUCKETS) -> _Family:
+        family = _Family(
+            "histogram", name, help_text, label, values, lambda: Histogram(bounds)
+        )
+        self._families.append(family)
+        return family
+
+    def gauge_callback(self, name, help_text, collect):
+        """
+        Wartości liczone dopiero przy scrape'ie; `collect()` zwraca
+        liczbę albo dict etykieta -> liczba (etykieta "name").
+        """
+        self._gauges.append((name, help_text, collect))
+
+    def render(self) -> str:
+        lines = []
+        for family in self._families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for value, child in family._children.items():
+                label = f'{family.label}="{_escape(value)}"'
+                if family.kind == "counter":
+                    lines.append(f"{family.name}{{{label}}} {_number(child.value())}")
+                    continue
+                buckets, count, total = child.snapshot()
+                for bound, cumulative in zip(child.bounds + ("+Inf",), buckets):
+                    lines.append(
+                        f'{family.name}_bucket{{{label},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{family.name}_sum{{{label}}} {_number(float(total))}")
+                lines.append(f"{family.name}_count{{{label}}} {count}")
+
+        for name, help_text, collect in self._gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            values = collect()
+            if isinstance(values, dict):
+                for key, value in values.items():
+                    lines.append(f'{name}{{name="{_escape(key)}"}} {_number(value)}')
+            else:
+                lines.append(f"{name} {_number(values)}")
+        return "\n".join(lines) + "\n"
+
+
+# ==================================================
+# METRYKI BOTA
+# ==================================================
+
+REGISTRY = Registry()
+
+STAGES = (
+    "webhook_json",       # dekodowanie JSON w telegram_webhook
+    "update_de_json",     # Update.de_json
+    "process_update",     # Application.process_update
+    "evaluate_hardware",  # cała ocena wiadomości "CPU, RAM"
+    "cpu_table",          # lookup w zamrożonej tabeli werdyktów
+    "cpu_overrides",      # skan overrides (automat)
+    "cpu_rules",          # parse_cpu + apply_cpu_rules
+    "cpu_fuzzy",          # dopasowanie przybliżone (tylko po UNKNOWN)
+    "unknown_cpu_post",   # POST partii nieznanych CPU do arkusza
+    "sysinfo_extract",    # wyszukanie CPU/RAM w raporcie systemowym
+    "reply",              # każde wychodzące reply_text
+)
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "bot_stage_duration_seconds", "Czas etapów obsługi wiadomości", "stage", STAGES
+)
+
+VERDICT_TOTAL = REGISTRY.counter(
+    "bot_verdicts_total",
+    "Werdykty oceny sprzętu",
+    "verdict",
+    ("NO", "OK", "VERY_GOOD", "UNKNOWN", "BAD_FORMAT", "NO_RAM", "LOW_RAM"),
+)
+
+UPDATES_TOTAL = REGISTRY.counter(
+    "bot_updates_total",
+    "Update'y z webhooka: obsłużone / pominięte bez budowania obiektów",
+    "outcome",
+    ("handled", "ignored"),
+)
+
+REPLIES_TOTAL = REGISTRY.counter(
+    "bot_replies_total",
+    "Odpowiedzi: wysłane przez API, zbuforowane, zwrócone w ciele webhooka",
+    "via",
+    ("api", "buffered", "inline"),
+)
+
+
+def stage(name: str) -> Histogram:
+    """Histogram etapu – pobierz raz i trzymaj w zmiennej modułu."""
+    return STAGE_SECONDS.labels(name)
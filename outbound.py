@@ -0,0 +1,337 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from replies import PendingMessage, merge
+
+logger = logging.getLogger(__name__)
+
+# ==================================================
+# HARMONOGRAM WIADOMOŚCI WYCHODZĄCYCH (LIMITY TELEGRAMA)
+# ==================================================
+#
+# Telegram: ~30 wiadomości/s na bota, ~1/s na czat prywatny,
+# ~20/min na grupę. Przekroczenie -> 429 RetryAfter.
+
+PRIORITY_RESULT = 0   # odpowiedź na to, o co pytał użytkownik
+PRIORITY_MENU = 1     # ponowne wyświetlenie menu
+
+# metody, które liczą się do limitów wiadomości; reszta (getMe,
+# setWebhook, answerInlineQuery...) idzie od razu
+_LIMITED_PREFIXES = ("send", "edit", "forward", "copy")
+
+# klucze, które nie blokują sklejenia dwóch sendMessage
+_MERGE_KEYS = ("text", "parse_mode")
+
+
+class TokenBucket:
+    """Kubełek: `rate` żetonów/s, najwyżej `burst` naraz."""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def _refill(self, now: float):
+        if now > self.stamp:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+
+    def wait_time(self, now: float) -> float:
+        """Ile sekund do pierwszego wolnego żetonu (0 = jest teraz)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class _Entry:
+    __slots__ = ("priority", "seq", "chat_id", "endpoint", "data", "callback",
+                 "args", "kwargs", "futures", "attempts", "enqueued")
+
+    def __init__(self, priority, seq, chat_id, endpoint, data, callback, args, kwargs, future, now):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.endpoint = endpoint
+        self.data = data
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.futures = [future]
+        self.attempts = 0
+        self.enqueued = now
+
+
+class OutboundScheduler(BaseRateLimiter):
+    """
+    Rate limiter dla Application (ApplicationBuilder().rate_limiter(...)).
+
+    - kubełek globalny + kubełek na czat (grupy: chat_id < 0, wolniej)
+    - w obrębie czatu kolejność FIFO; między czatami wygrywa niższy
+      priorytet (rate_limit_args={"priority": ...}), potem kolejność przyjścia
+    - kolejna sendMessage do czatu, którego wiadomość jeszcze czeka,
+      jest doklejana do niej (replies.merge) – jedna wiadomość zamiast dwóch
+    - 429 RetryAfter: wstrzymanie wysyłki na retry_after s i ponowienie
+      (najwyżej `max_retries` razy)
+    """
+
+    def __init__(
+        self,
+        global_rate=25.0,
+        global_burst=5,
+        chat_rate=1.0,
+        chat_burst=1,
+        group_rate=20 / 60,
+        group_burst=1,
+        max_retries=3,
+        merge_messages=True,
+        clock=time.monotonic,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.merge_messages = merge_messages
+        self._clock = clock
+
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._chat_buckets = {}
+        self._queues = {}          # chat_id -> deque[_Entry]
+        self._paused_until = 0.0
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._loop_task = None
+        self._inflight = set()
+        self._next_prune = 0.0
+
+        self.sent = 0
+        self.merged = 0
+        self.retried = 0
+
+    # --------------------------
+    # Cykl życia (wołane przez ExtBot)
+    # --------------------------
+
+    async def initialize(self):
+        if self._loop_task is None:
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def shutdown(self, timeout=5.0):
+        deadline = self._clock() + timeout
+        while (self._queues or self._inflight) and self._clock() < deadline:
+            await asyncio.sleep(0.05)
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        for queue in self._queues.values():
+            for entry in queue:
+                for future in entry.futures:
+                    if not future.done():
+                        future.set_exception(RuntimeError("scheduler zatrzymany"))
+        self._queues.clear()
+
+    async def drain(self, timeout: float) -> list:
+        """
+        Przed zamknięciem aplikacji: czeka do `timeout` s na wysłanie
+        kolejki, resztę z niej zdejmuje (ich wywołania kończą się
+        CancelledError) i zwraca jako (endpoint, data). Wysyłki w toku
+        kończą się normalnie.
+        """
+        deadline = self._clock() + timeout
+        while self._queues and self._clock() < deadline:
+            await asyncio.sleep(0.05)
+        left = []
+        for queue in self._queues.values():
+            for entry in queue:
+                left.append((entry.endpoint, entry.data))
+                for future in entry.futures:
+                    future.cancel()
+        self._queues.clear()
+        return left
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending(),
+            "sent": self.sent,
+            "merged": self.merged,
+            "retried": self.retried,
+        }
+
+    # --------------------------
+    # BaseRateLimiter
+    # --------------------------
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id") if data else None
+        if chat_id is None or not endpoint.startswith(_LIMITED_PREFIXES) or self._loop_task is None:
+            return await callback(*args, **kwargs)
+
+        priority = (rate_limit_args or {}).get("priority", PRIORITY_RESULT)
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+
+        if queue and self._try_merge(queue[-1], endpoint, data, priority, future):
+            return await future
+
+        queue.append(_Entry(
+            priority, next(self._seq), chat_id, endpoint, data,
+            callback, args, kwargs, future, self._clock(),
+        ))
+        self._wakeup.set()
+        return await future
+
+    def _try_merge(self, last: _Entry, endpoint, data, priority, future) -> bool:
+        if not self.merge_messages or endpoint != "sendMessage" or last.endpoint != "sendMessage":
+            return False
+        if last.attempts:
+            return False
+        rest = {k: v for k, v in data.items() if k not in _MERGE_KEYS}
+        last_rest = {k: v for k, v in last.data.items() if k not in _MERGE_KEYS}
+        if rest != last_rest:
+            return False
+        merged = merge(
+            PendingMessage(last.chat_id, last.data["text"], last.data.get("parse_mode")),
+            PendingMessage(last.chat_id, data["text"], data.get("parse_mode")),
+        )
+        if merged is None:
+            return False
+        # data to ten sam słownik, który callback wyśle – zmieniamy go w miejscu
+        last.data["text"] = merged.text
+        if merged.parse_mode:
+            last.data["parse_mode"] = merged.parse_mode
+        last.priority = min(last.priority, priority)
+        last.futures.append(future)
+        self.merged += 1
+        return True
+
+    # --------------------------
+    # Pętla wysyłki
+    # --------------------------
+
+    def _chat_bucket(self, chat_id, now) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst, now)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _pick(self, now):
+        """(wpis gotowy do wysłania albo None, ile czekać na najbliższy)."""
+        best = None
+        soonest = None
+        for chat_id, queue in self._queues.items():
+            head = queue[0]
+            wait = self._chat_bucket(chat_id, now).wait_time(now)
+            if wait > 0:
+                soonest = wait if soonest is None else min(soonest, wait)
+                continue
+            if best is None or (head.priority, head.seq) < (best.priority, best.seq):
+                best = head
+        return best, soonest
+
+    async def _sleep(self, delay):
+        self._wakeup.clear()
+        if delay is None:
+            await self._wakeup.wait()
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while True:
+            now = self._clock()
+            if now >= self._next_prune:
+                self._prune(now)
+                self._next_prune = now + 60
+            if not self._queues:
+                await self._sleep(None)
+                continue
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            wait = self._global.wait_time(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            entry, soonest = self._pick(now)
+            if entry is None:
+                await self._sleep(soonest)
+                continue
+
+            queue = self._queues[entry.chat_id]
+            queue.popleft()
+            if not queue:
+                del self._queues[entry.chat_id]
+            self._global.take(now)
+            self._chat_bucket(entry.chat_id, now).take(now)
+
+            task = asyncio.create_task(self._send(entry))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, entry: _Entry):
+        entry.attempts += 1
+        try:
+            result = await entry.callback(*entry.args, **entry.kwargs)
+        except RetryAfter as exc:
+            if entry.attempts > self.max_retries:
+                self._fail(entry, exc)
+                return
+            self.retried += 1
+            logger.warning("429 od Telegrama – wstrzymuję wysyłkę na %s s", exc.retry_after)
+            self._paused_until = max(self._paused_until, self._clock() + exc.retry_after)
+            # wraca na początek kolejki swojego czatu
+            queue = self._queues.get(entry.chat_id)
+            if queue is None:
+                queue = self._queues[entry.chat_id] = deque()
+            queue.appendleft(entry)
+            self._wakeup.set()
+            return
+        except Exception as exc:
+            self._fail(entry, exc)
+            return
+
+        self.sent += 1
+        for future in entry.futures:
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(entry: _Entry, exc: BaseException):
+        for future in entry.futures:
+            if not future.done():
+                future.set_exception(exc)
+
+    def _prune(self, now):
+        # pełny kubełek niczego nie pamięta – można go usunąć
+        for chat_id in [c for c, b in self._chat_buckets.items() if b.is_full(now)]:
+            del self._chat_buckets[chat_id]
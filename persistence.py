@@ -0,0 +1,234 @@
+import asyncio
+import json
+import sqlite3
+import threading
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+# ==================================================
+# WSPÓLNY STAN ROZMÓW – SQLITE (WAL)
+# ==================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    id INTEGER PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS chat_data (
+    id INTEGER PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL, key TEXT NOT NULL, state TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _dump(data) -> str:
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Persystencja user_data / chat_data w SQLite, współdzielona przez wiele
+    procesów bota (np. kilka workerów uvicorn).
+
+    - zapis "write-behind": Application zbiera zmienione wpisy i co
+      `update_interval` s woła update_*; zapisujemy je jedną transakcją
+      w wątku, więc pojedyncza wiadomość nie czeka na dysk
+    - przed każdym update'em refresh_* dociąga wpis z bazy, jeśli inny
+      proces go zmienił, a lokalna kopia nie ma niezapisanych zmian
+    - user_data / chat_data muszą dać się zapisać jako JSON
+
+    Zmiana zrobiona w jednym procesie jest widoczna w innych
+    najpóźniej po `update_interval` s.
+    """
+
+    def __init__(self, path: str, update_interval: float = 1.0):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        # osobne połączenia: odczyty w pętli zdarzeń, zapisy w wątku
+        self._reader = _connect(path)
+        self._reader.executescript(_SCHEMA)
+        self._writer = _connect(path)
+        self._write_lock = threading.Lock()
+
+        # (tabela, id) -> (wersja, JSON) ostatnio odczytany / zapisany przez nas
+        self._known = {}
+        # zmiany czekające na zapis: (tabela, id) -> JSON albo None (usunięcie)
+        self._pending = {}
+        self._flush_task = None
+
+    # --------------------------
+    # Odczyt przy starcie – dane dociągamy leniwie w refresh_*
+    # --------------------------
+
+    async def get_user_data(self):
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str):
+        rows = self._reader.execute(
+            "SELECT key, state FROM conversations WHERE name = ?", (name,)
+        ).fetchall()
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    # --------------------------
+    # Odświeżanie przed obsługą update'u
+    # --------------------------
+
+    def _refresh(self, table: str, key: int, data: dict):
+        known = self._known.get((table, key))
+        if known is not None and _dump(data) != known[1]:
+            # lokalne zmiany jeszcze nie zapisane – lokalna kopia jest nowsza
+            return
+        if (table, key) in self._pending:
+            return
+
+        row = self._reader.execute(
+            f"SELECT version, data FROM {table} WHERE id = ?", (key,)
+        ).fetchone()
+        if row is None:
+            if known is not None:
+                # usunięte przez inny proces
+                data.clear()
+                del self._known[(table, key)]
+            return
+        if known is not None and known[0] == row[0]:
+            return
+
+        data.clear()
+        data.update(json.loads(row[1]))
+        self._known[(table, key)] = (row[0], row[1])
+
+    async def refresh_user_data(self, user_id: int, user_data):
+        self._refresh("user_data", user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data):
+        self._refresh("chat_data", chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    # --------------------------
+    # Zapis (wołane przez Application co update_interval)
+    # --------------------------
+
+    def _stage(self, table: str, key, payload):
+        known = self._known.get((table, key))
+        if known is not None and known[1] == payload:
+            return
+        self._pending[(table, key)] = payload
+        # wszystkie update_* z jednego przebiegu Application trafią
+        # do jednej transakcji
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_pending())
+
+    async def update_user_data(self, user_id: int, data):
+        self._stage("user_data", user_id, _dump(data))
+
+    async def update_chat_data(self, chat_id: int, data):
+        self._stage("chat_data", chat_id, _dump(data))
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name: str, key, new_state):
+        self._stage(
+            "conversations",
+            (name, _dump(list(key))),
+            None if new_state is None else _dump(new_state),
+        )
+
+    async def drop_user_data(self, user_id: int):
+        self._stage("user_data", user_id, None)
+
+    async def drop_chat_data(self, chat_id: int):
+        self._stage("chat_data", chat_id, None)
+
+    async def flush(self):
+        task = self._flush_task
+        if task is not None and task is not asyncio.current_task():
+            await asyncio.gather(task, return_exceptions=True)
+        await self._flush_pending()
+
+    async def _flush_pending(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            written = await asyncio.to_thread(self._write, pending)
+        except BaseException:
+            # nie gubimy zmian – wrócą w następnym zapisie
+            for key, payload in pending.items():
+                self._pending.setdefault(key, payload)
+            raise
+        for key, value in written.items():
+            if value is None:
+                self._known.pop(key, None)
+            else:
+                self._known[key] = value
+
+    def _write(self, pending: dict) -> dict:
+        written = {}
+        with self._write_lock:
+            cur = self._writer.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for (table, key), payload in pending.items():
+                    if table == "conversations":
+                        name, conv_key = key
+                        if payload is None:
+                            cur.execute(
+                                "DELETE FROM conversations WHERE name = ? AND key = ?",
+                                (name, conv_key),
+                            )
+                        else:
+                            cur.execute(
+                                "INSERT INTO conversations (name, key, state) VALUES (?, ?, ?) "
+                                "ON CONFLICT (name, key) DO UPDATE SET state = excluded.state",
+                                (name, conv_key, payload),
+                            )
+                        continue
+
+                    if payload is None:
+                        cur.execute(f"DELETE FROM {table} WHERE id = ?", (key,))
+                        written[(table, key)] = None
+                        continue
+                    row = cur.execute(
+                        f"INSERT INTO {table} (id, data) VALUES (?, ?) "
+                        "ON CONFLICT (id) DO UPDATE SET data = excluded.data, version = version + 1 "
+                        "RETURNING version",
+                        (key, payload),
+                    ).fetchone()
+                    written[(table, key)] = (row[0], payload)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return written
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
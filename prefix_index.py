@@ -0,0 +1,69 @@
+import heapq
+import itertools
+from bisect import bisect_left
+
+# ==================================================
+# INDEKS PREFIKSÓW NAZW CPU (TRYB INLINE)
+# ==================================================
+#
+# Posortowana tablica kluczy znormalizowanych ([a-z0-9]) + równoległe
+# tablice nazw i werdyktów. Prefiks -> bisect daje zakres kluczy,
+# które się nim zaczynają; ranking liczymy tylko na początku zakresu
+# (`scan` pozycji) + na wpisach z bazy wiedzy z całego zakresu (osobna,
+# krótka lista ich pozycji), więc koszt nie zależy od tego, ile modeli
+# z tabeli pasuje.
+
+# pierwszy znak większy niż każdy znak klucza ([a-z0-9])
+_AFTER = "{"
+
+
+class PrefixIndex:
+    """
+    `entries`: (klucz, nazwa, werdykt, z_bazy_wiedzy). Przy powtórzonym
+    kluczu werdykt bierzemy z bazy wiedzy, a nazwę z pierwszego wpisu
+    (klucze bazy są znormalizowane – "i51235u" zamiast "i5-1235u").
+    """
+
+    __slots__ = ("_keys", "_names", "_verdicts", "_curated", "_curated_at")
+
+    def __init__(self, entries):
+        rows = {}
+        for key, name, verdict, curated in entries:
+            current = rows.get(key)
+            if current is None:
+                rows[key] = (name, verdict, curated)
+            elif curated and not current[2]:
+                rows[key] = (current[0], verdict, curated)
+        self._keys = sorted(rows)
+        self._names = [rows[k][0] for k in self._keys]
+        self._verdicts = [rows[k][1] for k in self._keys]
+        self._curated = [rows[k][2] for k in self._keys]
+        self._curated_at = [i for i, curated in enumerate(self._curated) if curated]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def count(self, prefix: str) -> int:
+        return bisect_left(self._keys, prefix + _AFTER) - bisect_left(self._keys, prefix)
+
+    def search(self, prefix: str, limit: int = 10, scan: int = 256) -> list:
+        """
+        Do `limit` par (nazwa, werdykt) dla kluczy zaczynających się od
+        `prefix`: najpierw dokładne trafienie, potem wpisy z bazy wiedzy,
+        potem krótsze klucze (najbliższe temu, co wpisano).
+        """
+        keys = self._keys
+        lo = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + _AFTER, lo)
+        hi = min(end, lo + scan)
+        curated = self._curated
+        # wpisy z bazy wiedzy spoza okna `scan` (przed nim są tylko one)
+        at = self._curated_at
+        first = bisect_left(at, hi)
+        extra = at[first:min(bisect_left(at, end, first), first + limit)]
+        best = heapq.nsmallest(
+            limit,
+            itertools.chain(range(lo, hi), extra),
+            key=lambda i: (keys[i] != prefix, not curated[i], len(keys[i]), i),
+        )
+        return [(self._names[i], self._verdicts[i]) for i in best]
@@ -0,0 +1,97 @@
+import re
+from contextvars import ContextVar
+from typing import NamedTuple, Optional
+
+# ==================================================
+# ODPOWIEDŹ W CIELE WEBHOOKA (BEZ OSOBNEGO WYWOŁANIA API)
+# ==================================================
+#
+# Telegram wykonuje jedno wywołanie metody Bot API zwrócone w odpowiedzi
+# HTTP na webhook. Podczas obsługi update'u odpowiedzi trafiają do bufora
+# (ContextVar – osobny dla każdego update'u); kolejne wiadomości do tego
+# samego czatu sklejamy w jedną, jeśli się da. Ostatnia wiadomość wraca
+# w ciele odpowiedzi, wcześniejsze (niesklejalne) wysyła się przez API.
+
+MESSAGE_LIMIT = 4096
+
+_buffer: ContextVar[Optional[list]] = ContextVar("reply_buffer", default=None)
+
+# znaki specjalne starego Markdowna Telegrama
+_MARKDOWN_SPECIAL = re.compile(r"([_*`\[])")
+
+
+class PendingMessage(NamedTuple):
+    chat_id: int
+    text: str
+    parse_mode: Optional[str] = None
+    extra: Optional[dict] = None  # inne argumenty send_message – blokują sklejanie
+
+
+def start_buffering():
+    return _buffer.set([])
+
+
+def stop_buffering(token) -> list:
+    messages = _buffer.get()
+    _buffer.reset(token)
+    return messages or []
+
+
+def buffer_reply(chat_id: int, text: str, parse_mode: Optional[str] = None, **extra) -> bool:
+    """
+    Dodaje odpowiedź do bufora bieżącego update'u.
+    Zwraca False, gdy bufor nie jest włączony (trzeba wysłać przez API).
+    """
+    messages = _buffer.get()
+    if messages is None:
+        return False
+    message = PendingMessage(chat_id, text, parse_mode, extra or None)
+    if messages:
+        merged = merge(messages[-1], message)
+        if merged is not None:
+            messages[-1] = merged
+            return True
+    messages.append(message)
+    return True
+
+
+def _escape_markdown(text: str) -> str:
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
+def merge(first: PendingMessage, second: PendingMessage) -> Optional[PendingMessage]:
+    """
+    Skleja dwie wiadomości w jedną albo zwraca None.
+    Zwykły tekst łączy się z Markdownem po escapowaniu znaków specjalnych.
+    """
+    if first.chat_id != second.chat_id or first.extra or second.extra:
+        return None
+
+    modes = {first.parse_mode, second.parse_mode}
+    if len(modes) == 1:
+        parse_mode = first.parse_mode
+        texts = (first.text, second.text)
+    elif modes == {None, "Markdown"}:
+        parse_mode = "Markdown"
+        texts = tuple(
+            m.text if m.parse_mode == "Markdown" else _escape_markdown(m.text)
+            for m in (first, second)
+        )
+    else:
+        return None
+
+    text = "\n\n".join(texts)
+    if len(text) > MESSAGE_LIMIT:
+        return None
+    return PendingMessage(first.chat_id, text, parse_mode)
+
+
+def webhook_payload(message: PendingMessage) -> dict:
+    """
+    Ciało odpowiedzi webhooka wykonujące sendMessage. Wiadomości z `extra`
+    (np. klawiatura) wysyłamy przez API – tu nie serializujemy obiektów PTB.
+    """
+    payload = {"method": "sendMessage", "chat_id": message.chat_id, "text": message.text}
+    if message.parse_mode:
+        payload["parse_mode"] = message.parse_mode
+    return payload
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import knowledge_base
+from heavy_hitters import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+# ==================================================
+# TRYB CIENIA – KANDYDAT EVALUATORA NA ŻYWYM RUCHU
+# ==================================================
+#
+# Obok aktywnego evaluatora działa kandydat: inny plik evaluator.py
+# (zmienione reguły w evaluate_cpu) i/lub inne źródło bazy CPU
+# (cpu_overrides.json). Co N-te wejście "CPU, RAM" ocenione przez
+# aktywny trafia razem z jego werdyktem do kolejki; kandydat ocenia
+# je paczkami w osobnym procesie, a rozbieżne pary (aktywny ->
+# kandydat) są liczone razem z najczęstszymi wejściami.
+#
+# Osobny proces zamiast wątku: ocena to czysty Python, więc wątek
+# trzymałby GIL i pętla zdarzeń czekałaby na niego do 5 ms
+# (sys.getswitchinterval) przy każdym przełączeniu. Proces ma niższy
+# priorytet (nice) i własne kopie modułów – metryki i cache kandydata
+# nie mieszają się z aktywnym. Użytkownik zawsze dostaje werdykt
+# aktywnego; po stronie obsługi wiadomości zostaje dopisanie do kolejki.
+
+ACTIVE_EVALUATOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evaluator.py")
+
+
+def load_candidate(path: str = None, kb_source: str = None):
+    """
+    Osobna kopia modułu evaluatora z `path` (domyślnie bieżący
+    evaluator.py) z overrides z `kb_source` (cpu_overrides.json),
+    jeśli podano. Zamrożona tabela werdyktów jest wyłączona przy innym
+    pliku kodu – zbudowano ją ze starych reguł i zakryłaby zmianę.
+    """
+    path = path or ACTIVE_EVALUATOR_PATH
+    spec = importlib.util.spec_from_file_location("evaluator_candidate", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+
+    if kb_source:
+        overrides, errors, _ = knowledge_base.compile_source(knowledge_base.load_source(kb_source))
+        if errors:
+            raise knowledge_base.KnowledgeBaseError("\n".join(errors))
+        module.set_cpu_overrides(overrides)
+    if os.path.abspath(path) != ACTIVE_EVALUATOR_PATH:
+        module.disable_verdict_table()
+    return module
+
+
+# --------------------------
+# Proces kandydata: python shadow.py worker [--evaluator ...] [--kb-source ...]
+# Wiersz JSON z listą wejść na stdin -> wiersz JSON z listą werdyktów na stdout.
+# --------------------------
+
+def worker(path: str = None, kb_source: str = None, nice: int = 0):
+    if nice:
+        os.nice(nice)
+    candidate = load_candidate(path, kb_source)
+    candidate.warm_verdict_cache()
+    classify = candidate.classify_hardware
+    out = sys.stdout
+    out.write('{"ready":true}\n')
+    out.flush()
+    for line in sys.stdin:
+        inputs = json.loads(line)
+        out.write(json.dumps([classify(user_input)[0] for user_input in inputs]) + "\n")
+        out.flush()
+
+
+class ShadowEvaluator:
+    """
+    Porównanie aktywnego evaluatora z kandydatem (load_candidate)
+    w procesie w tle.
+
+    - observe(wejście, werdykt) – obserwator evaluator.VERDICT_OBSERVERS,
+      wołany przy każdej ocenie; bierze co `sample_every`-te wejście
+    - kolejka najwyżej `maxsize` wejść; gdy kandydat nie nadąża, nowe są
+      odrzucane (licznik dropped) – lepiej zgubić próbkę niż pamięć
+    - rozbieżności: para (aktywny, kandydat) -> liczba + najczęstsze
+      wejścia (Space-Saving, `examples` na parę)
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        kb_source: str = None,
+        sample_every: int = 1,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        maxsize: int = 10_000,
+        examples: int = 20,
+        nice: int = 10,
+    ):
+        self.path = path
+        self.kb_source = kb_source
+        self.sample_every = max(1, sample_every)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self.examples = examples
+        self.nice = nice
+
+        self._pending = deque()
+        self._proc = None
+        self._task = None
+        self._wakeup = None
+        self._pairs = {}           # (aktywny, kandydat) -> SpaceSaving
+        self._started_at = None
+
+        self.seen = 0
+        self.sampled = 0
+        self.compared = 0
+        self.disagreed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    # --------------------------
+    # Strona obsługi wiadomości
+    # --------------------------
+
+    def observe(self, user_input: str, verdict: str):
+        self.seen += 1
+        if self._task is None or self.seen % self.sample_every:
+            return
+        if len(self._pending) >= self.maxsize:
+            self.dropped += 1
+            return
+        self.sampled += 1
+        self._pending.append((user_input, verdict))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    # --------------------------
+    # Cykl życia
+    # --------------------------
+
+    async def _spawn(self):
+        args = [sys.executable, os.path.abspath(__file__), "worker", "--nice", str(self.nice)]
+        if self.path:
+            args += ["--evaluator", self.path]
+        if self.kb_source:
+            args += ["--kb-source", self.kb_source]
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            # wiersz z paczką werdyktów może być długi
+            limit=16 * 1024 * 1024,
+        )
+        if await proc.stdout.readline() != b'{"ready":true}\n':
+            await self._kill(proc)
+            raise RuntimeError("proces kandydata nie wystartował (szczegóły wyżej w logu)")
+        return proc
+
+    @staticmethod
+    async def _kill(proc):
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+
+    async def start(self) -> bool:
+        """Uruchamia proces kandydata; False (i log), gdy kandydat się nie wczytał."""
+        if self._task is not None:
+            return True
+        try:
+            self._proc = await self._spawn()
+        except Exception:
+            logger.exception("Tryb cienia: nie udało się wczytać kandydata %s / %s",
+                             self.path or "evaluator.py", self.kb_source or "bieżąca baza CPU")
+            return False
+        self._wakeup = asyncio.Event()
+        self._started_at = datetime.utcnow().isoformat()
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._proc is not None:
+            await self._kill(self._proc)
+            self._proc = None
+        self._pending.clear()
+
+    async def _evaluate(self, inputs) -> list:
+        self._proc.stdin.write(json.dumps(inputs).encode() + b"\n")
+        await self._proc.stdin.drain()
+        line = await self._proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"proces kandydata zakończył się (kod {self._proc.returncode})")
+        return json.loads(line)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    verdicts = await self._evaluate([user_input for user_input, _ in batch])
+                except (OSError, RuntimeError, ValueError):
+                    # np. proces kandydata padł – paczka stracona, nowy proces
+                    logger.exception("Tryb cienia: błąd oceny paczki %d wejść", len(batch))
+                    self.errors += len(batch)
+                    await self._kill(self._proc)
+                    try:
+                        self._proc = await self._spawn()
+                    except Exception:
+                        logger.exception("Tryb cienia: nie udało się uruchomić kandydata ponownie – wyłączony")
+                        self._task = None
+                        self._pending.clear()
+                        return
+                    break
+                self._record(batch, verdicts)
+
+    def _record(self, batch, verdicts):
+        now = time.time()
+        for (user_input, active), candidate in zip(batch, verdicts):
+            self.compared += 1
+            if active == candidate:
+                continue
+            self.disagreed += 1
+            inputs = self._pairs.get((active, candidate))
+            if inputs is None:
+                inputs = self._pairs[(active, candidate)] = SpaceSaving(self.examples)
+            inputs.add(knowledge_base.normalize(user_input), now, sample=user_input)
+
+    # --------------------------
+    # Odczyt
+    # --------------------------
+
+    def stats(self) -> dict:
+        return {
+            "seen": self.seen,
+            "sampled": self.sampled,
+            "compared": self.compared,
+            "disagreed": self.disagreed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "pending": len(self._pending),
+        }
+
+    def disagreements(self, limit: int = 10) -> list:
+        ranked = sorted(self._pairs.items(), key=lambda item: -item[1].total)
+        return [
+            {
+                "active": active,
+                "candidate": candidate,
+                "count": inputs.total,
+                "inputs": [
+                    {"input": row["cpu"], "count": row["count"], "last_seen": row["last_seen"]}
+                    for row in inputs.top(limit)
+                ],
+            }
+            for (active, candidate), inputs in ranked
+        ]
+
+    def report(self, limit: int = 10) -> dict:
+        return {
+            "candidate": {
+                "evaluator": self.path or "evaluator.py",
+                "cpu_kb_source": self.kb_source,
+                "sample_every": self.sample_every,
+                "since": self._started_at,
+            },
+            "stats": self.stats(),
+            "disagreements": self.disagreements(limit),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tryb cienia – proces kandydata evaluatora")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("worker", help="ocena wierszy JSON ze stdin (uruchamia ShadowEvaluator)")
+    run.add_argument("--evaluator", help="plik evaluator.py kandydata (domyślnie bieżący)")
+    run.add_argument("--kb-source", help="cpu_overrides.json kandydata (domyślnie bieżąca baza)")
+    run.add_argument("--nice", type=int, default=0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    worker(args.evaluator, args.kb_source, args.nice)
+
+
+if __name__ == "__main__":
+    main()
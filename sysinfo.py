@@ -0,0 +1,258 @@
+import codecs
+import math
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import NamedTuple, Optional
+
+# ==================================================
+# RAPORTY SYSTEMOWE (msinfo32 .txt / .nfo, system_profiler)
+# ==================================================
+#
+# Strumieniowo, porcjami bajtów: pamięć zależy od długości linii / jednego
+# elementu XML, nie od rozmiaru pliku. Pola "System Summary" są na
+# początku raportu, więc czytanie kończy się, gdy znajdzie się procesor
+# i zainstalowana pamięć. Limit bajtów i czasu przerywa resztę.
+
+CHUNK_SIZE = 64 * 1024
+MAX_LINE_LENGTH = 8192
+
+# etykiety porównywane po .lower().strip()
+CPU_LABELS = {
+    "processor",                # msinfo32 (EN)
+    "procesor",                 # msinfo32 (PL)
+    "processor name",           # system_profiler (Intel)
+    "chip",                     # system_profiler (Apple silicon)
+}
+RAM_INSTALLED_LABELS = {
+    "installed physical memory (ram)",
+    "zainstalowana pamięć fizyczna (ram)",
+    "memory",                   # system_profiler
+}
+RAM_TOTAL_LABELS = {
+    "total physical memory",
+    "całkowita pamięć fizyczna",
+}
+
+# "Processor<TAB>Intel...", "Processor Name: Quad-Core...", albo
+# skopiowane z okna msinfo32 z dwiema+ spacjami zamiast tabulatora.
+# Wzorzec szuka tylko znanych etykiet w całym bloku linii naraz (po
+# .lower(), bez IGNORECASE i bez kotwicy ^ – oba kilkukrotnie spowalniają
+# skan); to, że etykieta zaczyna linię, sprawdza _scan_block.
+_FIELD = re.compile(
+    r"("
+    + "|".join(
+        re.escape(label)
+        for label in sorted(CPU_LABELS | RAM_INSTALLED_LABELS | RAM_TOTAL_LABELS, key=len, reverse=True)
+    )
+    + r")(?:[ \t]*\t[ \t]*|:[ \t]+| {2,})(\S[^\n]*?)[ \t\r]*$",
+    re.MULTILINE,
+)
+_SIZE = re.compile(r"(\d+(?:[.,]\d+)?)\s*([kmgt])b", re.IGNORECASE)
+_UNITS = {"k": 1 / 1024 ** 2, "m": 1 / 1024, "g": 1, "t": 1024}
+
+
+class SysInfo(NamedTuple):
+    cpu: Optional[str]
+    ram_gb: Optional[int]
+    format: str               # "text" / "nfo" / "empty"
+    bytes_read: int
+    stopped: Optional[str]    # None / "size" / "time"
+
+
+def parse_ram_gb(value: str, installed: bool = True) -> Optional[int]:
+    """
+    "8,00 GB" -> 8, "16384 MB" -> 16. Pamięć "całkowita" jest zawsze
+    trochę mniejsza niż zainstalowana, więc zaokrąglamy ją w górę.
+    """
+    match = _SIZE.search(value)
+    if not match:
+        return None
+    gb = float(match.group(1).replace(",", ".")) * _UNITS[match.group(2).lower()]
+    return round(gb) if installed else math.ceil(gb - 0.05)
+
+
+class _Fields:
+    """Zebrane pola; `done`, gdy nie ma już czego szukać."""
+
+    __slots__ = ("cpu", "ram_installed", "ram_total")
+
+    def __init__(self):
+        self.cpu = None
+        self.ram_installed = None
+        self.ram_total = None
+
+    @property
+    def done(self) -> bool:
+        return self.cpu is not None and self.ram_installed is not None
+
+    @property
+    def ram_gb(self):
+        return self.ram_installed if self.ram_installed is not None else self.ram_total
+
+    def offer(self, label: str, value: str):
+        label = label.strip().lower()
+        if label in CPU_LABELS:
+            if self.cpu is None:
+                # "Intel(R) Core(TM) i5-8250U CPU @ 1.60GHz, 1800 Mhz, 4 Core(s)"
+                cpu = value.split(",", 1)[0].strip()
+                self.cpu = cpu or None
+        elif label in RAM_INSTALLED_LABELS:
+            if self.ram_installed is None:
+                self.ram_installed = parse_ram_gb(value)
+        elif label in RAM_TOTAL_LABELS:
+            if self.ram_total is None:
+                self.ram_total = parse_ram_gb(value, installed=False)
+
+
+def _detect_encoding(head: bytes) -> str:
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    # UTF-16 bez BOM: co drugi bajt zerowy
+    sample = head[:512]
+    if len(sample) >= 4:
+        if sample[1::2].count(0) > len(sample) // 4:
+            return "utf-16-le"
+        if sample[0::2].count(0) > len(sample) // 4:
+            return "utf-16-be"
+    return "utf-8"
+
+
+def _is_xml(head: bytes, encoding: str) -> bool:
+    text = head[:256].decode(encoding, errors="ignore").lstrip("﻿ \t\r\n")
+    return text.startswith(("<?xml", "<MsInfo"))
+
+
+def _scan_block(block: str, fields: _Fields) -> bool:
+    lower = block.lower()
+    # lower() zmienia długość tylko przy egzotycznych znakach – wtedy
+    # wartość bierzemy z małych liter
+    source = block if len(lower) == len(block) else lower
+    for match in _FIELD.finditer(lower):
+        start = match.start()
+        if lower[lower.rfind("\n", 0, start) + 1:start].strip(" \t"):
+            continue
+        fields.offer(match.group(1), source[match.start(2):match.end(2)])
+        if fields.done:
+            return True
+    return False
+
+
+def _scan_lines(chunks, fields: _Fields, decoder, check):
+    pending = ""
+    skipping = False   # reszta za długiej linii
+    for chunk in chunks:
+        if not check(len(chunk)):
+            return
+        text = pending + decoder.decode(chunk)
+        if skipping:
+            newline = text.find("\n")
+            if newline < 0:
+                continue
+            text = text[newline + 1:]
+            skipping = False
+        # pełne linie idą do wzorca jednym blokiem, niedokończona czeka
+        cut = text.rfind("\n") + 1
+        pending = text[cut:]
+        if _scan_block(text[:cut], fields):
+            return
+        if len(pending) > MAX_LINE_LENGTH:
+            pending = ""
+            skipping = True
+    if not skipping:
+        _scan_block(pending + decoder.decode(b"", final=True), fields)
+
+
+def _scan_nfo(chunks, fields: _Fields, check):
+    """
+    <Data><Item>Processor</Item><Value>Intel...</Value></Data>
+    Przetworzone elementy są odpinane od rodzica – drzewo się nie rozrasta.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    item = None
+    try:
+        for chunk in chunks:
+            if not check(len(chunk)):
+                return
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag == "Item":
+                    item = elem.text or ""
+                elif elem.tag == "Value" and item is not None:
+                    fields.offer(item, elem.text or "")
+                    item = None
+                    if fields.done:
+                        return
+                elif elem.tag == "Data":
+                    item = None
+                    if stack:
+                        stack[-1].remove(elem)
+    except ET.ParseError:
+        # ucięty albo uszkodzony plik – zostaje to, co już znalezione
+        return
+
+
+def extract_sysinfo(chunks, max_bytes: int = 20 * 1024 * 1024, time_budget: float = 2.0) -> SysInfo:
+    """
+    Szuka procesora i RAM w raporcie podanym jako iterowalne porcje bajtów.
+    Czytanie przerywa przekroczenie `max_bytes` albo `time_budget` sekund
+    (`stopped` = "size" / "time") – zwracamy to, co znaleziono do tej pory.
+    """
+    deadline = time.perf_counter() + time_budget
+    fields = _Fields()
+    state = {"read": 0, "stopped": None}
+
+    def check(size):
+        state["read"] += size
+        if state["read"] > max_bytes:
+            state["stopped"] = "size"
+        elif time.perf_counter() > deadline:
+            state["stopped"] = "time"
+        return state["stopped"] is None
+
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        if chunk:
+            head = chunk
+            break
+    if not head:
+        return SysInfo(None, None, "empty", 0, None)
+
+    encoding = _detect_encoding(head)
+    rest = _prepend(head, chunks)
+    if _is_xml(head, encoding):
+        fmt = "nfo"
+        _scan_nfo(rest, fields, check)
+    else:
+        fmt = "text"
+        _scan_lines(rest, fields, codecs.getincrementaldecoder(encoding)(errors="replace"), check)
+    return SysInfo(fields.cpu, fields.ram_gb, fmt, state["read"], state["stopped"])
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+def iter_chunks(f, size: int = CHUNK_SIZE):
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def extract_from_text(text: str, **limits) -> SysInfo:
+    """Raport wklejony jako wiadomość."""
+    data = text.encode("utf-8")
+    return extract_sysinfo(
+        (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)), **limits
+    )
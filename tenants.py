@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import re
+from typing import NamedTuple
+
+# ==================================================
+# WIELE BOTÓW W JEDNYM PROCESIE
+# ==================================================
+#
+# Kopie bota dla różnych szkół / języków: każda ma własny token, teksty
+# menu i ustawienia (plik BOTS_CONFIG), ale wszystkie dzielą jedną kopię
+# tabel evaluatora i cache w pamięci procesu. Application bota powstaje
+# przy pierwszym użyciu, a initialize()/start() (getMe) – przy pierwszym
+# update'cie do niego; bot, do którego nikt nie pisze, nie kosztuje
+# połączenia z Bot API.
+#
+# {
+#   "bots": {
+#     "szkola-a": {"token_env": "SZKOLA_A_TOKEN"},
+#     "school-en": {
+#       "token_env": "SCHOOL_EN_TOKEN",
+#       "texts": {"main_menu": "📋 *Main menu*\n\n1️⃣ ..."},
+#       "verdicts": {"OK": "✅ Roblox Studio will run fine."},
+#       "settings": {"inline_cache_time": 600}
+#     }
+#   }
+# }
+#
+# "token" zamiast "token_env" też działa, ale token w pliku to sekret
+# w repozytorium konfiguracji.
+
+_BOT_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class BotConfig(NamedTuple):
+    bot_id: str       # część adresu: /webhook/<bot_id>; "" = jedyny bot (/webhook)
+    token: str
+    texts: dict       # nadpisane teksty (klucze jak bot.TEXTS)
+    verdicts: dict    # nadpisane odpowiedzi evaluatora (klucze HARDWARE_MESSAGES)
+    settings: dict    # nadpisane ustawienia (klucze jak bot.SETTINGS)
+
+
+def _overrides(bot_id: str, entry: dict, field: str, allowed) -> dict:
+    values = entry.get(field) or {}
+    if not isinstance(values, dict):
+        raise ValueError(f"{bot_id}: {field} musi być obiektem")
+    unknown = sorted(set(values) - set(allowed))
+    if unknown:
+        raise ValueError(f"{bot_id}: nieznane klucze {field}: {', '.join(unknown)}")
+    return dict(values)
+
+
+def load_config(path: str, text_keys, verdict_keys, setting_keys) -> list:
+    """
+    Lista BotConfig z pliku JSON. Błędy konfiguracji (zły bot_id, brak
+    tokenu, nieznany klucz – literówka w nazwie tekstu nie przejdzie po
+    cichu) -> ValueError; lepiej nie wystartować niż odpowiadać złym menu.
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    configs = []
+    tokens = set()
+    for bot_id, entry in (raw.get("bots") or {}).items():
+        if not _BOT_ID.fullmatch(bot_id):
+            raise ValueError(f"Niepoprawny bot_id {bot_id!r} (litery, cyfry, _ i -)")
+        token = entry.get("token") or os.environ.get(entry.get("token_env") or "")
+        if not token:
+            raise ValueError(f"{bot_id}: brak tokenu (token / token_env)")
+        if token in tokens:
+            raise ValueError(f"{bot_id}: ten sam token co inny bot")
+        tokens.add(token)
+        configs.append(BotConfig(
+            bot_id,
+            token,
+            _overrides(bot_id, entry, "texts", text_keys),
+            _overrides(bot_id, entry, "verdicts", verdict_keys),
+            _overrides(bot_id, entry, "settings", setting_keys),
+        ))
+    if not configs:
+        raise ValueError(f"{path}: brak botów")
+    return configs
+
+
+def state_path(path: str, bot_id: str) -> str:
+    """Osobny plik stanu rozmów na bota – id czatów prywatnych są wspólne dla botów."""
+    if not bot_id:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{bot_id}{ext}"
+
+
+class Tenant:
+    """
+    Jeden bot: konfiguracja z tekstami / ustawieniami scalonymi
+    z domyślnymi i Application budowana przez `build(tenant)`.
+    """
+
+    __slots__ = ("config", "texts", "verdicts", "settings", "_build",
+                 "_application", "_starting", "started")
+
+    def __init__(self, config: BotConfig, build, texts: dict, verdicts: dict, settings: dict):
+        self.config = config
+        self.texts = {**texts, **config.texts}
+        self.verdicts = {**verdicts, **config.verdicts}
+        self.settings = {**settings, **config.settings}
+        self._build = build
+        self._application = None
+        self._starting = None
+        self.started = False
+
+    @property
+    def bot_id(self) -> str:
+        return self.config.bot_id
+
+    @property
+    def built(self) -> bool:
+        return self._application is not None
+
+    @property
+    def application(self):
+        if self._application is None:
+            self._application = self._build(self)
+        return self._application
+
+    @property
+    def bot(self):
+        return self.application.bot
+
+    async def ready(self):
+        """initialize() + start() raz; równoległe wywołania czekają na to samo."""
+        if self.started:
+            return
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        await asyncio.shield(self._starting)
+
+    async def _start(self):
+        try:
+            await self.application.initialize()
+            # start() uruchamia m.in. okresowy zapis persystencji
+            await self.application.start()
+        except BaseException:
+            # następny update spróbuje jeszcze raz (np. chwilowy błąd getMe)
+            self._starting = None
+            raise
+        self.started = True
+
+
+class Tenants:
+    """Boty procesu: wyszukiwanie po bot_id (adres webhooka) i po tokenie (update.get_bot())."""
+
+    def __init__(self, tenants):
+        self._by_id = {t.bot_id: t for t in tenants}
+        self._by_token = {t.config.token: t for t in tenants}
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, bot_id: str):
+        return self._by_id.get(bot_id)
+
+    def of_bot(self, bot) -> Tenant:
+        return self._by_token[bot.token]
+
+    def started(self) -> list:
+        return [t for t in self._by_id.values() if t.started]
+
+    def stats(self) -> dict:
+        return {
+            "configured": len(self._by_id),
+            "built": sum(1 for t in self._by_id.values() if t.built),
+            "started": sum(1 for t in self._by_id.values() if t.started),
+        }
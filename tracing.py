@@ -0,0 +1,306 @@
+import contextvars
+import cProfile
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ==================================================
+# ŚLEDZENIE I PROFILOWANIE PRÓBKI ŻĄDAŃ (OPT-IN)
+# ==================================================
+#
+# Co N-te żądanie dostaje ślad: czasy zagnieżdżonych etapów (spany
+# webhook -> process_update -> handle_message -> evaluate_hardware ->
+# reply_text) i profil cProfile. Ślad zapisywany jest jako JSON w formacie
+# Chrome trace (chrome://tracing, Perfetto), a profil jako plik pstats.
+# W katalogu zostaje tylko ostatnie TRACE_KEEP plików każdego rodzaju.
+# Stosy z wszystkich próbek są sumowane w formacie "folded" (flamegraph.pl,
+# speedscope).
+#
+# Przy TRACE_SAMPLE=0 (domyślnie) dekorator zwraca funkcję bez zmian,
+# więc nie ma żadnego narzutu. Stan śladu przenosi ContextVar, dlatego
+# spany z zadań tworzonych w trakcie żądania trafiają do tego samego śladu.
+#
+# cProfile mierzy cały wątek, więc profil obejmuje też inne korutyny,
+# które pętla zdarzeń wykonała w czasie próbki. Naraz działa tylko jeden
+# profil; próbka, która trafi na zajęty profiler, ma tylko spany.
+
+# stan "to żądanie nie jest próbkowane" – zagnieżdżone spany nic nie robią
+_SKIP = object()
+
+_ACTIVE = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    __slots__ = ("id", "name", "wall", "started", "spans", "profiler", "finished")
+
+    def __init__(self, trace_id: int, name: str):
+        self.id = trace_id
+        self.name = name
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        self.spans = []          # (ścieżka, start, czas)
+        self.profiler = None
+        self.finished = False
+
+    def add(self, path: tuple, started: float, elapsed: float):
+        # zadanie utworzone w żądaniu może skończyć się po korzeniu
+        if not self.finished:
+            self.spans.append((path, started, elapsed))
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "trace", "path", "token", "started", "root")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.trace = None
+        self.token = None
+        self.root = False
+
+    def __enter__(self):
+        active = _ACTIVE.get()
+        if active is None:
+            # najbardziej zewnętrzny span decyduje o próbkowaniu
+            self.trace = self.tracer._begin(self.name)
+            if self.trace is None:
+                self.token = _ACTIVE.set(_SKIP)
+                return
+            self.root = True
+            self.path = (self.name,)
+        else:
+            self.trace, parent = active
+            self.path = parent + (self.name,)
+        self.token = _ACTIVE.set((self.trace, self.path))
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        if self.token is None:
+            return
+        _ACTIVE.reset(self.token)
+        if self.trace is None:
+            return
+        self.trace.add(self.path, self.started, time.perf_counter() - self.started)
+        if self.root:
+            self.tracer._finish(self.trace)
+
+
+class Tracer:
+    """
+    `sample_every`: śledzony co N-ty korzeń (0 = wyłączone).
+    `profile`: próbki dodatkowo profilowane cProfile.
+    """
+
+    def __init__(self, sample_every=0, directory="traces", keep=50, profile=True):
+        self.sample_every = sample_every
+        self.enabled = sample_every > 0
+        self.directory = directory
+        self.keep = keep
+        self.profile = profile
+
+        self._counter = itertools.count()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._profiling = False
+        self._folded = {}        # "a;b;c" -> µs czasu własnego
+        self._stats = None       # pstats.Stats zsumowany ze wszystkich próbek
+
+        self.roots = 0
+        self.sampled = 0
+        self.profiled = 0
+        self.write_errors = 0
+
+    # --------------------------
+    # Dekorator
+    # --------------------------
+
+    def traced(self, name: str):
+        """Span wokół funkcji (zwykłej albo async); wyłączony – bez opakowania."""
+        def decorate(fn):
+            if not self.enabled:
+                return fn
+            # niepróbkowane żądanie: jeden odczyt ContextVar, bez obiektu spanu
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if _ACTIVE.get() is _SKIP:
+                        return await fn(*args, **kwargs)
+                    with _Span(self, name):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if _ACTIVE.get() is _SKIP:
+                    return fn(*args, **kwargs)
+                with _Span(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    # --------------------------
+    # Korzeń śladu
+    # --------------------------
+
+    def _begin(self, name: str):
+        self.roots += 1
+        if next(self._counter) % self.sample_every:
+            return None
+        self.sampled += 1
+        trace = Trace(next(self._ids), name)
+        if self.profile and not self._profiling:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # inny profiler / debugger już działa
+                return trace
+            self._profiling = True
+            trace.profiler = profiler
+        return trace
+
+    def _finish(self, trace: Trace):
+        trace.finished = True
+        profiler = trace.profiler
+        if profiler is not None:
+            profiler.disable()
+            self._profiling = False
+            self.profiled += 1
+        with self._lock:
+            self._aggregate(trace)
+        # zapis w miejscu (kilka ms) – tylko co N-te żądanie
+        try:
+            self._write(trace)
+        except OSError:
+            self.write_errors += 1
+            logger.warning("Nie udało się zapisać śladu do %s", self.directory, exc_info=True)
+
+    def _aggregate(self, trace: Trace):
+        totals = {}
+        for path, _, elapsed in trace.spans:
+            totals[path] = totals.get(path, 0.0) + elapsed
+        own = dict(totals)
+        for path, elapsed in totals.items():
+            if len(path) > 1 and path[:-1] in own:
+                own[path[:-1]] -= elapsed
+        for path, elapsed in own.items():
+            key = ";".join(path)
+            # zadania w tle mogą się nakładać z rodzicem – bez ujemnych czasów
+            self._folded[key] = self._folded.get(key, 0.0) + max(elapsed, 0.0) * 1e6
+
+        if trace.profiler is not None:
+            if self._stats is None:
+                self._stats = pstats.Stats(trace.profiler)
+            else:
+                self._stats.add(trace.profiler)
+
+    # --------------------------
+    # Pliki z rotacją
+    # --------------------------
+
+    def _write(self, trace: Trace):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(trace.wall)) + f"-{trace.id:06d}"
+        events = [
+            {
+                "name": path[-1],
+                "cat": trace.name,
+                "ph": "X",
+                "ts": round((started - trace.started) * 1e6, 1),
+                "dur": round(elapsed * 1e6, 1),
+                "pid": 1,
+                "tid": 1,
+                "args": {"path": ";".join(path)},
+            }
+            for path, started, elapsed in trace.spans
+        ]
+        path = os.path.join(self.directory, f"trace-{stamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "otherData": {"root": trace.name}}, f)
+        self._rotate("trace-")
+
+        if trace.profiler is not None:
+            trace.profiler.dump_stats(os.path.join(self.directory, f"profile-{stamp}.pstats"))
+            self._rotate("profile-")
+
+    def _rotate(self, prefix: str):
+        # nazwy zaczynają się od czasu UTC – kolejność alfabetyczna = wiek
+        files = sorted(f for f in os.listdir(self.directory) if f.startswith(prefix))
+        for name in files[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    # --------------------------
+    # Podsumowanie
+    # --------------------------
+
+    def folded(self, source: str = "spans") -> str:
+        """
+        Stosy w formacie "folded" (`ramka;ramka;ramka mikrosekundy`).
+        "spans"   – czas własny etapów, pełne ścieżki
+        "profile" – cProfile: pary wywołujący;wywoływany z czasem własnym
+                    wywoływanego (cProfile nie zna pełnych stosów)
+        """
+        with self._lock:
+            if source == "profile":
+                lines = self._profile_lines()
+            else:
+                lines = [f"{path} {round(us)}" for path, us in self._folded.items() if us >= 0.5]
+        return "\n".join(sorted(lines)) + "\n" if lines else ""
+
+    def _profile_lines(self) -> list:
+        if self._stats is None:
+            return []
+        lines = []
+        for func, (_, _, own, _, callers) in self._stats.stats.items():
+            label = _label(func)
+            if not callers:
+                if own * 1e6 >= 0.5:
+                    lines.append(f"{label} {round(own * 1e6)}")
+                continue
+            for caller, values in callers.items():
+                if values[2] * 1e6 >= 0.5:
+                    lines.append(f"{_label(caller)};{label} {round(values[2] * 1e6)}")
+        return lines
+
+    def stats(self) -> dict:
+        return {
+            "sample_every": self.sample_every,
+            "roots": self.roots,
+            "sampled": self.sampled,
+            "profiled": self.profiled,
+            "write_errors": self.write_errors,
+        }
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        # funkcje wbudowane: "<built-in method time.perf_counter>"
+        return name.replace(";", ",")
+    return f"{os.path.basename(filename)}:{name}:{line}".replace(";", ",")
+
+
+# ==================================================
+# KONFIGURACJA (ENV)
+# ==================================================
+
+# TRACE_SAMPLE=N – śledzony co N-ty korzeń; 0 wyłącza
+TRACER = Tracer(
+    sample_every=int(os.environ.get("TRACE_SAMPLE", 0)),
+    directory=os.environ.get("TRACE_DIR", "traces"),
+    keep=int(os.environ.get("TRACE_KEEP", 50)),
+    profile=os.environ.get("TRACE_PROFILE", "1") == "1",
+)
+
+traced = TRACER.traced
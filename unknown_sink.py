@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+import metrics
+from tracing import traced
+
+# ==================================================
+# ASYNC LOG NIEZNANYCH CPU (GOOGLE SHEETS)
+# ==================================================
+
+_POST_SECONDS = metrics.stage("unknown_cpu_post")
+
+# wynik wysyłki paczki
+SENT, REJECTED, FAILED = "sent", "rejected", "failed"
+
+
+class UnknownCpuSink:
+    """
+    Kolejka wpisów o nieznanych CPU wysyłana w tle paczkami.
+
+    - submit() nigdy nie blokuje pętli zdarzeń
+    - worker wysyła paczki (lista JSON) przez jeden klient httpx z pulą połączeń
+    - błędy wysyłki -> ponowienia z wykładniczym odczekaniem
+    - pełna kolejka / wyczerpane ponowienia -> dopisanie do pliku spill (JSONL),
+      który jest wczytywany ponownie przy następnym starcie workera
+    - 4xx (arkusz odrzucił dane) -> bez ponowień, do pliku spill_path +
+      ".rejected" – do przejrzenia, nie wraca do kolejki (odrzuciłby go znowu)
+
+    submit() wołamy z wątku pętli zdarzeń (handlery bota).
+    """
+
+    def __init__(
+        self,
+        url,
+        spill_path,
+        maxsize=1000,
+        batch_size=50,
+        flush_interval=2.0,
+        max_retries=5,
+        backoff=0.5,
+        timeout=5.0,
+    ):
+        self.url = url
+        self.spill_path = spill_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.maxsize = maxsize
+
+        # kolejka powstaje w start(), już w pętli serwera (Python 3.9 wiąże
+        # asyncio.Queue z pętlą z chwili utworzenia, a sink tworzy się przy
+        # imporcie evaluatora); wcześniejsze wpisy czekają w _early
+        self._queue = None
+        self._early = []
+        self._client = None
+        self._worker = None
+
+        self.sent = 0
+        self.spilled = 0
+        self.rejected = 0
+
+    # --------------------------
+    # API dla evaluatora
+    # --------------------------
+
+    def submit(self, row: dict):
+        if not self.url:
+            return
+        if self._queue is None:
+            if len(self._early) < self.maxsize:
+                self._early.append(row)
+            else:
+                self._spill([row])
+            return
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self._spill([row])
+
+    def stats(self) -> dict:
+        queued = self._queue.qsize() if self._queue is not None else len(self._early)
+        return {"sent": self.sent, "spilled": self.spilled, "rejected": self.rejected, "queued": queued}
+
+    # --------------------------
+    # Cykl życia (startup / shutdown aplikacji)
+    # --------------------------
+
+    async def start(self):
+        if not self.url or self._worker is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        early, self._early = self._early, []
+        self._enqueue(early)
+        self._requeue_spilled()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=5.0):
+        """
+        Próbuje wysłać to, co zostało w kolejce; resztę zapisuje do spill.
+        """
+        if self._worker is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        # także wpisy zebrane przed start() (szybki start bota)
+        leftover, self._early = self._early, []
+        if self._queue is not None:
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+                self._queue.task_done()
+            self._queue = None
+        if leftover:
+            self._spill(leftover)
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --------------------------
+    # Worker
+    # --------------------------
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0 or not await self._collect(batch, remaining):
+                        break
+
+                result = await self._send(batch)
+                if result == SENT:
+                    self.sent += len(batch)
+                elif result == REJECTED:
+                    self.rejected += len(batch)
+                    self._spill(batch, self.spill_path + ".rejected")
+                else:
+                    self._spill(batch)
+            except asyncio.CancelledError:
+                # zamknięcie w trakcie zbierania albo wysyłki – paczka nie może zginąć
+                self._spill(batch)
+                raise
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _collect(self, batch, timeout) -> bool:
+        """
+        Dopisuje do paczki następny wpis z kolejki; False po `timeout` s.
+        Bez wait_for: anulowany tuż po odebraniu wpisu zgubiłby go.
+        """
+        getter = asyncio.ensure_future(self._queue.get())
+        try:
+            await asyncio.wait((getter,), timeout=timeout)
+        finally:
+            if not getter.done():
+                getter.cancel()
+            elif not getter.cancelled():
+                batch.append(getter.result())
+        return getter.done()
+
+    @traced("unknown_cpu_post")
+    async def _send(self, batch) -> str:
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = await self._client.post(self.url, json=batch)
+                if response.status_code < 400:
+                    return SENT
+                # 4xx to błąd danych – ponawianie nic nie da
+                if response.status_code < 500:
+                    return REJECTED
+            except httpx.HTTPError:
+                pass
+            finally:
+                _POST_SECONDS.observe(time.perf_counter() - started)
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+                delay *= 2
+        return FAILED
+
+    # --------------------------
+    # Spill na dysk
+    # --------------------------
+
+    def _spill(self, rows, path=None):
+        try:
+            with open(path or self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            if path is None:
+                self.spilled += len(rows)
+        except OSError:
+            pass
+
+    def _requeue_spilled(self):
+        if not os.path.exists(self.spill_path):
+            return
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                lines = f.readlines()
+            os.remove(self.spill_path)
+        except OSError:
+            return
+
+        rows = []
+        for line in lines:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+
+        self._enqueue(rows)
+
+    def _enqueue(self, rows):
+        for i, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                self._spill(rows[i:])
+                break
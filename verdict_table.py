@@ -0,0 +1,228 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+from collections import Counter
+
+# ==================================================
+# ZAMROŻONA TABELA WERDYKTÓW – MODEL KANONICZNY -> WERDYKT
+# ==================================================
+#
+# Generowana z aktualnych reguł + overrides dla znanej przestrzeni SKU.
+# Runtime odpowiada z niej jednym lookupem, reguły są tylko fallbackiem.
+#
+# Po zmianie reguł albo bazy CPU:  python verdict_table.py build
+# (wypisuje raport werdyktów, które się zmieniły)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TABLE_PATH = os.path.join(DATA_DIR, "cpu_verdicts.json.gz")
+# modele, które istnieją (podpowiedzi inline) – podzbiór przestrzeni SKU
+MODELS_PATH = os.path.join(DATA_DIR, "cpu_models.txt")
+
+# prefiksy, które runtime może odciąć przed lookupem; build sprawdza,
+# że nie zmieniają werdyktu dla żadnego modelu z tabeli
+STRIP_PREFIXES = (
+    "intel core ",
+    "intel(r) core(tm) ",
+    "core ",
+    "amd ",
+)
+
+INTEL_FAMILIES = ("i3", "i5", "i7", "i9")
+INTEL_SUFFIXES = ("", "u", "h", "hq", "hk", "hx", "p", "y", "t", "k", "f")
+# G1–G7 tylko dla 4-cyfrowych modeli 1xxx (Ice Lake / Tiger Lake)
+INTEL_G_SUFFIXES = ("g1", "g2", "g3", "g4", "g5", "g6", "g7")
+
+RYZEN_TIERS = ("3", "5", "7", "9")
+RYZEN_SUFFIXES = ("", "u", "h", "hs", "hx", "x", "g")
+RYZEN_ENDINGS = ("00", "25", "50", "60", "80")
+
+
+def enumerate_sku_space():
+    """
+    Kanoniczne nazwy modeli: Intel Core i3/i5/i7/i9 gen 1–14
+    (numery kończące się na 0 / 5) i Ryzen 3/5/7/9.
+    """
+    for family in INTEL_FAMILIES:
+        for lead in range(1, 10):
+            for mid in range(100):
+                for last in (0, 5):
+                    number = f"{lead}{mid:02d}{last}"
+                    suffixes = INTEL_SUFFIXES + (INTEL_G_SUFFIXES if lead == 1 else ())
+                    for suffix in suffixes:
+                        yield f"{family}-{number}{suffix}"
+        for gen in range(10, 15):
+            for mid in range(100):
+                for last in (0, 5):
+                    for suffix in INTEL_SUFFIXES:
+                        yield f"{family}-{gen}{mid:02d}{last}{suffix}"
+
+    for tier in RYZEN_TIERS:
+        for lead in range(1, 10):
+            for mid in range(10):
+                for ending in RYZEN_ENDINGS:
+                    for suffix in RYZEN_SUFFIXES:
+                        yield f"ryzen {tier} {lead}{mid}{ending}{suffix}"
+
+
+def load_models(path: str = MODELS_PATH) -> list:
+    """Lista realnych modeli z pliku: jeden na linię, "#" = komentarz."""
+    with open(path, encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line.lower() for line in lines if line]
+
+
+def overrides_fingerprint(overrides: dict) -> str:
+    payload = json.dumps(sorted(overrides.items()), separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ==================================================
+# BUDOWA
+# ==================================================
+
+def build_table(evaluate, overrides: dict, rules_sha256: str) -> dict:
+    """
+    `evaluate` – ocena bez cache (evaluator._evaluate_cpu_uncached),
+    `rules_sha256` – evaluator.rules_fingerprint() reguł, z których powstaje.
+    Przerywa, jeśli któryś prefiks ze STRIP_PREFIXES zmienia werdykt.
+    """
+    verdicts = {}
+    for model in enumerate_sku_space():
+        verdict = evaluate(model)
+        for prefix in STRIP_PREFIXES:
+            if evaluate(prefix + model) != verdict:
+                raise ValueError(f"prefiks {prefix!r} zmienia werdykt dla {model!r}")
+        verdicts[model] = verdict
+
+    return {
+        "overrides_sha256": overrides_fingerprint(overrides),
+        "rules_sha256": rules_sha256,
+        "verdicts": verdicts,
+    }
+
+
+def save_table(table: dict, path: str = TABLE_PATH):
+    # zapis pogrupowany wg werdyktu – mniejszy i stabilny między buildami
+    grouped = {}
+    for model, verdict in sorted(table["verdicts"].items()):
+        grouped.setdefault(verdict, []).append(model)
+    payload = {
+        "overrides_sha256": table["overrides_sha256"],
+        "rules_sha256": table["rules_sha256"],
+        "strip_prefixes": list(STRIP_PREFIXES),
+        "verdicts": grouped,
+    }
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=9) as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_table(path: str = TABLE_PATH):
+    """
+    Zwraca {"overrides_sha256", "rules_sha256", "strip_prefixes",
+    "verdicts": {model: werdykt}}
+    albo None, gdy pliku nie ma.
+    """
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    verdicts = {}
+    for verdict, models in payload["verdicts"].items():
+        for model in models:
+            verdicts[model] = verdict
+    payload["verdicts"] = verdicts
+    return payload
+
+
+def spot_check(table: dict, evaluate, sample: int = 256) -> list:
+    """
+    Porównuje losową (deterministyczną) próbkę tabeli z regułami.
+    Zwraca listę rozbieżności.
+    """
+    models = sorted(table["verdicts"])
+    rng = random.Random(len(models))
+    picked = rng.sample(models, min(sample, len(models)))
+    return [m for m in picked if evaluate(m) != table["verdicts"][m]]
+
+
+# ==================================================
+# RAPORT RÓŻNIC
+# ==================================================
+
+def diff_tables(old: dict, new: dict) -> dict:
+    old_v = old["verdicts"] if old else {}
+    new_v = new["verdicts"]
+    flips = {
+        m: (old_v[m], new_v[m]) for m in new_v.keys() & old_v.keys() if old_v[m] != new_v[m]
+    }
+    return {
+        "flips": dict(sorted(flips.items())),
+        "added": len(new_v.keys() - old_v.keys()),
+        "removed": len(old_v.keys() - new_v.keys()),
+    }
+
+
+def format_diff(diff: dict, limit: int = 50) -> str:
+    flips = diff["flips"]
+    lines = [
+        f"zmienione werdykty: {len(flips)}, nowe modele: {diff['added']}, "
+        f"usunięte modele: {diff['removed']}"
+    ]
+    if flips:
+        summary = Counter(flips.values())
+        for (old, new), count in summary.most_common():
+            lines.append(f"  {old} -> {new}: {count}")
+        for model, (old, new) in list(flips.items())[:limit]:
+            lines.append(f"    {model}: {old} -> {new}")
+        if len(flips) > limit:
+            lines.append(f"    ... i {len(flips) - limit} więcej")
+    return "\n".join(lines)
+
+
+# ==================================================
+# CLI
+# ==================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zamrożona tabela werdyktów CPU")
+    # diff: tylko raport; kod wyjścia 1, gdy któryś werdykt się zmienił
+    # snapshot: gotowe tabele evaluatora dla szybkiego startu bota
+    parser.add_argument("command", choices=("build", "diff", "snapshot"))
+    parser.add_argument("--table", default=TABLE_PATH)
+    parser.add_argument("--report", help="pełny raport różnic (JSON)")
+    args = parser.parse_args(argv)
+
+    import evaluator
+
+    if args.command == "snapshot":
+        print(f"zapisano {evaluator.write_snapshot()}", file=sys.stderr)
+        return 0
+
+    old = load_table(args.table)
+    new = build_table(
+        evaluator._evaluate_cpu_uncached,
+        evaluator.NORMALIZED_CPU_OVERRIDES,
+        evaluator.rules_fingerprint(),
+    )
+    diff = diff_tables(old, new)
+    print(format_diff(diff))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(diff, f, indent=2, ensure_ascii=False)
+
+    if args.command == "build":
+        save_table(new, args.table)
+        print(f"zapisano {args.table} ({len(new['verdicts'])} modeli)", file=sys.stderr)
+        return 0
+    return 1 if diff["flips"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())